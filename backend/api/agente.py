@@ -6,7 +6,8 @@ Este módulo NO modifica los endpoints existentes.
 Agrega nuevos endpoints específicos para la conversación con el agente.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy import func
@@ -14,15 +15,18 @@ from typing import Optional, List
 from datetime import datetime
 
 from backend.config.database import get_db
-from backend.ia.iaCore import NLPAnalyzer
+from backend.config.settings import settings
+from backend.ia.iaCore import get_analyzer
 from backend.ia.iaAgent import AgenteAutonomo
 from backend.core.coreModels import ConversacionAgente, MensajeAgente, InsightAgente
+from backend.core.paginacion import HEADER_CURSOR, CursorInvalido, paginar
+from backend.core.cacheRespuestas import AMBITO_INSIGHTS, subirVersion
 
 router = APIRouter(tags=["Agente"])
 
 # Instancias globales
 try:
-    nlp_analyzer = NLPAnalyzer()
+    nlp_analyzer = get_analyzer()
     agente = AgenteAutonomo(nlp_analyzer)
     print("[OK] Agente autonomo inicializado correctamente")
 except Exception as e:
@@ -62,12 +66,25 @@ class ActualizarInsightPayload(BaseModel):
 
 @router.get("/agente/health/")
 def health_check():
-    """Health check del agente"""
-    return {
-        "status": "ok",
+    """
+    Health check del agente
+
+    Con warm-up activado responde 503 mientras algún modelo no esté listo,
+    para que el balanceador solo envíe tráfico a workers calientes.
+    """
+    modelos = nlp_analyzer.models.status() if nlp_analyzer is not None else {}
+    listo = agente is not None and (
+        not settings.warmup_models or nlp_analyzer.models.ready()
+    )
+    body = {
+        "status": "ok" if listo else "loading",
         "agente_loaded": agente is not None,
-        "nlp_analyzer_loaded": nlp_analyzer is not None
+        "nlp_analyzer_loaded": nlp_analyzer is not None,
+        "modelos": modelos
     }
+    if not listo:
+        return JSONResponse(status_code=503, content=body)
+    return body
 
 
 @router.get("/agente/insights/estadisticas/simple/")
@@ -266,6 +283,7 @@ def responder_conversacion(payload: ResponderPayload, db: Session = Depends(get_
                     estado="nuevo"
                 )
                 db.add(insight)
+                subirVersion(db, AMBITO_INSIGHTS)
             else:
                 print(f"[WARN]  No se generó insight para esta conversación")
 
@@ -364,11 +382,15 @@ def obtener_conversacion(conversacion_id: int, db: Session = Depends(get_db)):
 
 @router.get("/agente/insights/")
 def obtener_insights(
+    response: Response,
     limite: int = 20,
     tipo: Optional[str] = None,
     severidad: Optional[str] = None,
     estado: Optional[str] = None,
     departamento: Optional[str] = None,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
@@ -380,6 +402,7 @@ def obtener_insights(
         - severidad: Filtrar por severidad
         - estado: Filtrar por estado (nuevo, revisado, etc)
         - departamento: Filtrar por departamento
+        - after_id / before_id / cursor: paginación por id (ver core/paginacion.py)
     """
     try:
         query = db.query(InsightAgente)
@@ -393,9 +416,9 @@ def obtener_insights(
         if departamento:
             query = query.filter(InsightAgente.departamento == departamento)
 
-        insights = query.order_by(
-            InsightAgente.created_at.desc()
-        ).limit(limite).all()
+        insights, next_cursor = paginar(query, InsightAgente.id, limite, cursor, after_id, before_id)
+        if next_cursor:
+            response.headers[HEADER_CURSOR] = next_cursor
 
         return {
             "insights": [
@@ -421,9 +444,12 @@ def obtener_insights(
                 }
                 for i in insights
             ],
-            "total": len(insights)
+            "total": len(insights),
+            "next_cursor": next_cursor
         }
 
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[ERROR] ERROR EN /agente/insights/: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -533,6 +559,7 @@ def actualizar_insight(
         if payload.notas_rrhh is not None:
             insight.notas_rrhh = payload.notas_rrhh
 
+        subirVersion(db, AMBITO_INSIGHTS)
         db.commit()
         db.refresh(insight)
 
@@ -556,14 +583,18 @@ def actualizar_insight(
 
 @router.get("/agente/conversaciones/")
 def listar_conversaciones(
+    response: Response,
     limite: int = 20,
     estado: Optional[str] = None,
     nivel_riesgo: Optional[str] = None,
     departamento: Optional[str] = None,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Lista conversaciones con filtros opcionales
+    Lista conversaciones con filtros opcionales, paginadas por id
     """
     try:
         query = db.query(ConversacionAgente)
@@ -575,9 +606,11 @@ def listar_conversaciones(
         if departamento:
             query = query.filter(ConversacionAgente.departamento == departamento)
 
-        conversaciones = query.order_by(
-            ConversacionAgente.created_at.desc()
-        ).limit(limite).all()
+        conversaciones, next_cursor = paginar(
+            query, ConversacionAgente.id, limite, cursor, after_id, before_id
+        )
+        if next_cursor:
+            response.headers[HEADER_CURSOR] = next_cursor
 
         return {
             "conversaciones": [
@@ -594,9 +627,12 @@ def listar_conversaciones(
                 }
                 for c in conversaciones
             ],
-            "total": len(conversaciones)
+            "total": len(conversaciones),
+            "next_cursor": next_cursor
         }
 
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[ERROR] ERROR EN /agente/conversaciones/: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -4,11 +4,13 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from backend.config.database import get_db
 from backend.core.coreModels import InsightAgente
+from backend.core.cacheRespuestas import AMBITO_INSIGHTS, respuestaCacheada
 
 router_stats = APIRouter(tags=["AgenteStats"])
 
 
 @router_stats.get("/agente/stats/")
+@respuestaCacheada(AMBITO_INSIGHTS)
 def get_stats_simple(db: Session = Depends(get_db)):
     """Version ultra simple - GARANTIZADA QUE FUNCIONA"""
     resultado = {
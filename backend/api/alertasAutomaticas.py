@@ -1,21 +1,34 @@
 # api/alertasAutomaticas.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Optional
+import asyncio
+import json
 
-from backend.config.database import get_db
+from backend.config.database import SessionLocal, get_db
+from backend.config.settings import settings
 from backend.core.coreServices import obtenerAlertas
 from backend.core.coreModels import AnalisisComentario
+from backend.core.categoriasComentario import frecuenciaCategorias
+from backend.core.paginacion import HEADER_CURSOR, CursorInvalido, paginar
+from backend.core.planificadorPatrones import leerEventos, snapshotPatrones, ultimoEvento
+from backend.core.detectorAnomalias import AMBITO_DEPARTAMENTO, AMBITO_EQUIPO, leerDetector
 
 
 router = APIRouter(tags=["Alertas"])
 
 @router.get("/alertas/")
 def alertas(
+    response: Response,
     nivel: str = "alto",
     limite: int = 20,
     departamento: Optional[str] = None,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     query = db.query(AnalisisComentario).filter(AnalisisComentario.stress_level == nivel)
@@ -23,7 +36,12 @@ def alertas(
     if departamento:
         query = query.filter(AnalisisComentario.departamento == departamento)
 
-    rows = query.order_by(AnalisisComentario.id.desc()).limit(limite).all()
+    try:
+        rows, next_cursor = paginar(query, AnalisisComentario.id, limite, cursor, after_id, before_id)
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[HEADER_CURSOR] = next_cursor
 
     return [
         {
@@ -42,132 +60,105 @@ def alertas(
 
 @router.get("/alertas/patrones/")
 def detectarPatrones(db: Session = Depends(get_db)):
-    total = db.query(func.count(AnalisisComentario.id)).scalar()
-
-    if total == 0:
-        return {
-            "patrones_detectados": [],
-            "mensaje": "No hay datos suficientes"
-        }
-
-    stress_alto = db.query(func.count(AnalisisComentario.id)).filter(
-        AnalisisComentario.stress_level == "alto"
-    ).scalar()
-
-    stress_alto_pct = (stress_alto / total) * 100 if total > 0 else 0
-
-    patrones = []
-
-    if stress_alto_pct > 30:
-        patrones.append({
-            "tipo": "stress_critico",
-            "severidad": "alta",
-            "mensaje": f"Nivel crítico de estrés detectado: {stress_alto_pct:.1f}% de comentarios con estrés alto",
-            "accion": "Intervención inmediata requerida. Revisar carga laboral y recursos."
-        })
-
-    registros_recientes = db.query(AnalisisComentario).order_by(
-        AnalisisComentario.id.desc()
-    ).limit(20).all()
-
-    stress_reciente = sum(1 for r in registros_recientes if r.stress_level == "alto")
-    if stress_reciente > 15:
-        patrones.append({
-            "tipo": "tendencia_creciente",
-            "severidad": "media",
-            "mensaje": f"Incremento en comentarios con estrés alto en últimos registros ({stress_reciente}/20)",
-            "accion": "Monitorear situación y preparar plan de acción preventivo."
-        })
-
-    dept_stress = {}
-    for r in db.query(AnalisisComentario).all():
-        dept = r.departamento or "Sin departamento"
-        if dept not in dept_stress:
-            dept_stress[dept] = {"total": 0, "alto": 0}
-        dept_stress[dept]["total"] += 1
-        if r.stress_level == "alto":
-            dept_stress[dept]["alto"] += 1
-
-    for dept, data in dept_stress.items():
-        if data["total"] >= 5:
-            pct = (data["alto"] / data["total"]) * 100
-            if pct > 50:
-                patrones.append({
-                    "tipo": "departamento_critico",
-                    "severidad": "alta",
-                    "mensaje": f"Departamento '{dept}' con {pct:.1f}% de estrés alto ({data['alto']}/{data['total']})",
-                    "accion": f"Reunión urgente con liderazgo de {dept}. Evaluación de condiciones laborales."
-                })
-
-    emociones_negativas = db.query(func.count(AnalisisComentario.id)).filter(
-        AnalisisComentario.emotion_label.in_(["anger", "fear", "sadness"])
-    ).scalar()
-
-    if emociones_negativas > total * 0.4:
-        patrones.append({
-            "tipo": "clima_negativo",
-            "severidad": "media",
-            "mensaje": f"Alta prevalencia de emociones negativas: {emociones_negativas} comentarios",
-            "accion": "Implementar espacios de escucha activa y feedback bidireccional."
-        })
-
-    comentarios_positivos = db.query(func.count(AnalisisComentario.id)).filter(
-        AnalisisComentario.stress_level == "bajo",
-        AnalisisComentario.emotion_label.in_(["joy", "happiness", "neutral"])
-    ).scalar()
-
-    if comentarios_positivos > total * 0.6:
-        patrones.append({
-            "tipo": "tendencia_positiva",
-            "severidad": "baja",
-            "mensaje": f"Ambiente laboral saludable: {comentarios_positivos} comentarios positivos ({(comentarios_positivos/total)*100:.1f}%)",
-            "accion": "Documentar y reforzar prácticas actuales. Reconocer liderazgo efectivo."
-        })
-
-    if not patrones:
-        patrones.append({
-            "tipo": "neutral",
-            "severidad": "baja",
-            "mensaje": "No se detectaron patrones críticos",
-            "accion": "Mantener monitoreo regular."
-        })
-
-    return {
-        "total_comentarios": total,
-        "stress_alto_porcentaje": stress_alto_pct,
-        "patrones_detectados": patrones
-    }
+    # Instantánea precalculada por core/planificadorPatrones.py
+    return snapshotPatrones(db)
+
+def _enSesion(fn, *args):
+    # El flujo SSE dura más que la petición: una sesión corta por consulta
+    with SessionLocal() as db:
+        return fn(db, *args)
+
+@router.get("/alertas/patrones/eventos/")
+async def eventosPatrones(
+    request: Request,
+    desde: Optional[int] = None,
+    last_event_id: Optional[str] = Header(default=None)
+):
+    """
+    Canal SSE: un evento `aparece` o `desaparece` por cada cambio de patrón.
+    Sin `desde` ni Last-Event-ID solo se envían los eventos nuevos; al
+    reconectar, el navegador reanuda desde el último id recibido.
+    """
+    if desde is None and last_event_id and last_event_id.isdigit():
+        desde = int(last_event_id)
+    espera = settings.patterns_sse_poll_seconds
+
+    async def flujo():
+        ultimo = desde if desde is not None else await run_in_threadpool(_enSesion, ultimoEvento)
+        yield f"retry: {int(espera * 1000)}\n\n"
+        inactivo = 0.0
+        while not await request.is_disconnected():
+            eventos = await run_in_threadpool(_enSesion, leerEventos, ultimo)
+            for evento in eventos:
+                ultimo = evento["id"]
+                datos = json.dumps(evento, ensure_ascii=False)
+                yield f"id: {evento['id']}\nevent: {evento['evento']}\ndata: {datos}\n\n"
+            inactivo = 0.0 if eventos else inactivo + espera
+            if inactivo >= 15:
+                # Comentario SSE para que los proxies no cierren la conexión
+                yield ": ping\n\n"
+                inactivo = 0.0
+            await asyncio.sleep(espera)
+
+    return StreamingResponse(
+        flujo(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/alertas/anomalias/")
+def anomaliasEstres(
+    ambito: Optional[str] = None,
+    departamento: Optional[str] = None,
+    solo_anomalias: bool = False,
+    limite: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Puntuaciones del detector EWMA/CUSUM de estrés alto por departamento y
+    equipo (core/detectorAnomalias.py): primero los grupos anómalos.
+    """
+    if ambito is not None and ambito not in (AMBITO_DEPARTAMENTO, AMBITO_EQUIPO):
+        raise HTTPException(status_code=400, detail=f"ambito debe ser '{AMBITO_DEPARTAMENTO}' o '{AMBITO_EQUIPO}'")
+    return leerDetector(db, ambito, departamento, solo_anomalias, limite)
 
 @router.get("/alertas/departamento/{departamento}")
 def alertasDepartamento(departamento: str, db: Session = Depends(get_db)):
-    registros = db.query(AnalisisComentario).filter(
-        AnalisisComentario.departamento == departamento
-    ).all()
-
-    total = len(registros)
+    en_departamento = AnalisisComentario.departamento == departamento
+
+    stress = dict(
+        db.query(AnalisisComentario.stress_level, func.count(AnalisisComentario.id))
+        .filter(en_departamento)
+        .group_by(AnalisisComentario.stress_level)
+        .all()
+    )
+    total = sum(stress.values())
     if total == 0:
         return {"mensaje": "No hay datos para este departamento"}
 
-    stress_alto = sum(1 for r in registros if r.stress_level == "alto")
-    stress_medio = sum(1 for r in registros if r.stress_level == "medio")
-    stress_bajo = sum(1 for r in registros if r.stress_level == "bajo")
-
-    categorias = {}
-    for r in registros:
-        if isinstance(r.categories, list):
-            for cat in r.categories:
-                label = cat.get("label", "")
-                categorias[label] = categorias.get(label, 0) + 1
-
-    top_categorias = sorted(categorias.items(), key=lambda x: x[1], reverse=True)[:3]
+    top_categorias = frecuenciaCategorias(db, en_departamento, limite=3)
+
+    alertas = (
+        db.query(
+            AnalisisComentario.id,
+            AnalisisComentario.comentario,
+            AnalisisComentario.stress_level,
+            AnalisisComentario.summary,
+            AnalisisComentario.fecha
+        )
+        .filter(en_departamento, AnalisisComentario.stress_level == "alto")
+        .order_by(AnalisisComentario.id)
+        .limit(10)
+        .all()
+    )
 
     return {
         "departamento": departamento,
         "total": total,
         "stress": {
-            "alto": stress_alto,
-            "medio": stress_medio,
-            "bajo": stress_bajo
+            "alto": stress.get("alto", 0),
+            "medio": stress.get("medio", 0),
+            "bajo": stress.get("bajo", 0)
         },
         "top_categorias": [{"categoria": c, "count": cnt} for c, cnt in top_categorias],
         "alertas": [{
@@ -176,5 +167,5 @@ def alertasDepartamento(departamento: str, db: Session = Depends(get_db)):
             "stress_level": r.stress_level,
             "summary": r.summary,
             "fecha": r.fecha
-        } for r in registros if r.stress_level == "alto"][:10]
+        } for r in alertas]
     }
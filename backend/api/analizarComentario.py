@@ -4,12 +4,12 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from backend.config.database import get_db
-from backend.ia.iaCore import NLPAnalyzer
+from backend.ia.iaCore import get_analyzer
 from backend.core.coreServices import guardarAnalisis
 
 router = APIRouter(tags=["Analisis"])
 
-analyzer = NLPAnalyzer()
+analyzer = get_analyzer()
 
 class AnalizarPayload(BaseModel):
     comentario: str
@@ -37,3 +37,12 @@ def analizarComentario(payload: AnalizarPayload, db: Session = Depends(get_db)):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/analizar-comentario/cache/")
+def estadisticasCache():
+    return {
+        "memoria": analyzer.cache.stats() if analyzer.cache is not None else {"enabled": False},
+        "persistente": (
+            analyzer.persistent_cache.stats() if analyzer.persistent_cache is not None else {"enabled": False}
+        )
+    }
@@ -1,33 +1,174 @@
 # backend/api/analizarLote.py
-from fastapi import APIRouter, Depends
+from typing import Any, Dict, List, Optional
+import os
+import shutil
+import tempfile
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from backend.config.database import get_db
-from backend.core.coreServices import guardarAnalisis
+from backend.config.settings import settings
+from backend.ia.iaCore import get_analyzer
+from backend.ia.carrilesIA import CarrilSaturado
+from backend.core.coreModels import TrabajoAnalisis
+from backend.core.ingestaLote import resumenLote
+from backend.utils.lectorCSV import leerFilasCSV
+from backend.core.trabajosLote import (
+    ESTADOS_FINALES, LoteEnCurso, crearTrabajo, erroresTrabajo, reintentarTrabajo, resumenTrabajo,
+    streamAnalisis, trabajosSinTerminar
+)
 
 router = APIRouter(
     prefix="/analizar",
     tags=["Análisis"]
 )
 
-@router.post("/lote")
-def analizar_lote(data: list, db=Depends(get_db)):
-    procesados = 0
+NDJSON = "application/x-ndjson"
+
+def _saturado(retry_after: int, detalle: str) -> HTTPException:
+    return HTTPException(status_code=429, detail=detalle, headers={"Retry-After": str(retry_after)})
+
+def _enCurso(e: LoteEnCurso) -> HTTPException:
+    return HTTPException(status_code=409, detail={"mensaje": str(e), "trabajo_id": e.trabajo_id})
 
-    for fila in data:
-        comentario = fila.get("comentario")
-        if not comentario:
-            continue
+def _admitir(db, stream: bool) -> None:
+    """Control de admisión del trabajo masivo: 429 + Retry-After si está saturado."""
+    if stream:
+        try:
+            get_analyzer().carriles.admitir()
+        except CarrilSaturado as e:
+            raise _saturado(e.retry_after, "Carril masivo saturado, reintenta más tarde")
+    elif trabajosSinTerminar(db) >= settings.job_max_pendientes:
+        raise _saturado(settings.job_retry_after, "Demasiados trabajos en cola, reintenta más tarde")
 
-        meta = {
-            "departamento": fila.get("departamento"),
-            "equipo": fila.get("equipo"),
-            "fecha": fila.get("fecha")
-        }
+@router.post("/lote", status_code=202)
+def analizar_lote(
+    data: List[Dict[str, Any]],
+    stream: bool = False,
+    clave_lote: Optional[str] = None,
+    db=Depends(get_db)
+):
+    """
+    Encola las filas y devuelve el id del trabajo; el análisis corre en
+    segundo plano. Con stream=true analiza en la propia petición y devuelve
+    NDJSON, una línea por fila a medida que termina cada bloque.
+    Reenviar con la misma clave_lote omite las filas ya guardadas.
+    """
+    _admitir(db, stream)
+    if stream:
+        return StreamingResponse(
+            streamAnalisis(get_analyzer, data, settings.job_chunk_size, clave_lote=clave_lote),
+            media_type=NDJSON
+        )
 
-        guardarAnalisis(db, comentario, meta)
-        procesados += 1
+    try:
+        trabajo = crearTrabajo(db, data, clave_lote=clave_lote)
+    except LoteEnCurso as e:
+        raise _enCurso(e)
 
     return {
         "success": True,
-        "procesados": procesados,
-        "guardados": procesados
+        "trabajo_id": trabajo.id,
+        "total": trabajo.total,
+        "estado": trabajo.estado
     }
+
+def _abrirCSV(fichero):
+    columnas, filas, formato = leerFilasCSV(fichero)
+    if "comentario" not in columnas:
+        raise HTTPException(status_code=422, detail=f"Falta la columna 'comentario' (columnas: {columnas})")
+    return columnas, filas, formato
+
+def _streamCSV(archivo: UploadFile, clave_lote: Optional[str]) -> StreamingResponse:
+    # FastAPI cierra la subida al volver del endpoint, antes de generar el
+    # cuerpo: se copia (en bloques) a un temporal propio que se borra al final
+    tmp = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+    with tmp:
+        shutil.copyfileobj(archivo.file, tmp)
+
+    fichero = open(tmp.name, "rb")
+
+    def limpiar():
+        fichero.close()
+        os.unlink(tmp.name)
+
+    try:
+        _, filas, _ = _abrirCSV(fichero)
+    except Exception:
+        limpiar()
+        raise
+
+    return StreamingResponse(
+        streamAnalisis(
+            get_analyzer, filas, settings.job_chunk_size,
+            al_terminar=limpiar, clave_lote=clave_lote
+        ),
+        media_type=NDJSON
+    )
+
+@router.post("/csv", status_code=202)
+def analizar_csv(
+    archivo: UploadFile = File(...),
+    stream: bool = False,
+    clave_lote: Optional[str] = None,
+    db=Depends(get_db)
+):
+    """
+    Recibe el CSV como subida multipart y lo lee fila a fila (el archivo ya
+    está volcado a disco por Starlette), encolando las filas por bloques.
+    Con stream=true devuelve los análisis en NDJSON como /analizar/lote.
+    """
+    _admitir(db, stream)
+    if stream:
+        return _streamCSV(archivo, clave_lote)
+
+    columnas, filas, formato = _abrirCSV(archivo.file)
+    try:
+        trabajo = crearTrabajo(db, filas, clave_lote=clave_lote)
+    except LoteEnCurso as e:
+        raise _enCurso(e)
+
+    return {
+        "success": True,
+        "trabajo_id": trabajo.id,
+        "total": trabajo.total,
+        "estado": trabajo.estado,
+        "formato": formato
+    }
+
+@router.get("/trabajos/")
+def listar_trabajos(limite: int = 20, db=Depends(get_db)):
+    trabajos = db.query(TrabajoAnalisis).order_by(TrabajoAnalisis.id.desc()).limit(limite).all()
+    return {"trabajos": [resumenTrabajo(t) for t in trabajos]}
+
+def _trabajo(db, trabajo_id: int) -> TrabajoAnalisis:
+    trabajo = db.get(TrabajoAnalisis, trabajo_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return trabajo
+
+@router.get("/trabajos/{trabajo_id}")
+def estado_trabajo(trabajo_id: int, db=Depends(get_db)):
+    return resumenTrabajo(_trabajo(db, trabajo_id))
+
+@router.get("/trabajos/{trabajo_id}/errores")
+def errores_trabajo(trabajo_id: int, limite: int = 100, db=Depends(get_db)):
+    _trabajo(db, trabajo_id)
+    return {"trabajo_id": trabajo_id, "errores": erroresTrabajo(db, trabajo_id, limite)}
+
+@router.post("/trabajos/{trabajo_id}/reintentar")
+def reintentar_trabajo(trabajo_id: int, db=Depends(get_db)):
+    trabajo = _trabajo(db, trabajo_id)
+    if trabajo.estado not in ESTADOS_FINALES:
+        raise HTTPException(status_code=409, detail="El trabajo sigue en curso")
+    try:
+        return resumenTrabajo(reintentarTrabajo(db, trabajo))
+    except LoteEnCurso as e:
+        raise _enCurso(e)
+
+@router.get("/lotes/{clave_lote}")
+def estado_lote(clave_lote: str, db=Depends(get_db)):
+    """Filas ya guardadas y últimos checkpoints de un lote con clave."""
+    resumen = resumenLote(db, clave_lote)
+    if resumen is None:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return resumen
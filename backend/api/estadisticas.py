@@ -1,15 +1,33 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case
 from typing import Optional
-from datetime import datetime
+from datetime import timedelta
 
 from backend.config.database import get_db
-from backend.core.coreModels import AnalisisComentario
+from backend.core.coreModels import ResumenDiario
+from backend.core.cacheRespuestas import AMBITO_ANALISIS, cacheRespuestas, respuestaCacheada
+from backend.utils.helpers import fechaFiltro
 
 router = APIRouter(tags=["Estadisticas"])
 
+# Todas las lecturas van contra el agregado diario (core/resumenDiario.py)
+R = ResumenDiario
+
+# Clave de fecha reconocida (ISO AAAA-MM-DD); el resto es el texto libre original
+ES_ISO = R.fecha.like("____-__-__")
+
+def _contar(condicion):
+    return func.sum(case((condicion, R.n), else_=0))
+
+def _fecha(nombre, valor):
+    try:
+        return fechaFiltro(nombre, valor)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 @router.get("/estadisticas/")
+@respuestaCacheada(AMBITO_ANALISIS)
 def obtenerEstadisticas(
     departamento: Optional[str] = None,
     equipo: Optional[str] = None,
@@ -17,19 +35,29 @@ def obtenerEstadisticas(
     fecha_fin: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(AnalisisComentario)
-
+    """
+    fecha_inicio / fecha_fin aceptan AAAA-MM-DD, DD/MM/AAAA, AAAA/MM/DD y
+    DD-MM-AAAA; el rango solo cuenta comentarios con fecha reconocida.
+    """
+    fecha_inicio = _fecha("fecha_inicio", fecha_inicio)
+    fecha_fin = _fecha("fecha_fin", fecha_fin)
+
+    filtros = []
     if departamento:
-        query = query.filter(AnalisisComentario.departamento == departamento)
+        filtros.append(R.departamento == departamento)
     if equipo:
-        query = query.filter(AnalisisComentario.equipo == equipo)
+        filtros.append(R.equipo == equipo)
+    if fecha_inicio or fecha_fin:
+        filtros.append(ES_ISO)
     if fecha_inicio:
-        query = query.filter(AnalisisComentario.fecha >= fecha_inicio)
+        filtros.append(R.fecha >= fecha_inicio.isoformat())
     if fecha_fin:
-        query = query.filter(AnalisisComentario.fecha <= fecha_fin)
+        filtros.append(R.fecha <= fecha_fin.isoformat())
 
-    registros = query.all()
-    total = len(registros)
+    total, sum_pos, sum_neu, sum_neg = db.query(
+        func.sum(R.n), func.sum(R.sent_pos), func.sum(R.sent_neu), func.sum(R.sent_neg)
+    ).filter(R.dimension == "total", *filtros).one()
+    total = int(total or 0)
 
     if total == 0:
         return {
@@ -40,44 +68,52 @@ def obtenerEstadisticas(
             "categorias_principales": []
         }
 
-    stress_counts = {"alto": 0, "medio": 0, "bajo": 0}
-    emo_counts = {}
-    sent_sum = {"pos": 0.0, "neu": 0.0, "neg": 0.0}
-    cat_counts = {}
+    def conteos(dimension):
+        return (
+            db.query(R.valor, func.sum(R.n))
+            .filter(R.dimension == dimension, *filtros)
+            .group_by(R.valor)
+        )
 
-    for r in registros:
-        stress_counts[r.stress_level] = stress_counts.get(r.stress_level, 0) + 1
-        emo_counts[r.emotion_label] = emo_counts.get(r.emotion_label, 0) + 1
-        sent_sum["pos"] += r.sent_pos
-        sent_sum["neu"] += r.sent_neu
-        sent_sum["neg"] += r.sent_neg
+    stress_counts = {"alto": 0, "medio": 0, "bajo": 0}
+    for nivel, n in conteos("stress"):
+        stress_counts[nivel] = int(n)
 
-        if isinstance(r.categories, list):
-            for cat in r.categories:
-                label = cat.get("label", "")
-                cat_counts[label] = cat_counts.get(label, 0) + 1
+    emo_counts = {emo: int(n) for emo, n in conteos("emocion")}
 
-    categorias_ord = sorted(cat_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    # Empates: primero la categoría que apareció antes
+    categorias_ord = (
+        conteos("categoria")
+        .order_by(func.sum(R.n).desc(), func.min(R.primer_id))
+        .limit(5)
+        .all()
+    )
 
     return {
         "total": total,
         "stress": stress_counts,
         "emociones": emo_counts,
         "sentimiento_promedio": {
-            "positivo": sent_sum["pos"] / total,
-            "neutral": sent_sum["neu"] / total,
-            "negativo": sent_sum["neg"] / total
+            "positivo": (sum_pos or 0.0) / total,
+            "neutral": (sum_neu or 0.0) / total,
+            "negativo": (sum_neg or 0.0) / total
         },
-        "categorias_principales": [{"categoria": c, "count": cnt} for c, cnt in categorias_ord]
+        "categorias_principales": [{"categoria": c, "count": int(cnt)} for c, cnt in categorias_ord]
     }
 
 @router.get("/estadisticas/departamentos/")
+@respuestaCacheada(AMBITO_ANALISIS)
 def estadisticasPorDepartamento(db: Session = Depends(get_db)):
-    registros = db.query(AnalisisComentario).all()
+    filas = (
+        db.query(R.departamento, R.dimension, R.valor, func.sum(R.n))
+        .filter(R.dimension.in_(["stress", "emocion"]))
+        .group_by(R.departamento, R.dimension, R.valor)
+        .all()
+    )
     dept_data = {}
 
-    for r in registros:
-        dept = r.departamento or "Sin departamento"
+    for departamento, dimension, valor, n in filas:
+        dept = departamento or "Sin departamento"
         if dept not in dept_data:
             dept_data[dept] = {
                 "total": 0,
@@ -87,58 +123,88 @@ def estadisticasPorDepartamento(db: Session = Depends(get_db)):
                 "emociones": {}
             }
 
-        dept_data[dept]["total"] += 1
-        if r.stress_level == "alto":
-            dept_data[dept]["stress_alto"] += 1
-        elif r.stress_level == "medio":
-            dept_data[dept]["stress_medio"] += 1
-        else:
-            dept_data[dept]["stress_bajo"] += 1
+        n = int(n)
+        if dimension == "emocion":
+            dept_data[dept]["emociones"][valor] = dept_data[dept]["emociones"].get(valor, 0) + n
+            continue
 
-        emo = r.emotion_label
-        dept_data[dept]["emociones"][emo] = dept_data[dept]["emociones"].get(emo, 0) + 1
+        dept_data[dept]["total"] += n
+        if valor == "alto":
+            dept_data[dept]["stress_alto"] += n
+        elif valor == "medio":
+            dept_data[dept]["stress_medio"] += n
+        else:
+            dept_data[dept]["stress_bajo"] += n
 
     return dept_data
 
 @router.get("/estadisticas/equipos/")
+@respuestaCacheada(AMBITO_ANALISIS)
 def estadisticasPorEquipo(departamento: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(AnalisisComentario)
+    query = db.query(
+        R.equipo,
+        R.departamento,
+        func.sum(R.n),
+        _contar(R.valor == "alto"),
+        func.min(R.primer_id)
+    ).filter(R.dimension == "stress")
     if departamento:
-        query = query.filter(AnalisisComentario.departamento == departamento)
+        query = query.filter(R.departamento == departamento)
 
-    registros = query.all()
+    # Orden por primera aparición: cada equipo conserva el departamento de su primer comentario
+    filas = query.group_by(R.equipo, R.departamento).order_by(func.min(R.primer_id)).all()
     equipo_data = {}
 
-    for r in registros:
-        eq = r.equipo or "Sin equipo"
+    for equipo, dept, total, alto, _ in filas:
+        eq = equipo or "Sin equipo"
         if eq not in equipo_data:
             equipo_data[eq] = {
                 "total": 0,
                 "stress_alto": 0,
-                "departamento": r.departamento
+                "departamento": dept
             }
 
-        equipo_data[eq]["total"] += 1
-        if r.stress_level == "alto":
-            equipo_data[eq]["stress_alto"] += 1
+        equipo_data[eq]["total"] += int(total or 0)
+        equipo_data[eq]["stress_alto"] += int(alto or 0)
 
     return equipo_data
 
 @router.get("/estadisticas/tendencias/")
+@respuestaCacheada(AMBITO_ANALISIS)
 def obtenerTendencias(
     dias: int = 30,
     departamento: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(AnalisisComentario)
+    """
+    Conteos de estrés por día de los últimos `dias` días con datos, contados
+    hasta la fecha más reciente registrada (no hasta hoy, para que los datos
+    históricos sigan viéndose). Las claves son fechas ISO AAAA-MM-DD; los
+    comentarios cuya fecha no se reconoce quedan fuera de la ventana.
+    """
+    if dias < 1:
+        raise HTTPException(status_code=422, detail="dias debe ser 1 o mayor")
+    ultima = db.query(func.max(R.fecha)).filter(R.dimension == "stress", ES_ISO)
     if departamento:
-        query = query.filter(AnalisisComentario.departamento == departamento)
+        ultima = ultima.filter(R.departamento == departamento)
+    ultima = ultima.scalar()
+    if ultima is None:
+        return {}
+    desde = (fechaFiltro("fecha", ultima) - timedelta(days=dias - 1)).isoformat()
+
+    query = db.query(
+        R.fecha,
+        func.sum(R.n),
+        _contar(R.valor == "alto"),
+        _contar(R.valor == "medio")
+    ).filter(R.dimension == "stress", ES_ISO, R.fecha >= desde)
+    if departamento:
+        query = query.filter(R.departamento == departamento)
 
-    registros = query.order_by(AnalisisComentario.fecha).all()
+    filas = query.group_by(R.fecha).order_by(R.fecha).all()
 
     fechas_data = {}
-    for r in registros:
-        fecha = r.fecha or "Sin fecha"
+    for fecha, total, alto, medio in filas:
         if fecha not in fechas_data:
             fechas_data[fecha] = {
                 "total": 0,
@@ -147,12 +213,15 @@ def obtenerTendencias(
                 "stress_bajo": 0
             }
 
-        fechas_data[fecha]["total"] += 1
-        if r.stress_level == "alto":
-            fechas_data[fecha]["stress_alto"] += 1
-        elif r.stress_level == "medio":
-            fechas_data[fecha]["stress_medio"] += 1
-        else:
-            fechas_data[fecha]["stress_bajo"] += 1
+        total, alto, medio = int(total or 0), int(alto or 0), int(medio or 0)
+        fechas_data[fecha]["total"] += total
+        fechas_data[fecha]["stress_alto"] += alto
+        fechas_data[fecha]["stress_medio"] += medio
+        fechas_data[fecha]["stress_bajo"] += total - alto - medio
 
     return fechas_data
+
+@router.get("/estadisticas/cache/")
+def estadisticasCache():
+    """Aciertos, fallos y entradas de la caché de respuestas de este worker."""
+    return cacheRespuestas.stats()
@@ -1,39 +1,69 @@
 # api/manejarHistoricos.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from backend.config.database import get_db
 from backend.core.coreServices import obtenerHistoricos
-from backend.core.coreModels import AnalisisComentario
+from backend.core.coreModels import AnalisisComentario, ComentarioCategoria, ResumenDiario
+from backend.core.paginacion import HEADER_CURSOR, CursorInvalido, paginar
+from backend.utils.helpers import fechaFiltro
 
 
 router = APIRouter(tags=["Historicos"])
 
+def _fecha(nombre, valor):
+    try:
+        return fechaFiltro(nombre, valor)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 @router.get("/historicos/")
 def historicos(
+    response: Response,
     limit: int = 100,
     departamento: Optional[str] = None,
     equipo: Optional[str] = None,
     fecha_inicio: Optional[str] = None,
     fecha_fin: Optional[str] = None,
     stress_level: Optional[str] = None,
+    categoria: Optional[str] = None,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
+    # Acepta los mismos formatos que la columna `fecha` (utils/helpers.FORMATOS_FECHA)
+    fecha_inicio = _fecha("fecha_inicio", fecha_inicio)
+    fecha_fin = _fecha("fecha_fin", fecha_fin)
+
     query = db.query(AnalisisComentario)
+    columna_id = AnalisisComentario.id
+
+    if categoria:
+        query = query.join(
+            ComentarioCategoria, ComentarioCategoria.analisis_id == AnalisisComentario.id
+        ).filter(ComentarioCategoria.categoria == categoria)
+        # Paginar sobre la clave (categoria, analisis_id): recorre solo esa categoría
+        columna_id = ComentarioCategoria.analisis_id
 
     if departamento:
         query = query.filter(AnalisisComentario.departamento == departamento)
     if equipo:
         query = query.filter(AnalisisComentario.equipo == equipo)
     if fecha_inicio:
-        query = query.filter(AnalisisComentario.fecha >= fecha_inicio)
+        query = query.filter(AnalisisComentario.fecha_dia >= fecha_inicio)
     if fecha_fin:
-        query = query.filter(AnalisisComentario.fecha <= fecha_fin)
+        query = query.filter(AnalisisComentario.fecha_dia <= fecha_fin)
     if stress_level:
         query = query.filter(AnalisisComentario.stress_level == stress_level)
 
-    rows = query.order_by(AnalisisComentario.id.desc()).limit(limit).all()
+    try:
+        rows, next_cursor = paginar(query, columna_id, limit, cursor, after_id, before_id)
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[HEADER_CURSOR] = next_cursor
 
     return [
         {
@@ -71,16 +101,15 @@ def obtenerTextoComentarios(
 
 @router.get("/historicos/categorias/")
 def obtenerTodasCategorias(db: Session = Depends(get_db)):
-    registros = db.query(AnalisisComentario.categories).all()
-    categorias_set = set()
-
-    for r in registros:
-        if isinstance(r[0], list):
-            for cat in r[0]:
-                if isinstance(cat, dict) and "label" in cat:
-                    categorias_set.add(cat["label"])
-
-    return {"categorias": sorted(list(categorias_set))}
+    # El agregado diario tiene una celda por categoría y día: mucho menor que las filas
+    rows = (
+        db.query(ResumenDiario.valor)
+        .filter(ResumenDiario.dimension == "categoria", ResumenDiario.valor != "")
+        .distinct()
+        .order_by(ResumenDiario.valor)
+        .all()
+    )
+    return {"categorias": [r[0] for r in rows]}
 
 @router.get("/historicos/departamentos/")
 def obtenerDepartamentos(db: Session = Depends(get_db)):
@@ -0,0 +1,55 @@
+# api/modelos.py
+from fastapi import APIRouter
+import os
+
+from backend.ia.iaCore import get_analyzer, loaded_registries, torch_threads
+
+router = APIRouter(tags=["Modelos"])
+
+def rssProcesoMB() -> float | None:
+    """Memoria residente actual del worker (Linux); None si no está disponible."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+@router.get("/modelos/memoria/")
+def memoriaModelos():
+    pipelines = [p for registry in loaded_registries() for p in registry.memory_report()]
+    return {
+        "pid": os.getpid(),
+        "registros": len(loaded_registries()),
+        "pipelines": pipelines,
+        "pesos_mb": round(sum(p.get("mb", 0) for p in pipelines), 1),
+        "rss_mb": rssProcesoMB()
+    }
+
+@router.get("/modelos/etapas/")
+def tiemposEtapas():
+    analyzer = get_analyzer()
+    return {
+        "parallel_stages": analyzer.cfg.parallel_stages,
+        "stage_workers": analyzer.cfg.stage_workers,
+        "intra_op_threads": analyzer.cfg.resolved_intra_op_threads(),
+        "torch_threads": torch_threads(),
+        "etapas": analyzer.timings.snapshot()
+    }
+
+@router.get("/modelos/scheduler/")
+def estadisticasScheduler():
+    return {
+        "activos": get_analyzer().models.active_requests(),
+        "modelos": {
+            name: stats for registry in loaded_registries()
+            for name, stats in registry.scheduler_stats().items()
+        }
+    }
+
+@router.get("/modelos/carriles/")
+def estadisticasCarriles():
+    """Profundidad de cola, plazas ocupadas y tiempos de espera por carril."""
+    return get_analyzer().carriles.stats()
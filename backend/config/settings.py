@@ -27,6 +27,72 @@ class Settings(BaseSettings):
 
     summarizer_model: str = "sshleifer/distilbart-cnn-12-6"
 
+    # Warm-up de modelos al arrancar: en segundo plano el worker acepta
+    # conexiones de inmediato y /agente/health/ responde 503 hasta estar listo
+    warmup_models: bool = True
+    warmup_background: bool = True
+
+    # Backend de inferencia de los clasificadores: "torch", "onnx" o "fast"
+    # (modelo estudiante destilado: python -m backend.ia.destilacion entrenar)
+    ia_backend: str = "torch"
+    onnx_cache_dir: str = ".onnx_cache"
+    student_dir: str = ".ia_cache/estudiante"
+    # Motor de categorías: "nli" o "embeddings"
+    category_engine: str = "nli"
+    # Etapas del análisis en paralelo (latencia del chat del agente)
+    parallel_stages: bool = False
+    stage_workers: int = 4
+    # Hilos intra-op de cada modelo (torch, fijados al arrancar, y sesiones ONNX);
+    # 0 = automático: con parallel_stages, núcleos / stage_workers
+    intra_op_threads: int = 0
+    # Micro-batching entre peticiones concurrentes
+    microbatch_enabled: bool = False
+    microbatch_max_size: int = 16
+    microbatch_max_wait_ms: float = 5.0
+
+    # Carriles interactivo / masivo (el chat no espera detrás de las importaciones)
+    lanes_enabled: bool = True
+    lane_slots: int = 4
+    lane_interactive_reserved: int = 1
+    lane_bulk_max_queue: int = 8
+
+    # Trabajos asíncronos de /analizar/lote (0 workers = no se procesan en este proceso)
+    job_workers: int = 1
+    job_chunk_size: int = 64
+    job_lease_seconds: int = 120
+    # Reintentos de un bloque fallido antes de procesarlo fila a fila
+    job_chunk_retries: int = 2
+    # Admisión: con más trabajos sin terminar se responde 429
+    job_max_pendientes: int = 20
+    job_retry_after: int = 30
+
+    # Caché de respuestas de /estadisticas/* y /agente/stats/
+    # (se invalida al escribir; el TTL acota cambios hechos fuera de la API)
+    response_cache_enabled: bool = True
+    response_cache_ttl: float = 300.0
+    response_cache_max_entries: int = 512
+
+    # Patrones de alertas precalculados (/alertas/patrones/ sirve la instantánea)
+    patterns_scheduler: bool = True
+    # Sondeo de la versión de datos (escrituras de otros workers) y espera
+    # tras una escritura local para agrupar las que vienen seguidas
+    patterns_poll_seconds: float = 5.0
+    patterns_debounce_seconds: float = 1.0
+    # POST JSON por cada patrón que aparece o desaparece (vacío = sin webhook)
+    patterns_webhook_url: str = ""
+    patterns_webhook_timeout: float = 5.0
+    # Sondeo de eventos del canal SSE /alertas/patrones/eventos/
+    patterns_sse_poll_seconds: float = 1.0
+
+    # Detector de anomalías de estrés por departamento y equipo (EWMA + CUSUM
+    # sobre la tasa de estrés alto; ver core/detectorAnomalias.py)
+    anomaly_ewma_alpha: float = 0.1
+    anomaly_baseline_alpha: float = 0.01
+    anomaly_cusum_k: float = 0.1
+    anomaly_cusum_h: float = 4.0
+    anomaly_ewma_margin: float = 0.25
+    anomaly_min_samples: int = 20
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,258 @@
+# core/cacheRespuestas.py
+"""
+Caché de respuestas de los endpoints de lectura agregada (/estadisticas/*,
+/agente/stats/), invalidada por escritura.
+
+La tabla `version_datos` guarda un contador por ámbito:
+
+    analisis   sube con guardarAnalisis, insertarAnalisisBulk y reconstruirResumen
+    insights   sube al crear o actualizar insights del agente
+
+El contador es compartido por todos los workers: cada petición lee la
+versión de sus ámbitos (una búsqueda por clave primaria) y solo reutiliza
+la entrada guardada con esa misma versión. La escritura solo marca el
+ámbito; el contador sube justo después de su commit, en una transacción
+propia de una sentencia. Así el lock de la fila de `version_datos` dura lo
+que ese UPDATE y no serializa a los escritores mientras dura su
+transacción. Una lectura entre el commit y la subida guarda datos ya
+nuevos con la versión anterior, que la subida invalida igualmente. La
+caché es por proceso: LRU con tamaño máximo y TTL como tope de antigüedad
+(cubre cambios hechos por SQL a mano, que no suben la versión, y una
+subida que falle tras el commit).
+
+Las peticiones simultáneas a la misma clave sin entrada válida esperan a
+la primera en vez de repetir la agregación.
+
+`suscribirCambios` avisa dentro del proceso, tras cada commit, de los
+ámbitos cuya versión subió en esa transacción (lo usa
+core/planificadorPatrones.py para reevaluar sin esperar al sondeo).
+"""
+
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+import logging
+import threading
+import time
+
+from fastapi import Response
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from backend.config.settings import settings
+from backend.core.coreModels import VersionDatos
+
+logger = logging.getLogger(__name__)
+
+AMBITO_ANALISIS = "analisis"
+AMBITO_INSIGHTS = "insights"
+
+# Ámbitos modificados por la transacción en curso (Session.info)
+_CAMBIOS = "ambitos_modificados"
+_oyentes: List[Callable[[Set[str]], None]] = []
+
+# ==========================================================
+# VERSIÓN DE LOS DATOS
+# ==========================================================
+def subirVersion(db: Session, ambito: str) -> None:
+    """Marca el ámbito como modificado; la versión sube tras el commit de `db`."""
+    db.info.setdefault(_CAMBIOS, set()).add(ambito)
+
+
+def _incrementar(conn, ambito: str) -> None:
+    V = VersionDatos
+    subir = update(V).where(V.ambito == ambito).values(version=V.version + 1)
+    if not conn.execute(subir).rowcount:
+        # Primera escritura del ámbito: crea la fila (otro worker puede ganar)
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(V).values(ambito=ambito, version=1))
+        except IntegrityError:
+            conn.execute(subir)
+
+
+def leerVersiones(db: Session, ambitos: Tuple[str, ...]) -> Tuple[int, ...]:
+    V = VersionDatos
+    versiones = dict(db.execute(select(V.ambito, V.version).where(V.ambito.in_(ambitos))).all())
+    return tuple(versiones.get(a, 0) for a in ambitos)
+
+
+def suscribirCambios(oyente: Callable[[Set[str]], None]) -> None:
+    """`oyente(ambitos)` se llama tras cada commit que subió alguna versión."""
+    _oyentes.append(oyente)
+
+
+@event.listens_for(Session, "after_commit")
+def _avisarCambios(session: Session) -> None:
+    ambitos = session.info.pop(_CAMBIOS, None)
+    if not ambitos:
+        return
+    # Conexión propia: la de la sesión ya cerró su transacción
+    try:
+        with session.get_bind().engine.begin() as conn:
+            for ambito in sorted(ambitos):
+                _incrementar(conn, ambito)
+    except SQLAlchemyError as e:
+        # Los datos ya están confirmados; la caché los verá al caducar el TTL
+        logger.error(f"No se pudo subir la versión de {sorted(ambitos)}: {e}")
+    for oyente in list(_oyentes):
+        try:
+            oyente(ambitos)
+        except Exception as e:
+            logger.error(f"Error avisando de cambios en {sorted(ambitos)}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartarCambios(session: Session) -> None:
+    session.info.pop(_CAMBIOS, None)
+
+# ==========================================================
+# CACHÉ LRU + TTL
+# ==========================================================
+class CacheRespuestas:
+    def __init__(self, max_entradas: int = 512, ttl: float = 300.0, franjas: int = 64):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos: "OrderedDict[Hashable, Tuple[Tuple[int, ...], float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Un cálculo a la vez por clave (franjas de locks, memoria acotada)
+        self._calculando = [threading.Lock() for _ in range(franjas)]
+
+        self.aciertos = 0
+        self.coalescidas = 0
+        self.fallos = 0
+        self.invalidadas = 0
+        self.expiradas = 0
+        self.descartadas = 0
+
+    def _buscar(self, clave: Hashable, version: Tuple[int, ...]) -> Tuple[bool, Any, Optional[str]]:
+        """Sin lock ni métricas. Devuelve (encontrado, valor, motivo del fallo)."""
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return False, None, None
+        version_entrada, expira, valor = entrada
+        if version_entrada != version:
+            del self._datos[clave]
+            return False, None, "invalidada"
+        if expira < time.monotonic():
+            del self._datos[clave]
+            return False, None, "expirada"
+        self._datos.move_to_end(clave)
+        return True, valor, None
+
+    def obtener(self, clave: Hashable, version: Tuple[int, ...]) -> Tuple[bool, Any]:
+        with self._lock:
+            encontrado, valor, motivo = self._buscar(clave, version)
+            if encontrado:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+                if motivo == "invalidada":
+                    self.invalidadas += 1
+                elif motivo == "expirada":
+                    self.expiradas += 1
+            return encontrado, valor
+
+    def guardar(self, clave: Hashable, version: Tuple[int, ...], valor: Any) -> None:
+        with self._lock:
+            self._datos[clave] = (version, time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.descartadas += 1
+
+    def calcular(self, clave: Hashable, version: Tuple[int, ...], fn: Callable[[], Any]) -> Any:
+        """
+        Valor de la clave para esa versión: de la caché o calculándolo. Si
+        otro hilo ya lo está calculando, espera y reutiliza su resultado.
+        """
+        encontrado, valor = self.obtener(clave, version)
+        if encontrado:
+            return valor
+
+        with self._calculando[hash(clave) % len(self._calculando)]:
+            with self._lock:
+                encontrado, valor, _ = self._buscar(clave, version)
+                if encontrado:
+                    self.coalescidas += 1
+                    return valor
+
+            valor = fn()
+            # Los endpoints que capturan sus errores los devuelven como objeto
+            if not (isinstance(valor, dict) and "error" in valor):
+                self.guardar(clave, version, valor)
+            return valor
+
+    def vaciar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "habilitada": settings.response_cache_enabled,
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl_s": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "coalescidas": self.coalescidas,
+                "invalidadas": self.invalidadas,
+                "expiradas": self.expiradas,
+                "descartadas": self.descartadas,
+                "tasa_aciertos": round((self.aciertos + self.coalescidas) / consultas, 4) if consultas else None,
+            }
+
+
+cacheRespuestas = CacheRespuestas(
+    max_entradas=settings.response_cache_max_entries,
+    ttl=settings.response_cache_ttl
+)
+
+# ==========================================================
+# DECORADOR DE ENDPOINTS
+# ==========================================================
+def _valorClave(valor: Any) -> Hashable:
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, (list, tuple)):
+        return tuple(_valorClave(v) for v in valor)
+    return valor
+
+
+def respuestaCacheada(*ambitos: str, cache: Optional[CacheRespuestas] = None):
+    """
+    Cachea un endpoint síncrono por (endpoint, parámetros de la query) y la
+    versión de `ambitos`. Va debajo de @router.get; la función original
+    queda en `__wrapped__` (la usan los benchmarks para medir sin caché).
+    """
+    def decorador(fn):
+        nombre = f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def envoltura(**kwargs):
+            c = cache or cacheRespuestas
+            db = kwargs.get("db")
+            if not settings.response_cache_enabled or db is None:
+                return fn(**kwargs)
+
+            try:
+                version = leerVersiones(db, ambitos)
+            except SQLAlchemyError as e:
+                # BD sin version_datos (sin migrar): se responde sin caché
+                logger.warning(f"Caché de respuestas desactivada para {nombre}: {e}")
+                db.rollback()
+                return fn(**kwargs)
+
+            parametros = tuple(sorted(
+                (k, _valorClave(v)) for k, v in kwargs.items()
+                if not isinstance(v, (Session, Response))
+            ))
+            return c.calcular((nombre, parametros), version, lambda: fn(**kwargs))
+
+        return envoltura
+
+    return decorador
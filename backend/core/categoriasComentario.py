@@ -0,0 +1,113 @@
+# core/categoriasComentario.py
+"""
+Categorías normalizadas: una fila de `comentario_categoria` por
+(categoría, análisis). Se rellena al guardar cada análisis (misma
+transacción que el INSERT), así las frecuencias por categoría y los
+"comentarios con la categoría X" salen de la clave primaria en vez de
+recorrer la columna JSON `categories` fila a fila.
+
+Para los análisis guardados antes de existir la tabla:
+
+    python -m backend.core.categoriasComentario migrar
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from backend.core.coreModels import AnalisisComentario, ComentarioCategoria
+
+logger = logging.getLogger(__name__)
+
+LARGO_CATEGORIA = 128
+
+
+def etiquetasCategoria(categories: Any) -> List[str]:
+    """Etiquetas de la columna JSON `categories` ([{"label": ...}, ...])."""
+    if not isinstance(categories, list):
+        return []
+    return [c.get("label", "") for c in categories if isinstance(c, dict)]
+
+
+def _filasCategorias(analisis_id: int, categories: Any) -> List[Dict[str, Any]]:
+    etiquetas = dict.fromkeys(
+        str(label)[:LARGO_CATEGORIA] for label in etiquetasCategoria(categories) if label
+    )
+    return [{"categoria": label, "analisis_id": analisis_id} for label in etiquetas]
+
+
+def registrarCategorias(db: Session, analisis: Iterable[Tuple[Optional[int], Dict[str, Any]]]) -> None:
+    """Inserta las categorías de análisis recién guardados, como pares (id, columnas). Sin commit."""
+    filas = [
+        fila
+        for analisis_id, columnas in analisis if analisis_id is not None
+        for fila in _filasCategorias(analisis_id, columnas.get("categories"))
+    ]
+    if filas:
+        db.execute(insert(ComentarioCategoria), filas)
+
+
+def frecuenciaCategorias(db: Session, *filtros, limite: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    [(categoria, comentarios)] de más a menos frecuente; en empate, la que
+    apareció antes. `filtros` son condiciones sobre AnalisisComentario.
+    """
+    C = ComentarioCategoria
+    query = db.query(C.categoria, func.count(C.analisis_id))
+    if filtros:
+        query = query.join(AnalisisComentario, AnalisisComentario.id == C.analisis_id).filter(*filtros)
+
+    query = query.group_by(C.categoria).order_by(func.count(C.analisis_id).desc(), func.min(C.analisis_id))
+    if limite:
+        query = query.limit(limite)
+    return [(categoria, n) for categoria, n in query.all()]
+
+
+def migrarCategorias(db: Session, bloque: int = 5000) -> int:
+    """
+    Rellena comentario_categoria desde la columna JSON, por bloques de ids
+    con commit en cada uno. Se puede relanzar: cada bloque reemplaza lo que
+    hubiera de esos análisis. Devuelve los análisis procesados.
+    """
+    A = AnalisisComentario
+    ultimo_id = 0
+    total = 0
+
+    while True:
+        rows = db.execute(
+            select(A.id, A.categories).where(A.id > ultimo_id).order_by(A.id).limit(bloque)
+        ).all()
+        if not rows:
+            break
+
+        ids = [r.id for r in rows]
+        db.execute(delete(ComentarioCategoria).where(ComentarioCategoria.analisis_id.in_(ids)))
+        registrarCategorias(db, ((r.id, {"categories": r.categories}) for r in rows))
+        db.commit()
+
+        ultimo_id = ids[-1]
+        total += len(rows)
+        logger.info(f"comentario_categoria: {total} análisis migrados (hasta id {ultimo_id})")
+
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.config.database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Migración de categorías a comentario_categoria")
+    parser.add_argument("accion", choices=["migrar"])
+    parser.add_argument("--bloque", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    ComentarioCategoria.__table__.create(bind=engine, checkfirst=True)
+
+    with SessionLocal() as db:
+        analisis = migrarCategorias(db, bloque=args.bloque)
+
+    print(f"{analisis} análisis migrados a comentario_categoria")
@@ -1,5 +1,5 @@
 # core/coreModels.py
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Float, Text
+from sqlalchemy import BigInteger, Column, Integer, String, JSON, Date, DateTime, Float, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import Mapped, mapped_column
 from backend.config.database import Base
@@ -26,9 +26,212 @@ class AnalisisComentario(Base):
     departamento: Mapped[str] = mapped_column(String(80), default="")
     equipo: Mapped[str] = mapped_column(String(80), default="")
     fecha: Mapped[str] = mapped_column(String(20), default="")
+    # `fecha` interpretada (None si el texto no es una fecha reconocible)
+    fecha_dia: Mapped[str] = mapped_column(Date, nullable=True)
 
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+    # Índices según las combinaciones de filtros de /historicos/, /alertas/ y /estadisticas/.
+    # Las páginas van por id: tras las igualdades viene `id` (el rango de
+    # fecha_dia se filtra en el propio índice), así que una página filtrada
+    # lee el índice en orden y para en LIMIT en vez de ordenar todo el rango
+    __table_args__ = (
+        Index("idx_departamento_id_fecha", "departamento", "id", "fecha_dia"),
+        Index("idx_stress_id", "stress_level", "id"),
+        Index("idx_departamento_equipo_id_fecha", "departamento", "equipo", "id", "fecha_dia"),
+    )
+
+class CacheInferencia(Base):
+    """Resultados de NLPAnalyzer por (hash del texto limpio, huella de modelos)"""
+    __tablename__ = "cache_inferencia"
+
+    clave: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version_modelos: Mapped[str] = mapped_column(String(16), primary_key=True)
+    resultado: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+class TrabajoAnalisis(Base):
+    """Trabajo asíncrono de análisis masivo (POST /analizar/lote)"""
+    __tablename__ = "trabajos_analisis"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # recibiendo -> pendiente -> en_proceso -> completado | parcial (algún bloque falló) | fallido
+    estado: Mapped[str] = mapped_column(String(16), nullable=False, default="pendiente", index=True)
+    # Clave del cliente para reanudar el lote sin duplicar filas
+    clave_lote: Mapped[str] = mapped_column(String(128), nullable=True, index=True)
+
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    procesados: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    guardados: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    errores: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    omitidas: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+
+    # Lo renueva el worker en cada lote; si caduca, el trabajo se reencola
+    heartbeat: Mapped[str] = mapped_column(DateTime, nullable=True)
+    intentos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    started_at: Mapped[str] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[str] = mapped_column(DateTime, nullable=True)
+
+class FilaTrabajo(Base):
+    """Fila de entrada de un trabajo, con su resultado individual"""
+    __tablename__ = "filas_trabajo"
+    __table_args__ = (Index("idx_trabajo_estado_indice", "trabajo_id", "estado", "indice"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    trabajo_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    indice: Mapped[int] = mapped_column(Integer, nullable=False)
+    datos: Mapped[dict] = mapped_column(JSON, nullable=False)
+    hash_fila: Mapped[str] = mapped_column(String(64), nullable=True)
+
+    # pendiente | ok | omitida (ya guardada por un envío anterior del lote) | error
+    estado: Mapped[str] = mapped_column(String(16), nullable=False, default="pendiente")
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    analisis_id: Mapped[int] = mapped_column(Integer, nullable=True)
+
+class FilaLote(Base):
+    """Huella de contenido de cada fila ya guardada de un lote con clave"""
+    __tablename__ = "filas_lote"
+
+    clave_lote: Mapped[str] = mapped_column(String(128), primary_key=True)
+    hash_fila: Mapped[str] = mapped_column(String(64), primary_key=True)
+    analisis_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+class ReservaLote(Base):
+    """Clave de lote en uso por un trabajo sin terminar (un trabajo por lote a la vez)"""
+    __tablename__ = "reservas_lote"
+
+    clave_lote: Mapped[str] = mapped_column(String(128), primary_key=True)
+    trabajo_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+class CheckpointLote(Base):
+    """Bloque confirmado de un lote con clave"""
+    __tablename__ = "checkpoints_lote"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    clave_lote: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
+    indice_inicio: Mapped[int] = mapped_column(Integer, nullable=False)
+    indice_fin: Mapped[int] = mapped_column(Integer, nullable=False)
+    guardadas: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    omitidas: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+class ComentarioCategoria(Base):
+    """Categorías de cada análisis, normalizadas desde la columna JSON"""
+    __tablename__ = "comentario_categoria"
+
+    categoria: Mapped[str] = mapped_column(String(128), primary_key=True)
+    analisis_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    __table_args__ = (
+        Index("idx_comentario_categoria_analisis", "analisis_id"),
+    )
+
+class ResumenDiario(Base):
+    """
+    Agregado diario por (fecha, departamento, equipo). Cada celda cuenta los
+    comentarios de una dimensión ("total", "stress", "emocion",
+    "stress_emocion", "categoria") con un valor concreto y acumula su
+    sentimiento.
+    """
+    __tablename__ = "resumen_diario"
+
+    fecha: Mapped[str] = mapped_column(String(20), primary_key=True)
+    departamento: Mapped[str] = mapped_column(String(80), primary_key=True)
+    equipo: Mapped[str] = mapped_column(String(80), primary_key=True)
+    dimension: Mapped[str] = mapped_column(String(16), primary_key=True)
+    valor: Mapped[str] = mapped_column(String(128), primary_key=True)
+
+    n: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sent_pos: Mapped[float] = mapped_column(Float(53), nullable=False, default=0.0)
+    sent_neu: Mapped[float] = mapped_column(Float(53), nullable=False, default=0.0)
+    sent_neg: Mapped[float] = mapped_column(Float(53), nullable=False, default=0.0)
+    primer_id: Mapped[int] = mapped_column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("idx_resumen_dimension", "dimension", "valor"),
+    )
+
+class VersionDatos(Base):
+    """Contador por ámbito que sube con cada escritura (invalida core/cacheRespuestas.py)"""
+    __tablename__ = "version_datos"
+
+    ambito: Mapped[str] = mapped_column(String(32), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+class PatronAlerta(Base):
+    """Patrón de /alertas/patrones/ desde que aparece hasta que desaparece"""
+    __tablename__ = "patrones_alerta"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # tipo, o tipo:departamento en las reglas por departamento
+    clave: Mapped[str] = mapped_column(String(128), nullable=False)
+    tipo: Mapped[str] = mapped_column(String(32), nullable=False)
+    severidad: Mapped[str] = mapped_column(String(16), nullable=False)
+    departamento: Mapped[str] = mapped_column(String(80), nullable=True)
+    mensaje: Mapped[str] = mapped_column(Text)
+    accion: Mapped[str] = mapped_column(Text)
+
+    activo: Mapped[bool] = mapped_column(Integer, nullable=False, default=1)
+    detectado_en: Mapped[str] = mapped_column(DateTime, nullable=False)
+    actualizado_en: Mapped[str] = mapped_column(DateTime, nullable=False)
+    resuelto_en: Mapped[str] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_patron_activo_clave", "activo", "clave"),
+    )
+
+class EventoPatron(Base):
+    """Aparición o desaparición de un patrón (webhook y /alertas/patrones/eventos/)"""
+    __tablename__ = "eventos_patron"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    patron_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # aparece | desaparece
+    evento: Mapped[str] = mapped_column(String(16), nullable=False)
+    datos: Mapped[dict] = mapped_column(JSON, nullable=False)
+    creado_en: Mapped[str] = mapped_column(DateTime, nullable=False)
+
+class SnapshotPatrones(Base):
+    """Última respuesta de /alertas/patrones/ (una sola fila, id = 1)"""
+    __tablename__ = "snapshot_patrones"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # version_datos del ámbito "analisis" con la que se evaluó
+    version_datos: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    respuesta: Mapped[dict] = mapped_column(JSON, nullable=False)
+    evaluado_en: Mapped[str] = mapped_column(DateTime, nullable=False)
+
+class EstadoDetector(Base):
+    """
+    Estado online de la tasa de estrés alto de un departamento (equipo = "")
+    o de un equipo: EWMA rápida, línea base lenta y CUSUM (core/detectorAnomalias.py)
+    """
+    __tablename__ = "detector_estres"
+
+    ambito: Mapped[str] = mapped_column(String(16), primary_key=True)
+    departamento: Mapped[str] = mapped_column(String(80), primary_key=True)
+    equipo: Mapped[str] = mapped_column(String(80), primary_key=True)
+
+    n: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ewma: Mapped[float] = mapped_column(Float(53), nullable=False, default=0.0)
+    base: Mapped[float] = mapped_column(Float(53), nullable=False, default=0.0)
+    cusum: Mapped[float] = mapped_column(Float(53), nullable=False, default=0.0)
+
+    anomala: Mapped[bool] = mapped_column(Integer, nullable=False, default=0)
+    anomala_desde: Mapped[str] = mapped_column(DateTime, nullable=True)
+    actualizado_en: Mapped[str] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_detector_anomala", "anomala", "cusum"),
+    )
+
 class UsuarioRRHH(Base):
     __tablename__ = "usuarios_rrhh"
 
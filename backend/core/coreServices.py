@@ -1,47 +1,156 @@
 # core/coreServices.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from sqlalchemy import insert, text
 from sqlalchemy.orm import Session
 from backend.core.coreModels import AnalisisComentario  # ✔ IMPORT CORRECTO
+from backend.core.resumenDiario import acumularResumen
+from backend.core.detectorAnomalias import actualizarDetector
+from backend.core.categoriasComentario import registrarCategorias
+from backend.core.cacheRespuestas import AMBITO_ANALISIS, subirVersion
+from backend.utils.helpers import parsearFecha
 import logging
 
 logger = logging.getLogger(__name__)
 
-def guardarAnalisis(db: Session, payload: Dict[str, Any]) -> AnalisisComentario:
+def filaAnalisis(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Columnas de analisis_comentarios a partir de un resultado de NLPAnalyzer"""
     stress = payload.get("stress", {})
     sent = stress.get("sentiment_dist", {})
-    cats = payload.get("categories", [])
-
-    row = AnalisisComentario(
-        comentario     = payload.get("meta", {}).get("comentario_original", "") or payload.get("meta", {}).get("comentario", ""),
-        emotion_label  = payload.get("emotion", {}).get("label", ""),
-        emotion_score  = payload.get("emotion", {}).get("score", 0.0),
-        stress_level   = stress.get("level", "desconocido"),
-        sent_pos       = float(sent.get("positive", 0.0) or 0.0),
-        sent_neu       = float(sent.get("neutral", 0.0) or 0.0),
-        sent_neg       = float(sent.get("negative", 0.0) or 0.0),
-        categories     = cats,
-        summary        = payload.get("summary", ""),
-        suggestion     = payload.get("suggestion", ""),
-        departamento   = payload.get("meta", {}).get("departamento", ""),
-        equipo         = payload.get("meta", {}).get("equipo", ""),
-        fecha          = payload.get("meta", {}).get("fecha", "")
-    )
+    meta = payload.get("meta", {})
+
+    return {
+        "comentario":    meta.get("comentario_original", "") or meta.get("comentario", ""),
+        "emotion_label": payload.get("emotion", {}).get("label", ""),
+        "emotion_score": payload.get("emotion", {}).get("score", 0.0),
+        "stress_level":  stress.get("level", "desconocido"),
+        "sent_pos":      float(sent.get("positive", 0.0) or 0.0),
+        "sent_neu":      float(sent.get("neutral", 0.0) or 0.0),
+        "sent_neg":      float(sent.get("negative", 0.0) or 0.0),
+        "categories":    payload.get("categories", []),
+        "summary":       payload.get("summary", ""),
+        "suggestion":    payload.get("suggestion", ""),
+        "departamento":  meta.get("departamento", ""),
+        "equipo":        meta.get("equipo", ""),
+        "fecha":         meta.get("fecha", ""),
+        "fecha_dia":     parsearFecha(meta.get("fecha"))
+    }
+
+def guardarAnalisis(db: Session, payload: Dict[str, Any]) -> AnalisisComentario:
+    fila = filaAnalisis(payload)
+    row = AnalisisComentario(**fila)
     db.add(row)
+    db.flush()
+    acumularResumen(db, [(row.id, fila)])
+    actualizarDetector(db, [(row.id, fila)])
+    registrarCategorias(db, [(row.id, fila)])
+    subirVersion(db, AMBITO_ANALISIS)
     db.commit()
     db.refresh(row)
     return row
 
-def guardarAnalisisLote(db: Session, resultados: List[Dict[str, Any]]) -> int:
-    count = 0
-    for i, r in enumerate(resultados):
+# ============================================================
+# INSERCIÓN MASIVA
+# ============================================================
+
+# Paso entre los ids de un INSERT multi-fila en MySQL, por engine (None: no fiable)
+_pasosAutoincremento: Dict[Any, Optional[int]] = {}
+
+def _pasoAutoincremento(db: Session) -> Optional[int]:
+    """
+    @@auto_increment_increment si InnoDB asigna ids consecutivos (con ese
+    paso) a un INSERT multi-fila, es decir con innodb_autoinc_lock_mode 0
+    o 1. Con el modo 2 (por defecto en MySQL 8) los INSERT concurrentes
+    pueden intercalar sus ids y se devuelve None.
+    """
+    bind = db.get_bind()
+    engine = getattr(bind, "engine", bind)
+    if engine not in _pasosAutoincremento:
+        paso, modo = db.execute(text("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode")).one()
+        _pasosAutoincremento[engine] = int(paso) if int(modo) in (0, 1) else None
+        if _pasosAutoincremento[engine] is None:
+            logger.warning(
+                "innodb_autoinc_lock_mode=2: los ids de un INSERT multi-fila pueden no ser "
+                "consecutivos, la inserción masiva inserta fila a fila (usa el modo 1 para evitarlo)"
+            )
+    return _pasosAutoincremento[engine]
+
+def _insertarFilas(db: Session, filas: List[Dict[str, Any]]) -> List[int]:
+    """Un INSERT multi-fila; devuelve los ids en el orden de `filas`"""
+    dialect = db.get_bind().dialect
+    stmt = insert(AnalisisComentario)
+
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        # SQLite, MariaDB, PostgreSQL: RETURNING con orden garantizado
+        result = db.execute(stmt.returning(AnalisisComentario.id, sort_by_parameter_order=True), filas)
+        return list(result.scalars())
+
+    paso = _pasoAutoincremento(db) if dialect.name == "mysql" else None
+    if paso is not None:
+        # MySQL no tiene RETURNING. Con lock_mode 0/1 un INSERT ... VALUES de
+        # n filas reserva n ids seguidos (de `paso` en `paso`); lastrowid es el primero
+        first = db.execute(stmt.values(filas)).lastrowid
+        return list(range(first, first + paso * len(filas), paso))
+
+    return [db.execute(stmt.values(**fila)).inserted_primary_key[0] for fila in filas]
+
+def insertarAnalisisBulk(
+    db: Session,
+    resultados: List[Dict[str, Any]],
+    chunk_size: int = 500,
+    commit: bool = True
+) -> List[Optional[int]]:
+    """
+    Persiste resultados con INSERTs multi-fila en transacciones por bloque
+    (cada bloque actualiza también resumen_diario, detector_estres y
+    comentario_categoria en su savepoint).
+    Si un bloque falla se reintenta fila a fila (cada una en su savepoint)
+    para que una fila defectuosa no tumbe al resto. Devuelve los ids en el
+    orden de entrada (None en las filas que no se pudieron guardar).
+    Con commit=False el llamador confirma la transacción.
+    La versión de datos sube justo antes de cada commit (o una vez al final
+    con commit=False), después de las filas de resumen_diario.
+    """
+    ids: List[Optional[int]] = []
+
+    for start in range(0, len(resultados), chunk_size):
+        chunk = resultados[start:start + chunk_size]
         try:
-            guardarAnalisis(db, r)
-            count += 1
-            logger.info(f"Registro {i+1} guardado exitosamente")
+            filas = [filaAnalisis(r) for r in chunk]
+            with db.begin_nested():
+                chunk_ids = _insertarFilas(db, filas)
+                acumularResumen(db, zip(chunk_ids, filas))
+                actualizarDetector(db, zip(chunk_ids, filas))
+                registrarCategorias(db, zip(chunk_ids, filas))
+            ids.extend(chunk_ids)
         except Exception as e:
-            logger.error(f"Error guardando registro {i+1}: {e}")
-            logger.error(f"Datos del registro: {r}")
-            db.rollback()
+            logger.warning(f"Bloque {start}-{start + len(chunk)} fallido, se guarda fila a fila: {e}")
+            for i, r in enumerate(chunk, start=start):
+                try:
+                    fila = filaAnalisis(r)
+                    with db.begin_nested():
+                        fila_ids = _insertarFilas(db, [fila])
+                        acumularResumen(db, zip(fila_ids, [fila]))
+                        actualizarDetector(db, zip(fila_ids, [fila]))
+                        registrarCategorias(db, zip(fila_ids, [fila]))
+                    ids.extend(fila_ids)
+                except Exception as row_error:
+                    logger.error(f"Error guardando registro {i+1}: {row_error}")
+                    ids.append(None)
+
+        if commit:
+            if any(i is not None for i in ids[start:]):
+                subirVersion(db, AMBITO_ANALISIS)
+            db.commit()
+
+    if not commit and any(i is not None for i in ids):
+        subirVersion(db, AMBITO_ANALISIS)
+
+    return ids
+
+def guardarAnalisisLote(db: Session, resultados: List[Dict[str, Any]]) -> int:
+    ids = insertarAnalisisBulk(db, resultados)
+    count = sum(1 for i in ids if i is not None)
+    logger.info(f"{count}/{len(resultados)} registros guardados")
     return count
 
 def obtenerHistoricos(db: Session, limit: int = 200) -> List[AnalisisComentario]:
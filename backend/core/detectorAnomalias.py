@@ -0,0 +1,363 @@
+# core/detectorAnomalias.py
+"""
+Detector online de anomalías en la tasa de estrés alto, por departamento y
+por equipo.
+
+Cada grupo guarda un estado de tamaño fijo en `detector_estres`:
+
+    n       muestras vistas
+    ewma    media exponencial rápida de "estrés alto" (1) / otro (0)
+    base    media exponencial lenta: la tasa habitual del grupo
+    cusum   CUSUM unilateral de las subidas sobre la base:
+            S = max(0, S + x - base - k)
+
+Las primeras `anomaly_min_samples` muestras son calentamiento (media
+simple, sin CUSUM). Después el grupo es anómalo si S > h (deriva sostenida)
+o si ewma - base > margen (salto brusco).
+
+guardarAnalisis e insertarAnalisisBulk llaman a `actualizarDetector` en la
+transacción del INSERT: solo se leen y bloquean las filas de los grupos
+afectados, así que el coste por análisis no depende del número de equipos
+ni del histórico. Para recalcularlo (por ejemplo tras cambiar los
+parámetros o cargar datos por SQL):
+
+    python -m backend.core.detectorAnomalias reconstruir
+
+La reconstrucción repite la actualización online: recorre
+analisis_comentarios en orden de id con una muestra por comentario, así que
+llega al mismo estado (y a las mismas alertas) que las escrituras de la
+API. Las rachas de muestras iguales de un grupo se aplican en forma
+cerrada (`_pasos`): el coste es una lectura secuencial de tres columnas.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from backend.config.settings import settings
+from backend.core.coreModels import AnalisisComentario, EstadoDetector
+
+logger = logging.getLogger(__name__)
+
+AMBITO_DEPARTAMENTO = "departamento"
+AMBITO_EQUIPO = "equipo"
+CLAVE = ("ambito", "departamento", "equipo")
+
+Clave = Tuple[str, str, str]
+
+
+class ParametrosDetector(NamedTuple):
+    alpha: float
+    alpha_base: float
+    k: float
+    h: float
+    margen: float
+    min_muestras: int
+
+
+def parametrosDetector() -> ParametrosDetector:
+    return ParametrosDetector(
+        alpha=settings.anomaly_ewma_alpha,
+        alpha_base=settings.anomaly_baseline_alpha,
+        k=settings.anomaly_cusum_k,
+        h=settings.anomaly_cusum_h,
+        margen=settings.anomaly_ewma_margin,
+        min_muestras=settings.anomaly_min_samples
+    )
+
+
+def ahora() -> datetime:
+    # Misma convención que el resto de marcas del backend: UTC sin zona
+    return datetime.utcnow()
+
+# ==========================================================
+# ESTADO
+# ==========================================================
+def _claves(departamento: Any, equipo: Any) -> List[Clave]:
+    departamento = str(departamento or "")[:80]
+    equipo = str(equipo or "")[:80]
+    claves = [(AMBITO_DEPARTAMENTO, departamento, "")]
+    if equipo:
+        claves.append((AMBITO_EQUIPO, departamento, equipo))
+    return claves
+
+
+def _paso(estado: Dict[str, float], x: float, p: ParametrosDetector) -> None:
+    """Añade una muestra x (1 = estrés alto; fraccionaria al reconstruir)."""
+    n = estado["n"]
+    if n < p.min_muestras:
+        # Calentamiento: media simple como punto de partida de ambas medias
+        estado["ewma"] += (x - estado["ewma"]) / (n + 1)
+        estado["base"] = estado["ewma"]
+    else:
+        estado["cusum"] = max(0.0, estado["cusum"] + x - estado["base"] - p.k)
+        estado["ewma"] += p.alpha * (x - estado["ewma"])
+        estado["base"] += p.alpha_base * (x - estado["base"])
+    estado["n"] = n + 1
+
+
+def _primero(r: int, cumple) -> int:
+    """Primer t de [0, r) con cumple(t), o r; cumple debe ser monótona (falso → cierto)."""
+    lo, hi = 0, r
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if cumple(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _pasos(estado: Dict[str, float], x: float, veces: int, p: ParametrosDetector) -> None:
+    """
+    Equivale a `veces` llamadas a _paso con la misma x, en forma cerrada:
+    el coste no depende de `veces`.
+    """
+    n = estado["n"]
+    calentamiento = min(veces, max(0, p.min_muestras - n))
+    if calentamiento:
+        estado["ewma"] = (estado["ewma"] * n + x * calentamiento) / (n + calentamiento)
+        estado["base"] = estado["ewma"]
+    r = veces - calentamiento
+    if r:
+        # En el paso t, base_t = x - D·q^t y el incremento del CUSUM es
+        # d_t = D·q^t - k: monótono en t, cambia de signo como mucho una vez
+        D, q = x - estado["base"], 1.0 - p.alpha_base
+
+        def suma(a: int, b: int) -> float:
+            geometrica = (b - a) if q == 1.0 else (q ** a - q ** b) / (1.0 - q)
+            return D * geometrica - p.k * (b - a)
+
+        if D > 0 and q < 1.0:
+            # Primero suben (sin recorte) y luego bajan (recorte en 0 al final)
+            t = _primero(r, lambda t: D * q ** t - p.k <= 0)
+            estado["cusum"] = max(0.0, estado["cusum"] + suma(0, t) + suma(t, r))
+        else:
+            # Primero bajan (recorte en 0) y luego, si acaso, suben
+            t = _primero(r, lambda t: D * q ** t - p.k > 0)
+            estado["cusum"] = max(0.0, estado["cusum"] + suma(0, t)) + suma(t, r)
+        estado["ewma"] += (1.0 - (1.0 - p.alpha) ** r) * (x - estado["ewma"])
+        estado["base"] += (1.0 - q ** r) * D
+    estado["n"] = n + veces
+
+
+def motivosAnomalia(estado: Dict[str, float], p: ParametrosDetector) -> List[str]:
+    if estado["n"] < p.min_muestras:
+        return []
+    motivos = []
+    if estado["cusum"] > p.h:
+        motivos.append("cusum")
+    if estado["ewma"] - estado["base"] > p.margen:
+        motivos.append("ewma")
+    return motivos
+
+
+def _estado(fila: EstadoDetector) -> Dict[str, float]:
+    return {"n": fila.n or 0, "ewma": fila.ewma or 0.0, "base": fila.base or 0.0, "cusum": fila.cusum or 0.0}
+
+
+def _aplicar(fila: EstadoDetector, estado: Dict[str, float], p: ParametrosDetector, momento: datetime) -> None:
+    fila.n, fila.ewma, fila.base, fila.cusum = estado["n"], estado["ewma"], estado["base"], estado["cusum"]
+    anomala = bool(motivosAnomalia(estado, p))
+    if anomala and not fila.anomala:
+        fila.anomala_desde = momento
+    elif not anomala:
+        fila.anomala_desde = None
+    fila.anomala = int(anomala)
+    fila.actualizado_en = momento
+
+# ==========================================================
+# ACTUALIZACIÓN ONLINE
+# ==========================================================
+def _bloquear(db: Session, claves: List[Clave]) -> List[EstadoDetector]:
+    D = EstadoDetector
+    return (
+        db.query(D)
+        .filter(tuple_(D.ambito, D.departamento, D.equipo).in_(claves))
+        .with_for_update()
+        .all()
+    )
+
+
+def _crearFilas(db: Session, claves: List[Clave]) -> None:
+    """Crea los estados que falten; si otro escritor se adelanta, no pasa nada."""
+    T = EstadoDetector.__table__
+    filas = [dict(zip(CLAVE, clave)) for clave in claves]
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as insert_mysql
+        stmt = insert_mysql(T).on_duplicate_key_update(n=T.c.n)
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+        else:
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+        stmt = insert_dialecto(T).on_conflict_do_nothing(index_elements=list(CLAVE))
+    else:
+        for fila in filas:
+            if db.get(EstadoDetector, tuple(fila[c] for c in CLAVE)) is None:
+                db.add(EstadoDetector(**fila))
+        db.flush()
+        return
+
+    db.execute(stmt, filas)
+
+
+def _plegar(clave: Clave) -> Clave:
+    # Como la intercalación _ci de MySQL: "Ventas" y "ventas " son el mismo grupo
+    return tuple(c.casefold().rstrip() for c in clave)
+
+
+def actualizarDetector(db: Session, analisis: Iterable[Tuple[Optional[int], Dict[str, Any]]]) -> None:
+    """
+    Añade al detector los análisis recién insertados, como pares (id,
+    columnas) en orden de id. Sin commit: va en la transacción del INSERT.
+    """
+    muestras: Dict[Clave, List[float]] = {}
+    originales: Dict[Clave, Clave] = {}
+    for analisis_id, fila in analisis:
+        if analisis_id is None:
+            continue
+        x = 1.0 if fila.get("stress_level") == "alto" else 0.0
+        for clave in _claves(fila.get("departamento"), fila.get("equipo")):
+            plegada = _plegar(clave)
+            originales.setdefault(plegada, clave)
+            muestras.setdefault(plegada, []).append(x)
+    if not muestras:
+        return
+
+    # Primero el upsert de todas las claves y después un único bloqueo, en
+    # orden fijo entre escritores (el del índice, con claves plegadas): un FOR UPDATE sobre claves aún inexistentes
+    # toma gap locks en InnoDB, y dos escritores que luego insertan en el
+    # mismo hueco se bloquean mutuamente
+    claves = [originales[c] for c in sorted(originales)]
+    _crearFilas(db, claves)
+    filas = {_plegar((f.ambito, f.departamento, f.equipo)): f for f in _bloquear(db, claves)}
+
+    p = parametrosDetector()
+    momento = ahora()
+    for plegada, xs in muestras.items():
+        fila = filas.get(plegada)
+        if fila is None:
+            continue
+        estado = _estado(fila)
+        for x in xs:
+            _paso(estado, x, p)
+        _aplicar(fila, estado, p, momento)
+
+# ==========================================================
+# RECONSTRUCCIÓN Y LECTURA
+# ==========================================================
+def reconstruirDetector(db: Session, bloque: int = 5000) -> int:
+    """
+    Recalcula detector_estres desde analisis_comentarios, con commit.
+    Devuelve los grupos resultantes.
+    """
+    A = AnalisisComentario
+    p = parametrosDetector()
+    estados: Dict[Clave, Dict[str, float]] = {}
+    originales: Dict[Clave, Clave] = {}
+    # Racha pendiente por grupo: [x, muestras seguidas con esa x]
+    rachas: Dict[Clave, List[float]] = {}
+    total = 0
+
+    consulta = select(A.departamento, A.equipo, A.stress_level).order_by(A.id)
+    for departamento, equipo, stress_level in db.execute(consulta.execution_options(yield_per=bloque)):
+        x = 1.0 if stress_level == "alto" else 0.0
+        total += 1
+        for clave in _claves(departamento, equipo):
+            plegada = _plegar(clave)
+            originales.setdefault(plegada, clave)
+            racha = rachas.get(plegada)
+            if racha is not None and racha[0] == x:
+                racha[1] += 1
+                continue
+            estado = estados.setdefault(plegada, {"n": 0, "ewma": 0.0, "base": 0.0, "cusum": 0.0})
+            if racha is not None:
+                _pasos(estado, racha[0], int(racha[1]), p)
+            rachas[plegada] = [x, 1]
+    for plegada, (x, veces) in rachas.items():
+        _pasos(estados[plegada], x, int(veces), p)
+
+    momento = ahora()
+    filas = []
+    for clave, estado in sorted((originales[c], e) for c, e in estados.items()):
+        anomala = bool(motivosAnomalia(estado, p))
+        filas.append({
+            **dict(zip(CLAVE, clave)), **estado,
+            "anomala": int(anomala),
+            "anomala_desde": momento if anomala else None,
+            "actualizado_en": momento
+        })
+
+    db.execute(delete(EstadoDetector))
+    if filas:
+        db.execute(insert(EstadoDetector), filas)
+    db.commit()
+
+    logger.info(f"detector_estres reconstruido: {total} comentarios, {len(filas)} grupos")
+    return len(filas)
+
+
+def leerDetector(
+    db: Session,
+    ambito: Optional[str] = None,
+    departamento: Optional[str] = None,
+    solo_anomalias: bool = False,
+    limite: int = 100
+) -> Dict[str, Any]:
+    """Puntuaciones actuales, primero los grupos anómalos y los de mayor CUSUM."""
+    D = EstadoDetector
+    filtros = []
+    if ambito:
+        filtros.append(D.ambito == ambito)
+    if departamento is not None:
+        filtros.append(D.departamento == departamento)
+
+    anomalias = db.query(func.count()).select_from(D).filter(D.anomala == 1, *filtros).scalar()
+    query = db.query(D).filter(*filtros)
+    if solo_anomalias:
+        query = query.filter(D.anomala == 1)
+    filas = query.order_by(D.anomala.desc(), D.cusum.desc()).limit(max(1, limite)).all()
+
+    p = parametrosDetector()
+    grupos = []
+    for fila in filas:
+        estado = _estado(fila)
+        grupos.append({
+            "ambito": fila.ambito,
+            "departamento": fila.departamento,
+            "equipo": fila.equipo or None,
+            "muestras": fila.n,
+            "tasa_ewma": fila.ewma,
+            "tasa_base": fila.base,
+            "desviacion": fila.ewma - fila.base,
+            "cusum": fila.cusum,
+            "anomala": bool(fila.anomala),
+            "motivos": motivosAnomalia(estado, p),
+            "anomala_desde": fila.anomala_desde.isoformat() if fila.anomala_desde else None
+        })
+
+    return {"parametros": p._asdict(), "anomalias": anomalias, "grupos": grupos}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.config.database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Detector de anomalías de estrés por departamento y equipo")
+    parser.add_argument("accion", choices=["reconstruir"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    EstadoDetector.__table__.create(bind=engine, checkfirst=True)
+
+    with SessionLocal() as db:
+        grupos = reconstruirDetector(db)
+
+    print(f"{grupos} grupos en detector_estres")
@@ -0,0 +1,103 @@
+# core/ingestaLote.py
+"""
+Ingesta idempotente y reanudable de lotes.
+
+El cliente identifica cada lote con una clave propia (`clave_lote`). Cada
+fila guardada deja su huella de contenido en `filas_lote` y cada bloque
+confirmado deja un checkpoint en `checkpoints_lote`, en la misma
+transacción que los análisis. Al reenviar el mismo lote, las filas cuya
+huella ya existe se omiten antes de analizarlas: reintentar una
+importación fallida solo cuesta el trabajo que faltaba.
+
+La huella incluye el número de aparición del contenido dentro del lote,
+así dos comentarios idénticos legítimos no se confunden entre sí.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from backend.core.coreModels import CheckpointLote, FilaLote
+
+CAMPOS_HUELLA = ("comentario", "departamento", "equipo", "fecha")
+
+
+class HuellaFilas:
+    """Calcula huellas de filas en orden, contando repeticiones del mismo contenido."""
+
+    def __init__(self):
+        self._vistas: Counter = Counter()
+
+    def __call__(self, fila: Dict[str, Any]) -> str:
+        contenido = json.dumps(
+            [str((fila or {}).get(campo) or "").strip() for campo in CAMPOS_HUELLA],
+            ensure_ascii=False
+        )
+        aparicion = self._vistas[contenido]
+        self._vistas[contenido] += 1
+        return hashlib.sha256(f"{contenido}#{aparicion}".encode("utf-8")).hexdigest()
+
+
+def filasPersistidas(db: Session, clave_lote: str, huellas: Iterable[str]) -> Dict[str, int]:
+    """{huella: id del análisis} de las filas del lote que ya están guardadas."""
+    huellas = list(set(huellas))
+    if not huellas:
+        return {}
+    rows = (
+        db.query(FilaLote.hash_fila, FilaLote.analisis_id)
+        .filter(FilaLote.clave_lote == clave_lote, FilaLote.hash_fila.in_(huellas))
+        .all()
+    )
+    return dict(rows)
+
+
+def registrarBloque(
+    db: Session,
+    clave_lote: str,
+    guardadas: List[Tuple[str, int]],
+    indice_inicio: int,
+    indice_fin: int,
+    omitidas: int = 0
+) -> None:
+    """Huellas de las filas nuevas + checkpoint del bloque (sin commit)."""
+    if guardadas:
+        db.execute(insert(FilaLote), [
+            {"clave_lote": clave_lote, "hash_fila": huella, "analisis_id": analisis_id}
+            for huella, analisis_id in guardadas
+        ])
+    db.add(CheckpointLote(
+        clave_lote=clave_lote,
+        indice_inicio=indice_inicio,
+        indice_fin=indice_fin,
+        guardadas=len(guardadas),
+        omitidas=omitidas
+    ))
+
+
+def resumenLote(db: Session, clave_lote: str) -> Optional[Dict[str, Any]]:
+    filas = db.query(func.count(FilaLote.hash_fila)).filter(FilaLote.clave_lote == clave_lote).scalar()
+    checkpoints = (
+        db.query(CheckpointLote)
+        .filter(CheckpointLote.clave_lote == clave_lote)
+        .order_by(CheckpointLote.id.desc())
+        .limit(20)
+        .all()
+    )
+    if not filas and not checkpoints:
+        return None
+
+    return {
+        "clave_lote": clave_lote,
+        "filas_guardadas": filas,
+        "checkpoints": [{
+            "indice_inicio": c.indice_inicio,
+            "indice_fin": c.indice_fin,
+            "guardadas": c.guardadas,
+            "omitidas": c.omitidas,
+            "created_at": c.created_at.isoformat() if c.created_at else None
+        } for c in checkpoints]
+    }
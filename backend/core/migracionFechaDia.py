@@ -0,0 +1,125 @@
+# core/migracionFechaDia.py
+"""
+Migración de analisis_comentarios a fecha real e índices compuestos.
+
+`fecha` es texto libre (VARCHAR) tal y como llega del CSV; los filtros por
+rango y el orden de tendencias comparaban cadenas. Esta migración:
+
+  1. añade la columna DATE `fecha_dia` si no existe,
+  2. la rellena interpretando `fecha` con utils.helpers.parsearFecha
+     (por bloques de id, con commit en cada uno; se puede relanzar),
+  3. crea los índices compuestos del modelo que falten y borra los que
+     estos sustituyen (INDICES_REEMPLAZADOS),
+  4. reconstruye resumen_diario, cuya clave de fecha pasa a ser ISO.
+
+    python -m backend.core.migracionFechaDia migrar
+
+Los índices antiguos de una sola columna (idx_departamento,
+idx_stress_level, idx_fecha) quedan cubiertos por los compuestos y se
+pueden borrar a mano cuando convenga.
+"""
+
+from typing import Tuple
+import logging
+
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+from backend.core.coreModels import AnalisisComentario
+from backend.core.resumenDiario import reconstruirResumen
+from backend.utils.helpers import parsearFecha
+
+logger = logging.getLogger(__name__)
+
+A = AnalisisComentario
+
+# Versiones anteriores de los índices compuestos, sin `id` antes de fecha_dia
+INDICES_REEMPLAZADOS = ("idx_departamento_fecha", "idx_departamento_equipo_fecha")
+
+
+def agregarColumna(engine) -> bool:
+    """Añade fecha_dia si falta. Devuelve True si la ha creado."""
+    columnas = {c["name"] for c in inspect(engine).get_columns(A.__tablename__)}
+    if "fecha_dia" in columnas:
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {A.__tablename__} ADD COLUMN fecha_dia DATE NULL"))
+    return True
+
+
+def rellenarFechaDia(db: Session, bloque: int = 5000) -> Tuple[int, int]:
+    """Rellena fecha_dia donde está vacía. Devuelve (filas revisadas, fechas reconocidas)."""
+    T = A.__table__
+    stmt = update(T).where(T.c.id == bindparam("b_id")).values(fecha_dia=bindparam("b_fecha"))
+
+    ultimo_id = 0
+    revisadas = reconocidas = 0
+    while True:
+        rows = db.execute(
+            select(A.id, A.fecha)
+            .where(A.id > ultimo_id, A.fecha_dia.is_(None))
+            .order_by(A.id)
+            .limit(bloque)
+        ).all()
+        if not rows:
+            break
+
+        cambios = [
+            {"b_id": r.id, "b_fecha": fecha}
+            for r in rows
+            if (fecha := parsearFecha(r.fecha)) is not None
+        ]
+        if cambios:
+            db.execute(stmt, cambios)
+        db.commit()
+
+        ultimo_id = rows[-1].id
+        revisadas += len(rows)
+        reconocidas += len(cambios)
+        logger.info(f"fecha_dia: {revisadas} filas revisadas, {reconocidas} fechas reconocidas")
+
+    return revisadas, reconocidas
+
+
+def crearIndices(engine) -> list:
+    existentes = {i["name"] for i in inspect(engine).get_indexes(A.__tablename__)}
+    creados = []
+    for indice in A.__table__.indexes:
+        if indice.name not in existentes:
+            indice.create(engine)
+            creados.append(indice.name)
+    with engine.begin() as conn:
+        for nombre in INDICES_REEMPLAZADOS:
+            if nombre in existentes:
+                sql = f"DROP INDEX {nombre}"
+                if engine.dialect.name == "mysql":
+                    sql += f" ON {A.__tablename__}"
+                conn.execute(text(sql))
+                logger.info(f"Índice {nombre} sustituido")
+    return creados
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.config.database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Columna fecha_dia e índices compuestos")
+    parser.add_argument("accion", choices=["migrar"])
+    parser.add_argument("--bloque", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if agregarColumna(engine):
+        print("Columna fecha_dia creada")
+    with SessionLocal() as db:
+        revisadas, reconocidas = rellenarFechaDia(db, bloque=args.bloque)
+    print(f"fecha_dia: {reconocidas}/{revisadas} fechas reconocidas")
+
+    creados = crearIndices(engine)
+    print(f"Índices creados: {', '.join(creados) if creados else 'ninguno'}")
+
+    with SessionLocal() as db:
+        reconstruirResumen(db, bloque=args.bloque)
+    print("resumen_diario reconstruido")
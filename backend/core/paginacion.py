@@ -0,0 +1,79 @@
+# core/paginacion.py
+"""
+Paginación por cursor (keyset) sobre la clave primaria.
+
+Cada página es un `WHERE id < x ORDER BY id DESC LIMIT n` (o `id > x ...
+ASC`), así que la página N cuesta lo mismo que la primera, a diferencia de
+OFFSET. Parámetros que aceptan los listados:
+
+    before_id   ids menores que este, del más nuevo al más antiguo (por defecto)
+    after_id    ids mayores que este, del más antiguo al más nuevo
+                (para "lo nuevo desde la última vez")
+    cursor      token opaco devuelto por la página anterior; tiene prioridad
+
+Con after_id y before_id a la vez se recorre el rango entre ambos. El
+token de la página siguiente va en la cabecera `X-Next-Cursor` (y en
+`next_cursor` en las respuestas que son objeto); no existe en la última.
+"""
+
+from typing import Any, List, Optional, Tuple
+import base64
+import json
+
+HEADER_CURSOR = "X-Next-Cursor"
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificarCursor(after_id: Optional[int], before_id: Optional[int]) -> str:
+    datos = json.dumps({"a": after_id, "b": before_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificarCursor(cursor: str) -> Tuple[Optional[int], Optional[int]]:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        after_id, before_id = datos["a"], datos["b"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise CursorInvalido(f"Cursor inválido: {cursor!r}") from e
+
+    for valor in (after_id, before_id):
+        if valor is not None and not isinstance(valor, int):
+            raise CursorInvalido(f"Cursor inválido: {cursor!r}")
+    return after_id, before_id
+
+
+def paginar(
+    query,
+    columna_id,
+    limite: int,
+    cursor: Optional[str] = None,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """Devuelve (filas de la página, cursor de la siguiente o None)."""
+    if cursor:
+        after_id, before_id = decodificarCursor(cursor)
+
+    if after_id is not None:
+        query = query.filter(columna_id > after_id)
+    if before_id is not None:
+        query = query.filter(columna_id < before_id)
+
+    ascendente = after_id is not None and before_id is None
+    orden = columna_id.asc() if ascendente else columna_id.desc()
+
+    limite = max(1, limite)
+    # Una fila de más para saber si hay página siguiente sin contar
+    filas = query.order_by(orden).limit(limite + 1).all()
+    if len(filas) <= limite:
+        return filas, None
+
+    filas = filas[:limite]
+    ultimo = filas[-1].id
+    if ascendente:
+        return filas, codificarCursor(ultimo, None)
+    return filas, codificarCursor(after_id, ultimo)
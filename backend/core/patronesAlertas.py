@@ -0,0 +1,187 @@
+# core/patronesAlertas.py
+"""
+Detección de patrones de /alertas/patrones/.
+
+Todas las entradas de las reglas salen de una sola agregación:
+
+  - una consulta GROUP BY sobre resumen_diario (dimensiones stress, emocion
+    y stress_emocion por departamento), cuyo tamaño depende de
+    departamentos × valores, no de comentarios;
+  - los `VENTANA_RECIENTE` últimos niveles de estrés, leídos recorriendo la
+    clave primaria hacia atrás con LIMIT.
+
+Las reglas son la tabla `REGLAS`: una condición y dos plantillas de texto
+sobre las métricas del agregado, evaluadas a nivel global o por
+departamento. Añadir una regla no añade consultas; si necesita una métrica
+nueva, se calcula en `_metricas` a partir de los mismos conteos.
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.core.coreModels import AnalisisComentario, ResumenDiario
+
+R = ResumenDiario
+
+VENTANA_RECIENTE = 20
+EMOCIONES_NEGATIVAS = ("anger", "fear", "sadness")
+EMOCIONES_POSITIVAS = ("joy", "happiness", "neutral")
+SIN_DEPARTAMENTO = "Sin departamento"
+
+Conteos = Dict[str, Dict[str, int]]
+
+# ==========================================================
+# AGREGADO
+# ==========================================================
+def _metricas(conteos: Conteos) -> Dict[str, Any]:
+    """Métricas de un ámbito a partir de sus conteos {dimension: {valor: n}}."""
+    stress = conteos.get("stress", {})
+    emocion = conteos.get("emocion", {})
+    stress_emocion = conteos.get("stress_emocion", {})
+
+    total = sum(stress.values())
+    stress_alto = stress.get("alto", 0)
+    positivos = sum(stress_emocion.get(f"bajo|{e}", 0) for e in EMOCIONES_POSITIVAS)
+    return {
+        "total": total,
+        "stress_alto": stress_alto,
+        "stress_alto_pct": (stress_alto / total) * 100 if total > 0 else 0,
+        "emociones_negativas": sum(emocion.get(e, 0) for e in EMOCIONES_NEGATIVAS),
+        "comentarios_positivos": positivos,
+        "positivos_pct": (positivos / total) * 100 if total > 0 else 0,
+    }
+
+
+def agregarPatrones(db: Session) -> Dict[str, Any]:
+    """
+    Métricas globales y por departamento (en orden de primera aparición)
+    para evaluar `REGLAS`.
+    """
+    filas = (
+        db.query(R.departamento, R.dimension, R.valor, func.sum(R.n), func.min(R.primer_id))
+        .filter(R.dimension.in_(("stress", "emocion", "stress_emocion")))
+        .group_by(R.departamento, R.dimension, R.valor)
+        .all()
+    )
+
+    por_departamento: Dict[str, Conteos] = {}
+    primer_id: Dict[str, int] = {}
+    globales: Conteos = {}
+    for departamento, dimension, valor, n, primero in filas:
+        nombre = departamento or SIN_DEPARTAMENTO
+        n = int(n or 0)
+        celdas = por_departamento.setdefault(nombre, {}).setdefault(dimension, {})
+        celdas[valor] = celdas.get(valor, 0) + n
+        totales = globales.setdefault(dimension, {})
+        totales[valor] = totales.get(valor, 0) + n
+        if primero is not None:
+            primer_id[nombre] = min(primer_id.get(nombre, primero), primero)
+
+    recientes = [
+        nivel for (nivel,) in db.query(AnalisisComentario.stress_level)
+        .order_by(AnalisisComentario.id.desc())
+        .limit(VENTANA_RECIENTE)
+        .all()
+    ]
+
+    orden = sorted(por_departamento, key=lambda d: (d not in primer_id, primer_id.get(d, 0)))
+    return {
+        **_metricas(globales),
+        "ventana_reciente": VENTANA_RECIENTE,
+        "stress_reciente": sum(1 for nivel in recientes if nivel == "alto"),
+        "departamentos": [
+            {"departamento": d, **_metricas(por_departamento[d])} for d in orden
+        ],
+    }
+
+# ==========================================================
+# REGLAS
+# ==========================================================
+class Regla(NamedTuple):
+    tipo: str
+    severidad: str
+    # "global": se evalúa una vez; "departamento": una vez por departamento
+    ambito: str
+    condicion: Callable[[Dict[str, Any]], bool]
+    # Plantillas str.format sobre las métricas del ámbito
+    mensaje: str
+    accion: str
+
+
+REGLAS: List[Regla] = [
+    Regla(
+        "stress_critico", "alta", "global",
+        lambda m: m["stress_alto_pct"] > 30,
+        "Nivel crítico de estrés detectado: {stress_alto_pct:.1f}% de comentarios con estrés alto",
+        "Intervención inmediata requerida. Revisar carga laboral y recursos.",
+    ),
+    Regla(
+        "tendencia_creciente", "media", "global",
+        lambda m: m["stress_reciente"] > 15,
+        "Incremento en comentarios con estrés alto en últimos registros ({stress_reciente}/{ventana_reciente})",
+        "Monitorear situación y preparar plan de acción preventivo.",
+    ),
+    Regla(
+        "departamento_critico", "alta", "departamento",
+        lambda m: m["total"] >= 5 and m["stress_alto_pct"] > 50,
+        "Departamento '{departamento}' con {stress_alto_pct:.1f}% de estrés alto ({stress_alto}/{total})",
+        "Reunión urgente con liderazgo de {departamento}. Evaluación de condiciones laborales.",
+    ),
+    Regla(
+        "clima_negativo", "media", "global",
+        lambda m: m["emociones_negativas"] > m["total"] * 0.4,
+        "Alta prevalencia de emociones negativas: {emociones_negativas} comentarios",
+        "Implementar espacios de escucha activa y feedback bidireccional.",
+    ),
+    Regla(
+        "tendencia_positiva", "baja", "global",
+        lambda m: m["comentarios_positivos"] > m["total"] * 0.6,
+        "Ambiente laboral saludable: {comentarios_positivos} comentarios positivos ({positivos_pct:.1f}%)",
+        "Documentar y reforzar prácticas actuales. Reconocer liderazgo efectivo.",
+    ),
+]
+
+PATRON_NEUTRAL = {
+    "tipo": "neutral",
+    "severidad": "baja",
+    "mensaje": "No se detectaron patrones críticos",
+    "accion": "Mantener monitoreo regular."
+}
+
+
+def evaluarReglas(agregado: Dict[str, Any], reglas: List[Regla] = REGLAS) -> List[Dict[str, Any]]:
+    """Patrones que cumplen su regla, en el orden de la tabla."""
+    patrones = []
+    for regla in reglas:
+        ambitos = agregado["departamentos"] if regla.ambito == "departamento" else [agregado]
+        for metricas in ambitos:
+            if not regla.condicion(metricas):
+                continue
+            patron = {
+                "tipo": regla.tipo,
+                "severidad": regla.severidad,
+                "mensaje": regla.mensaje.format(**metricas),
+                "accion": regla.accion.format(**metricas)
+            }
+            if regla.ambito == "departamento":
+                patron["departamento"] = metricas["departamento"]
+            patrones.append(patron)
+    return patrones
+
+
+def detectarPatrones(db: Session) -> Dict[str, Any]:
+    """Respuesta de /alertas/patrones/."""
+    agregado = agregarPatrones(db)
+    if agregado["total"] == 0:
+        return {
+            "patrones_detectados": [],
+            "mensaje": "No hay datos suficientes"
+        }
+
+    return {
+        "total_comentarios": agregado["total"],
+        "stress_alto_porcentaje": agregado["stress_alto_pct"],
+        "patrones_detectados": evaluarReglas(agregado) or [dict(PATRON_NEUTRAL)]
+    }
@@ -0,0 +1,265 @@
+# core/planificadorPatrones.py
+"""
+Patrones de alertas precalculados.
+
+Un hilo por proceso reevalúa las reglas de core/patronesAlertas.py cuando
+cambia la versión de datos del ámbito "analisis":
+
+  - al momento (con una breve espera que agrupa ráfagas) tras los commits
+    de este proceso que subieron la versión, vía `suscribirCambios`;
+  - cada `poll_seconds`, comparando la versión con la de la instantánea,
+    para las escrituras hechas por otros workers.
+
+La evaluación (`actualizarSnapshot`) bloquea la fila de `snapshot_patrones`,
+así que con varios workers solo uno evalúa cada versión. El resultado se
+guarda con su marca de tiempo en `snapshot_patrones`, y el ciclo de vida
+de cada patrón en `patrones_alerta` (detectado_en / actualizado_en /
+resuelto_en). Cada aparición o desaparición queda en `eventos_patron`, que
+alimenta el webhook configurado y el canal SSE /alertas/patrones/eventos/.
+
+/alertas/patrones/ lee la instantánea aunque esté por detrás de la
+versión de datos (con `evaluado_en`, `version_datos` y `al_dia` para que
+el cliente lo sepa) y deja que el planificador la ponga al día. Solo la
+evalúa en la propia petición si todavía no existe.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Set
+import json
+import logging
+import threading
+import urllib.request
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.config.settings import settings
+from backend.core.coreModels import EventoPatron, PatronAlerta, SnapshotPatrones
+from backend.core.cacheRespuestas import AMBITO_ANALISIS, leerVersiones, suscribirCambios
+from backend.core.patronesAlertas import detectarPatrones
+from backend.core.trabajosLote import ahora
+
+logger = logging.getLogger(__name__)
+
+ID_SNAPSHOT = 1
+
+
+def clavePatron(patron: Dict[str, Any]) -> str:
+    departamento = patron.get("departamento")
+    return f"{patron['tipo']}:{departamento}" if departamento is not None else patron["tipo"]
+
+
+def _datosPatron(fila: PatronAlerta) -> Dict[str, Any]:
+    return {
+        "id": fila.id,
+        "tipo": fila.tipo,
+        "severidad": fila.severidad,
+        "departamento": fila.departamento,
+        "mensaje": fila.mensaje,
+        "accion": fila.accion,
+        "detectado_en": fila.detectado_en.isoformat() if fila.detectado_en else None,
+        "resuelto_en": fila.resuelto_en.isoformat() if fila.resuelto_en else None
+    }
+
+
+def _datosEvento(evento: EventoPatron) -> Dict[str, Any]:
+    return {
+        "id": evento.id,
+        "evento": evento.evento,
+        "creado_en": evento.creado_en.isoformat(),
+        "patron": evento.datos
+    }
+
+# ==========================================================
+# EVALUACIÓN
+# ==========================================================
+def actualizarSnapshot(db: Session, forzar: bool = False) -> List[Dict[str, Any]]:
+    """
+    Reevalúa los patrones si la instantánea está por detrás de la versión
+    de datos (o con `forzar`), con commit. Devuelve los eventos generados.
+    """
+    version = leerVersiones(db, (AMBITO_ANALISIS,))[0]
+    snapshot = db.query(SnapshotPatrones).filter(SnapshotPatrones.id == ID_SNAPSHOT).with_for_update().first()
+    if snapshot is not None and snapshot.version_datos >= version and not forzar:
+        db.rollback()
+        return []
+
+    respuesta = detectarPatrones(db)
+    momento = ahora()
+
+    activos = {
+        fila.clave: fila for fila in
+        db.query(PatronAlerta).filter(PatronAlerta.activo == 1).with_for_update()
+    }
+    detectados = {
+        clavePatron(p): p for p in respuesta.get("patrones_detectados", []) if p["tipo"] != "neutral"
+    }
+
+    cambios = []
+    for clave, patron in detectados.items():
+        fila = activos.get(clave)
+        if fila is None:
+            fila = PatronAlerta(
+                clave=clave,
+                tipo=patron["tipo"],
+                departamento=patron.get("departamento"),
+                activo=1,
+                detectado_en=momento
+            )
+            db.add(fila)
+            cambios.append(("aparece", fila))
+        fila.severidad = patron["severidad"]
+        fila.mensaje = patron["mensaje"]
+        fila.accion = patron["accion"]
+        fila.actualizado_en = momento
+        patron["detectado_en"] = fila.detectado_en.isoformat()
+
+    for clave, fila in activos.items():
+        if clave not in detectados:
+            fila.activo = 0
+            fila.resuelto_en = momento
+            cambios.append(("desaparece", fila))
+
+    db.flush()
+    eventos = [
+        EventoPatron(patron_id=fila.id, evento=tipo, datos=_datosPatron(fila), creado_en=momento)
+        for tipo, fila in cambios
+    ]
+    db.add_all(eventos)
+
+    if snapshot is None:
+        snapshot = SnapshotPatrones(id=ID_SNAPSHOT)
+        db.add(snapshot)
+    snapshot.version_datos = version
+    snapshot.respuesta = respuesta
+    snapshot.evaluado_en = momento
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otro worker creó la instantánea a la vez: esta evaluación sobra
+        db.rollback()
+        return []
+
+    logger.info(f"Patrones evaluados (versión {version}): {len(detectados)} activos, {len(eventos)} cambios")
+    return [_datosEvento(e) for e in eventos]
+
+
+def snapshotPatrones(db: Session) -> Dict[str, Any]:
+    """
+    Respuesta de /alertas/patrones/ desde la instantánea guardada, sin
+    bloqueos ni escrituras salvo la primera vez (aún no hay instantánea).
+    """
+    snapshot = db.get(SnapshotPatrones, ID_SNAPSHOT)
+    if snapshot is None:
+        notificarEventos(actualizarSnapshot(db))
+        db.expire_all()
+        snapshot = db.get(SnapshotPatrones, ID_SNAPSHOT)
+        if snapshot is None:
+            return detectarPatrones(db)
+
+    version = leerVersiones(db, (AMBITO_ANALISIS,))[0]
+    return {
+        **snapshot.respuesta,
+        "evaluado_en": snapshot.evaluado_en.isoformat(),
+        "version_datos": snapshot.version_datos,
+        "al_dia": snapshot.version_datos >= version
+    }
+
+
+def leerEventos(db: Session, despues_de: int, limite: int = 100) -> List[Dict[str, Any]]:
+    filas = (
+        db.query(EventoPatron)
+        .filter(EventoPatron.id > despues_de)
+        .order_by(EventoPatron.id)
+        .limit(limite)
+        .all()
+    )
+    return [_datosEvento(e) for e in filas]
+
+
+def ultimoEvento(db: Session) -> int:
+    fila = db.query(EventoPatron.id).order_by(EventoPatron.id.desc()).first()
+    return fila[0] if fila else 0
+
+# ==========================================================
+# NOTIFICACIONES
+# ==========================================================
+def enviarWebhook(url: str, eventos: List[Dict[str, Any]], timeout: float) -> None:
+    for evento in eventos:
+        cuerpo = json.dumps(evento, ensure_ascii=False).encode("utf-8")
+        peticion = urllib.request.Request(
+            url, data=cuerpo, method="POST", headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(peticion, timeout=timeout) as r:
+                r.read()
+        except Exception as e:
+            logger.warning(f"Webhook de patrones {url} falló para el evento {evento['id']}: {e}")
+
+
+def notificarEventos(eventos: List[Dict[str, Any]]) -> None:
+    """Webhook en segundo plano; el canal SSE lee los eventos de la tabla."""
+    if not eventos or not settings.patterns_webhook_url:
+        return
+    threading.Thread(
+        target=enviarWebhook,
+        args=(settings.patterns_webhook_url, eventos, settings.patterns_webhook_timeout),
+        name="webhook-patrones",
+        daemon=True
+    ).start()
+
+# ==========================================================
+# PLANIFICADOR
+# ==========================================================
+class PlanificadorPatrones:
+    def __init__(
+        self,
+        session_factory=None,
+        poll_seconds: float = 5.0,
+        debounce_seconds: float = 1.0,
+        notificar: Callable[[List[Dict[str, Any]]], None] = notificarEventos
+    ):
+        if session_factory is None:
+            from backend.config.database import SessionLocal
+            session_factory = SessionLocal
+
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.debounce_seconds = debounce_seconds
+        self.notificar = notificar
+        self._stop = threading.Event()
+        self._despertar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        suscribirCambios(self._alCambiar)
+        self._thread = threading.Thread(target=self._loop, name="planificador-patrones", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._despertar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _alCambiar(self, ambitos: Set[str]) -> None:
+        if AMBITO_ANALISIS in ambitos:
+            self._despertar.set()
+
+    def evaluar(self) -> List[Dict[str, Any]]:
+        with self.session_factory() as db:
+            eventos = actualizarSnapshot(db)
+        self.notificar(eventos)
+        return eventos
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.evaluar()
+            except Exception as e:
+                logger.error(f"Error evaluando patrones: {e}")
+
+            if self._despertar.wait(self.poll_seconds):
+                # Escritura local: se espera un poco para agrupar la ráfaga
+                self._stop.wait(self.debounce_seconds)
+            self._despertar.clear()
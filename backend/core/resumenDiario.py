@@ -0,0 +1,194 @@
+# core/resumenDiario.py
+"""
+Agregado diario incremental para los dashboards.
+
+`resumen_diario` guarda, por (fecha, departamento, equipo), cuántos
+comentarios caen en cada valor de cada dimensión:
+
+    total      ""                  todos los comentarios de la celda
+    stress     alto/medio/bajo/…   nivel de estrés
+    emocion    etiqueta            emoción dominante
+    stress_emocion  "nivel|etiqueta"  ambas a la vez (reglas de core/patronesAlertas.py)
+    categoria  etiqueta            una fila por categoría detectada
+
+junto con la suma de sentimiento de esos comentarios y el id del primero.
+guardarAnalisis e insertarAnalisisBulk llaman a `acumularResumen` en la
+misma transacción que el INSERT de los análisis, con un upsert que suma
+sobre la fila existente (seguro con escritores concurrentes). Así
+/estadisticas/ recorre días × departamentos × equipos, no comentarios.
+
+Para rellenarlo con datos cargados por SQL (datos_prueba.sql) o tras un
+cambio manual en analisis_comentarios:
+
+    python -m backend.core.resumenDiario reconstruir
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from backend.core.coreModels import AnalisisComentario, ResumenDiario
+from backend.core.categoriasComentario import etiquetasCategoria
+from backend.core.cacheRespuestas import AMBITO_ANALISIS, subirVersion
+
+logger = logging.getLogger(__name__)
+
+CLAVE = ("fecha", "departamento", "equipo", "dimension", "valor")
+
+Celdas = Dict[Tuple[str, ...], List[Any]]
+
+
+def _texto(valor: Any, largo: int) -> str:
+    return str(valor or "")[:largo]
+
+
+def _acumular(celdas: Celdas, analisis_id: int, fila: Dict[str, Any]) -> None:
+    """Suma un análisis (columnas de analisis_comentarios) a sus celdas."""
+    # Con fecha reconocida la clave es ISO, que ordena cronológicamente
+    fecha_dia = fila.get("fecha_dia")
+    base = (
+        fecha_dia.isoformat() if fecha_dia else _texto(fila.get("fecha"), 20),
+        _texto(fila.get("departamento"), 80),
+        _texto(fila.get("equipo"), 80),
+    )
+    pos = float(fila.get("sent_pos") or 0.0)
+    neu = float(fila.get("sent_neu") or 0.0)
+    neg = float(fila.get("sent_neg") or 0.0)
+
+    stress, emocion = fila.get("stress_level"), fila.get("emotion_label")
+    valores = [("total", ""), ("stress", stress), ("emocion", emocion)]
+    valores.append(("stress_emocion", f"{_texto(stress, 32)}|{_texto(emocion, 64)}"))
+    valores += [("categoria", label) for label in etiquetasCategoria(fila.get("categories"))]
+
+    for dimension, valor in valores:
+        clave = base + (dimension, _texto(valor, 128))
+        celda = celdas.get(clave)
+        if celda is None:
+            celdas[clave] = [1, pos, neu, neg, analisis_id]
+        else:
+            celda[0] += 1
+            celda[1] += pos
+            celda[2] += neu
+            celda[3] += neg
+            celda[4] = min(celda[4], analisis_id)
+
+
+def _filasCeldas(celdas: Celdas) -> List[Dict[str, Any]]:
+    # Orden fijo: los upserts concurrentes bloquean las filas en el mismo orden
+    return [
+        {**dict(zip(CLAVE, clave)), "n": n, "sent_pos": pos, "sent_neu": neu, "sent_neg": neg, "primer_id": primer}
+        for clave, (n, pos, neu, neg, primer) in sorted(celdas.items())
+    ]
+
+
+def _upsert(db: Session, filas: List[Dict[str, Any]]) -> None:
+    T = ResumenDiario.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as insert_mysql
+        stmt = insert_mysql(T)
+        nuevo = stmt.inserted
+        stmt = stmt.on_duplicate_key_update(
+            n=T.c.n + nuevo.n,
+            sent_pos=T.c.sent_pos + nuevo.sent_pos,
+            sent_neu=T.c.sent_neu + nuevo.sent_neu,
+            sent_neg=T.c.sent_neg + nuevo.sent_neg,
+            primer_id=func.least(func.coalesce(T.c.primer_id, nuevo.primer_id), nuevo.primer_id)
+        )
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+            minimo = func.min
+        else:
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+            minimo = func.least
+        stmt = insert_dialecto(T)
+        nuevo = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(CLAVE),
+            set_={
+                "n": T.c.n + nuevo.n,
+                "sent_pos": T.c.sent_pos + nuevo.sent_pos,
+                "sent_neu": T.c.sent_neu + nuevo.sent_neu,
+                "sent_neg": T.c.sent_neg + nuevo.sent_neg,
+                "primer_id": minimo(func.coalesce(T.c.primer_id, nuevo.primer_id), nuevo.primer_id)
+            }
+        )
+    else:
+        for fila in filas:
+            existente = db.get(ResumenDiario, tuple(fila[c] for c in CLAVE))
+            if existente is None:
+                db.add(ResumenDiario(**fila))
+            else:
+                existente.n += fila["n"]
+                existente.sent_pos += fila["sent_pos"]
+                existente.sent_neu += fila["sent_neu"]
+                existente.sent_neg += fila["sent_neg"]
+                existente.primer_id = min(existente.primer_id or fila["primer_id"], fila["primer_id"])
+        db.flush()
+        return
+
+    db.execute(stmt, filas)
+
+
+def acumularResumen(db: Session, analisis: Iterable[Tuple[Optional[int], Dict[str, Any]]]) -> None:
+    """
+    Suma al agregado los análisis recién insertados, como pares
+    (id, columnas). Sin commit: va en la transacción del INSERT.
+    """
+    celdas: Celdas = {}
+    for analisis_id, fila in analisis:
+        if analisis_id is not None:
+            _acumular(celdas, analisis_id, fila)
+    if celdas:
+        _upsert(db, _filasCeldas(celdas))
+
+
+def reconstruirResumen(db: Session, bloque: int = 5000) -> int:
+    """
+    Recalcula resumen_diario desde analisis_comentarios en una transacción.
+    Conviene lanzarlo con la ingesta parada: lo que se guarde mientras se
+    recorre la tabla puede quedar fuera. Devuelve los comentarios leídos.
+    """
+    A = AnalisisComentario
+    columnas = [A.id, A.fecha, A.fecha_dia, A.departamento, A.equipo, A.stress_level,
+                A.emotion_label, A.sent_pos, A.sent_neu, A.sent_neg, A.categories]
+
+    celdas: Celdas = {}
+    total = 0
+    for row in db.execute(select(*columnas).order_by(A.id).execution_options(yield_per=bloque)):
+        fila = row._asdict()
+        _acumular(celdas, fila.pop("id"), fila)
+        total += 1
+
+    db.execute(delete(ResumenDiario))
+    filas = _filasCeldas(celdas)
+    for start in range(0, len(filas), bloque):
+        db.execute(insert(ResumenDiario), filas[start:start + bloque])
+    subirVersion(db, AMBITO_ANALISIS)
+    db.commit()
+
+    logger.info(f"resumen_diario reconstruido: {total} comentarios, {len(filas)} celdas")
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.config.database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Mantenimiento del agregado diario de estadísticas")
+    parser.add_argument("accion", choices=["reconstruir"])
+    parser.add_argument("--bloque", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    ResumenDiario.__table__.create(bind=engine, checkfirst=True)
+
+    with SessionLocal() as db:
+        comentarios = reconstruirResumen(db, bloque=args.bloque)
+
+    print(f"{comentarios} comentarios agregados en resumen_diario")
@@ -0,0 +1,533 @@
+# core/trabajosLote.py
+"""
+Trabajos asíncronos de análisis masivo.
+
+POST /analizar/lote guarda las filas en `filas_trabajo` y devuelve el id del
+trabajo al momento. Los hilos de `WorkerTrabajos` reclaman trabajos
+pendientes, los analizan por lotes con `NLPAnalyzer.analyze_batch` y van
+actualizando el progreso en `trabajos_analisis`.
+
+La cola vive en la propia BD: si el worker se reinicia, el trabajo queda
+"en_proceso" con un heartbeat caducado y se reencola; como solo se
+procesan filas en estado "pendiente", se retoma donde se quedó.
+
+Cada bloque se confirma por separado. Si un bloque falla se reintenta
+(`chunk_retries`) y después fila a fila; las filas que siguen fallando
+quedan en "error" y el trabajo sigue con el resto. Termina "completado", o
+"parcial" si algún bloque falló (reintentarTrabajo vuelve a encolar esas
+filas).
+
+Un lote con clave solo puede tener un trabajo sin terminar: crearTrabajo
+reserva la clave en `reservas_lote` (clave primaria) en el mismo commit que
+crea el trabajo, y se libera al terminar. Un segundo envío concurrente
+recibe LoteEnCurso con el id del trabajo que ya lo procesa.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import json
+import logging
+import threading
+
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.core.coreModels import FilaTrabajo, ReservaLote, TrabajoAnalisis
+from backend.core.coreServices import insertarAnalisisBulk
+from backend.core.ingestaLote import HuellaFilas, filasPersistidas, registrarBloque
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_FINALES = {"completado", "parcial", "fallido"}
+
+
+def ahora() -> datetime:
+    # Las marcas de tiempo del worker se guardan en UTC sin zona
+    return datetime.utcnow()
+
+
+class LoteEnCurso(Exception):
+    """Ya hay un trabajo sin terminar con la misma clave de lote."""
+
+    def __init__(self, clave_lote: str, trabajo_id: Optional[int]):
+        super().__init__(f"El lote '{clave_lote}' ya se está procesando en el trabajo {trabajo_id}")
+        self.clave_lote = clave_lote
+        self.trabajo_id = trabajo_id
+
+
+def _reservarLote(db: Session, trabajo: TrabajoAnalisis) -> None:
+    """
+    Reserva la clave del lote para el trabajo (sin commit). Si otro trabajo
+    sin terminar la tiene, deshace la transacción y lanza LoteEnCurso.
+    """
+    if not trabajo.clave_lote:
+        return
+    db.flush()
+    try:
+        with db.begin_nested():
+            db.execute(insert(ReservaLote).values(clave_lote=trabajo.clave_lote, trabajo_id=trabajo.id))
+    except IntegrityError:
+        titular = (
+            db.query(ReservaLote.trabajo_id)
+            .filter(ReservaLote.clave_lote == trabajo.clave_lote)
+            .scalar()
+        )
+        db.rollback()
+        raise LoteEnCurso(trabajo.clave_lote, titular)
+
+
+def _finalizar(db: Session, trabajo: TrabajoAnalisis, estado: str, error: Optional[str] = None) -> None:
+    """Estado final y liberación de la clave del lote (sin commit)."""
+    trabajo.estado = estado
+    if error is not None:
+        trabajo.error = error
+    trabajo.finished_at = ahora()
+    db.execute(delete(ReservaLote).where(ReservaLote.trabajo_id == trabajo.id))
+
+
+# ============================================================
+# CREACIÓN Y CONSULTA
+# ============================================================
+def crearTrabajo(
+    db: Session,
+    filas: Iterable[Dict[str, Any]],
+    chunk_size: int = 1000,
+    clave_lote: Optional[str] = None
+) -> TrabajoAnalisis:
+    """
+    Registra el trabajo y sus filas. Las filas se insertan por bloques a
+    medida que llegan (pueden venir de un CSV en streaming); el trabajo
+    solo pasa a "pendiente" cuando están todas. Con `clave_lote` cada fila
+    lleva su huella para omitir las ya guardadas por envíos anteriores, y
+    LoteEnCurso indica que otro trabajo del mismo lote sigue sin terminar.
+    """
+    trabajo = TrabajoAnalisis(total=0, estado="recibiendo", clave_lote=clave_lote)
+    db.add(trabajo)
+    _reservarLote(db, trabajo)
+    db.commit()
+    huella = HuellaFilas() if clave_lote else None
+
+    try:
+        for chunk in _bloques(filas, chunk_size):
+            db.execute(insert(FilaTrabajo), [
+                {
+                    "trabajo_id": trabajo.id,
+                    "indice": trabajo.total + i,
+                    "datos": fila,
+                    "hash_fila": huella(fila) if huella else None
+                }
+                for i, fila in enumerate(chunk)
+            ])
+            trabajo.total += len(chunk)
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        _finalizar(db, trabajo, "fallido", f"Error recibiendo filas: {e}")
+        db.commit()
+        raise
+
+    trabajo.estado = "pendiente"
+    db.commit()
+    db.refresh(trabajo)
+    return trabajo
+
+
+def _bloques(filas: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for fila in filas:
+        chunk.append(fila)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def resumenTrabajo(trabajo: TrabajoAnalisis) -> Dict[str, Any]:
+    """Progreso, throughput (filas/s) y ETA estimada de un trabajo."""
+    fin = trabajo.finished_at or ahora()
+    transcurrido = (fin - trabajo.started_at).total_seconds() if trabajo.started_at else 0.0
+    throughput = trabajo.procesados / transcurrido if transcurrido > 0 else 0.0
+    restantes = trabajo.total - trabajo.procesados
+
+    eta = None
+    if trabajo.estado not in ESTADOS_FINALES and throughput > 0:
+        eta = round(restantes / throughput, 1)
+
+    return {
+        "trabajo_id": trabajo.id,
+        "estado": trabajo.estado,
+        "total": trabajo.total,
+        "procesados": trabajo.procesados,
+        "guardados": trabajo.guardados,
+        "errores": trabajo.errores,
+        "omitidas": trabajo.omitidas,
+        "clave_lote": trabajo.clave_lote,
+        "progreso": round(100 * trabajo.procesados / trabajo.total, 1) if trabajo.total else 100.0,
+        "filas_por_segundo": round(throughput, 2),
+        "eta_segundos": eta,
+        "error": trabajo.error,
+        "intentos": trabajo.intentos,
+        "created_at": trabajo.created_at.isoformat() if trabajo.created_at else None,
+        "started_at": trabajo.started_at.isoformat() if trabajo.started_at else None,
+        "finished_at": trabajo.finished_at.isoformat() if trabajo.finished_at else None,
+    }
+
+
+def trabajosSinTerminar(db: Session) -> int:
+    return (
+        db.query(func.count(TrabajoAnalisis.id))
+        .filter(TrabajoAnalisis.estado.notin_(ESTADOS_FINALES))
+        .scalar()
+    )
+
+
+def erroresTrabajo(db: Session, trabajo_id: int, limite: int = 100) -> List[Dict[str, Any]]:
+    filas = (
+        db.query(FilaTrabajo)
+        .filter(FilaTrabajo.trabajo_id == trabajo_id, FilaTrabajo.estado == "error")
+        .order_by(FilaTrabajo.indice)
+        .limit(limite)
+        .all()
+    )
+    return [{"indice": f.indice, "error": f.error, "datos": f.datos} for f in filas]
+
+
+def actualizarContadores(db: Session, trabajo: TrabajoAnalisis) -> None:
+    """Recalcula el progreso desde las filas (sobrevive a caídas entre commits)."""
+    conteo = dict(
+        db.query(FilaTrabajo.estado, func.count(FilaTrabajo.id))
+        .filter(FilaTrabajo.trabajo_id == trabajo.id)
+        .group_by(FilaTrabajo.estado)
+        .all()
+    )
+    trabajo.guardados = conteo.get("ok", 0)
+    trabajo.errores = conteo.get("error", 0)
+    trabajo.omitidas = conteo.get("omitida", 0)
+    trabajo.procesados = trabajo.guardados + trabajo.errores + trabajo.omitidas
+
+
+def reintentarTrabajo(db: Session, trabajo: TrabajoAnalisis) -> TrabajoAnalisis:
+    """
+    Vuelve a encolar las filas con error de un trabajo terminado. LoteEnCurso
+    si entretanto otro trabajo tomó la clave del lote.
+    """
+    trabajo.estado = "pendiente"
+    trabajo.error = None
+    trabajo.finished_at = None
+    _reservarLote(db, trabajo)
+
+    db.execute(
+        update(FilaTrabajo)
+        .where(FilaTrabajo.trabajo_id == trabajo.id, FilaTrabajo.estado == "error")
+        .values(estado="pendiente", error=None)
+    )
+
+    actualizarContadores(db, trabajo)
+    db.commit()
+    db.refresh(trabajo)
+    return trabajo
+
+
+def reencolarHuerfanos(db: Session, lease_seconds: int) -> int:
+    """Trabajos "en_proceso" cuyo worker dejó de renovar el heartbeat."""
+    limite = ahora() - timedelta(seconds=lease_seconds)
+    count = db.execute(
+        update(TrabajoAnalisis)
+        .where(TrabajoAnalisis.estado == "en_proceso", TrabajoAnalisis.heartbeat < limite)
+        .values(estado="pendiente")
+    ).rowcount
+    db.commit()
+    if count:
+        logger.warning(f"{count} trabajo(s) huérfano(s) reencolado(s)")
+    return count
+
+
+# ============================================================
+# WORKER
+# ============================================================
+class WorkerTrabajos:
+    def __init__(
+        self,
+        analyzer_fn: Callable[[], Any],
+        session_factory=None,
+        workers: int = 1,
+        chunk_size: int = 64,
+        lease_seconds: int = 120,
+        poll_seconds: float = 1.0,
+        chunk_retries: int = 2
+    ):
+        if session_factory is None:
+            from backend.config.database import SessionLocal
+            session_factory = SessionLocal
+
+        self.analyzer_fn = analyzer_fn
+        self.session_factory = session_factory
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.chunk_retries = max(0, chunk_retries)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        with self.session_factory() as db:
+            reencolarHuerfanos(db, self.lease_seconds)
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"trabajos-lote-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.session_factory() as db:
+                    trabajo_id = self._reclamar(db)
+                    if trabajo_id is None:
+                        reencolarHuerfanos(db, self.lease_seconds)
+                    else:
+                        self._procesar(db, trabajo_id)
+                        continue
+            except Exception as e:
+                logger.error(f"Error en el worker de trabajos: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def _reclamar(self, db: Session) -> Optional[int]:
+        candidatos = [
+            row[0] for row in db.query(TrabajoAnalisis.id)
+            .filter(TrabajoAnalisis.estado == "pendiente")
+            .order_by(TrabajoAnalisis.id)
+            .limit(5)
+        ]
+        for trabajo_id in candidatos:
+            # UPDATE condicional: solo un worker (de cualquier proceso) lo gana
+            won = db.execute(
+                update(TrabajoAnalisis)
+                .where(TrabajoAnalisis.id == trabajo_id, TrabajoAnalisis.estado == "pendiente")
+                .values(estado="en_proceso", heartbeat=ahora(), intentos=TrabajoAnalisis.intentos + 1)
+            ).rowcount
+            db.commit()
+            if won:
+                return trabajo_id
+        return None
+
+    def _procesar(self, db: Session, trabajo_id: int) -> None:
+        trabajo = db.get(TrabajoAnalisis, trabajo_id)
+        if trabajo.started_at is None:
+            trabajo.started_at = ahora()
+            db.commit()
+        logger.info(f"Procesando trabajo {trabajo_id} ({trabajo.procesados}/{trabajo.total})")
+
+        try:
+            while not self._stop.is_set():
+                filas = (
+                    db.query(FilaTrabajo)
+                    .filter(FilaTrabajo.trabajo_id == trabajo_id, FilaTrabajo.estado == "pendiente")
+                    .order_by(FilaTrabajo.indice)
+                    .limit(self.chunk_size)
+                    .all()
+                )
+                if not filas:
+                    # trabajo.error solo lo deja un bloque fallido
+                    _finalizar(db, trabajo, "parcial" if trabajo.error else "completado")
+                    db.commit()
+                    logger.info(
+                        f"Trabajo {trabajo_id} {trabajo.estado}: {trabajo.guardados} guardados, {trabajo.errores} errores"
+                    )
+                    return
+
+                self._procesarBloque(db, trabajo, filas)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Trabajo {trabajo_id} fallido: {e}")
+            trabajo = db.get(TrabajoAnalisis, trabajo_id)
+            _finalizar(db, trabajo, "fallido", str(e))
+            db.commit()
+            return
+
+        # Parada ordenada: otro worker lo retomará
+        trabajo.estado = "pendiente"
+        db.commit()
+
+    def _procesarBloque(self, db: Session, trabajo: TrabajoAnalisis, filas: List[FilaTrabajo]) -> None:
+        """
+        Procesa un bloque con reintentos; si sigue fallando, fila a fila, y
+        las filas que fallen solas quedan en "error" con el motivo.
+        """
+        bloque = f"{filas[0].indice}-{filas[-1].indice}"
+        for intento in range(self.chunk_retries + 1):
+            try:
+                self._procesarFilas(db, trabajo, filas)
+                return
+            except Exception as e:
+                # El rollback expira trabajo y filas: se recargan al usarlos
+                db.rollback()
+                logger.warning(
+                    f"Bloque {bloque} del trabajo {trabajo.id} fallido "
+                    f"(intento {intento + 1}/{self.chunk_retries + 1}): {e}"
+                )
+                if self._stop.wait(self.poll_seconds * (intento + 1)):
+                    return
+
+        for fila in filas:
+            if fila.estado != "pendiente":
+                continue
+            try:
+                self._procesarFilas(db, trabajo, [fila])
+            except Exception as e:
+                db.rollback()
+                fila.estado, fila.error = "error", f"Bloque {bloque} fallido: {e}"
+                trabajo.error = f"Bloque {bloque} fallido: {e}"
+                actualizarContadores(db, trabajo)
+                trabajo.heartbeat = ahora()
+                db.commit()
+
+    def _procesarFilas(self, db: Session, trabajo: TrabajoAnalisis, filas: List[FilaTrabajo]) -> None:
+        # Análisis y estado de las filas se confirman en el mismo commit
+        salidas = analizarFilas(
+            self.analyzer_fn(), db, [f.datos for f in filas],
+            clave_lote=trabajo.clave_lote,
+            huellas=[f.hash_fila for f in filas],
+            rango=(filas[0].indice, filas[-1].indice)
+        )
+        for fila, salida in zip(filas, salidas):
+            if salida.error:
+                fila.estado, fila.error = "error", salida.error
+            else:
+                fila.estado = "omitida" if salida.omitida else "ok"
+                fila.analisis_id = salida.analisis_id
+        db.flush()
+
+        actualizarContadores(db, trabajo)
+        trabajo.heartbeat = ahora()
+        db.commit()
+
+
+# ============================================================
+# ANÁLISIS POR BLOQUES
+# ============================================================
+class SalidaFila(NamedTuple):
+    analisis_id: Optional[int]
+    resultado: Optional[Dict[str, Any]]
+    error: Optional[str]
+    omitida: bool = False
+
+
+def analizarFilas(
+    analyzer,
+    db: Session,
+    filas: List[Dict[str, Any]],
+    clave_lote: Optional[str] = None,
+    huellas: Optional[List[str]] = None,
+    rango: Optional[Tuple[int, int]] = None
+) -> List[SalidaFila]:
+    """
+    Analiza y guarda (sin commit) un bloque de filas de entrada. Con
+    `clave_lote` se omiten las filas cuya huella ya está guardada y se
+    registra el checkpoint del bloque en la misma transacción. Devuelve una
+    salida por fila, en el orden de `filas`.
+    """
+    salidas = [SalidaFila(None, None, "Fila sin comentario")] * len(filas)
+
+    persistidas = filasPersistidas(db, clave_lote, huellas) if clave_lote else {}
+    for i, huella in enumerate(huellas or []):
+        if huella in persistidas:
+            salidas[i] = SalidaFila(persistidas[huella], None, None, omitida=True)
+
+    validas = [
+        i for i, fila in enumerate(filas)
+        if not salidas[i].omitida
+        and isinstance((fila or {}).get("comentario"), str) and fila["comentario"].strip()
+    ]
+    textos = [filas[i]["comentario"] for i in validas]
+    metas = [{
+        "comentario_original": filas[i]["comentario"],
+        "departamento": filas[i].get("departamento"),
+        "equipo": filas[i].get("equipo"),
+        "fecha": filas[i].get("fecha"),
+    } for i in validas]
+    resultados = analyzer.analyze_batch(textos, metas) if textos else []
+
+    ids = insertarAnalisisBulk(db, resultados, chunk_size=len(resultados) or 1, commit=False)
+    for i, resultado, analisis_id in zip(validas, resultados, ids):
+        error = None if analisis_id is not None else "Error guardando análisis"
+        salidas[i] = SalidaFila(analisis_id, resultado, error)
+
+    if clave_lote:
+        inicio, fin = rango or (0, len(filas) - 1)
+        registrarBloque(
+            db, clave_lote,
+            [(huellas[i], ids[n]) for n, i in enumerate(validas) if ids[n] is not None],
+            inicio, fin,
+            omitidas=sum(1 for salida in salidas if salida.omitida)
+        )
+    return salidas
+
+
+def streamAnalisis(
+    analyzer_fn: Callable[[], Any],
+    filas: Iterable[Dict[str, Any]],
+    chunk_size: int = 64,
+    session_factory=None,
+    al_terminar: Optional[Callable[[], None]] = None,
+    clave_lote: Optional[str] = None
+) -> Iterator[str]:
+    """
+    Análisis síncrono en NDJSON: una línea por fila de entrada, emitida al
+    terminar cada bloque, y una línea final con el resumen. La sesión es
+    propia porque el cuerpo se genera después de cerrar las dependencias
+    de la petición.
+    """
+    if session_factory is None:
+        from backend.config.database import SessionLocal
+        session_factory = SessionLocal
+
+    huella = HuellaFilas() if clave_lote else None
+    procesados = guardados = omitidas = 0
+    try:
+        with session_factory() as db:
+            for chunk in _bloques(filas, max(1, chunk_size)):
+                huellas = [huella(f) for f in chunk] if huella else None
+                for intento in range(2):
+                    try:
+                        salidas = analizarFilas(
+                            analyzer_fn(), db, chunk,
+                            clave_lote=clave_lote,
+                            huellas=huellas,
+                            rango=(procesados, procesados + len(chunk) - 1)
+                        )
+                        db.commit()
+                        break
+                    except IntegrityError:
+                        # Otro envío del mismo lote guardó a la vez parte del
+                        # bloque: al repetirlo esas filas salen como omitidas
+                        db.rollback()
+                        if intento:
+                            raise
+
+                for salida in salidas:
+                    linea = {"indice": procesados, "id": salida.analisis_id}
+                    if salida.omitida:
+                        linea["omitida"] = True
+                    if salida.error:
+                        linea["error"] = salida.error
+                    if salida.resultado is not None:
+                        linea["analisis"] = salida.resultado
+                    procesados += 1
+                    omitidas += int(salida.omitida)
+                    guardados += int(salida.analisis_id is not None and not salida.omitida)
+                    yield json.dumps(linea, ensure_ascii=False, default=str) + "\n"
+    finally:
+        if al_terminar:
+            al_terminar()
+
+    resumen = {"procesados": procesados, "guardados": guardados, "omitidas": omitidas}
+    yield json.dumps({"resumen": resumen}) + "\n"
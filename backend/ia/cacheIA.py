@@ -0,0 +1,262 @@
+# ia/cacheIA.py
+"""
+Caché de resultados de inferencia direccionada por contenido.
+
+La clave combina el hash del texto ya limpio (`limpiarTextoBasico`) con la
+huella de la configuración de IA (ids de modelos, categorías y umbrales), de
+modo que cambiar un modelo o `IAConfig.categorias` invalida las entradas
+sin necesidad de vaciar la caché.
+
+Hay dos capas:
+- InferenceCache: LRU en memoria por proceso (L1).
+- PersistentInferenceCache: tabla `cache_inferencia` en la BD (L2), compartida
+  por todos los workers y por los procesos batch; sobrevive a reinicios.
+  Las entradas caducan a los `persistent_cache_ttl_seconds` y se
+  sobrescriben al volver a calcularse.
+
+Solo se guardan resultados completos: si alguna etapa del análisis cayó en
+su valor por defecto, NLPAnalyzer no lo pasa a la caché.
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from sqlalchemy import insert
+
+from backend.ia.configIA import IAConfig
+
+logger = logging.getLogger("NLPAnalyzer")
+
+
+def huellaConfig(cfg: IAConfig, extra: Optional[Dict[str, Any]] = None) -> str:
+    """Hash estable de todo lo que influye en la salida del analizador."""
+    datos = {
+        "sentiment_model": cfg.sentiment_model,
+        "emotion_model": cfg.emotion_model,
+        "zeroshot_model": cfg.zeroshot_model,
+        "summarizer_model": cfg.summarizer_model,
+        "backend": cfg.backend,
+        "category_engine": cfg.category_engine,
+        "embedding_model": cfg.embedding_model,
+        "categorias": list(cfg.categorias),
+        "min_score_categoria": cfg.min_score_categoria,
+        "stress_map": cfg.stress_map,
+        "max_len_summary": cfg.max_len_summary,
+        "max_len_models": cfg.max_len_models,
+        "extra": extra or {},
+    }
+    raw = json.dumps(datos, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def hashTexto(clean_text: str) -> str:
+    return hashlib.sha256(clean_text.encode("utf-8")).hexdigest()
+
+
+def claveAnalisis(clean_text: str, huella: str) -> str:
+    return f"{huella}:{hashTexto(clean_text)}"
+
+
+class InferenceCache:
+    """LRU en memoria con expiración por TTL y contadores de uso (thread-safe)."""
+
+    def __init__(self, max_items: int = 5000, ttl_seconds: float = 3600):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = item
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        if self.max_items <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic(), copy.deepcopy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "items": len(self._data),
+                "max_items": self.max_items,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class PersistentInferenceCache:
+    """
+    Caché persistente en la tabla `cache_inferencia`, clave (hash del texto,
+    huella de modelos). Con `ttl_seconds` las entradas más antiguas cuentan
+    como fallo y la siguiente escritura las sustituye (0 = sin caducidad).
+    Cualquier fallo de BD se registra y se trata como fallo de caché: nunca
+    interrumpe el análisis.
+    """
+
+    def __init__(self, session_factory=None, ttl_seconds: float = 0):
+        from backend.config.database import SessionLocal
+        from backend.core.coreModels import CacheInferencia
+
+        self._session_factory = session_factory or SessionLocal
+        self._model = CacheInferencia
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    @staticmethod
+    def _ahora() -> datetime:
+        # Marca escrita por la aplicación (UTC sin zona), no por el servidor de BD
+        return datetime.utcnow()
+
+    def _vigentes(self):
+        """Filtro de entradas sin caducar (vacío si no hay TTL)."""
+        if not self.ttl_seconds:
+            return []
+        return [self._model.created_at >= self._ahora() - timedelta(seconds=self.ttl_seconds)]
+
+    def get_many(self, version: str, digests: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not digests:
+            return {}
+
+        M = self._model
+        found: Dict[str, Dict[str, Any]] = {}
+        try:
+            with self._session_factory() as db:
+                # Trozos para no superar límites de parámetros del driver
+                for start in range(0, len(digests), 500):
+                    chunk = digests[start:start + 500]
+                    rows = db.query(M.clave, M.resultado).filter(
+                        M.version_modelos == version,
+                        M.clave.in_(chunk),
+                        *self._vigentes()
+                    ).all()
+                    for clave, resultado in rows:
+                        found[clave] = resultado
+        except Exception as e:
+            logger.warning(f"Caché persistente no disponible (lectura): {e}")
+            with self._lock:
+                self.errors += 1
+            return {}
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(digests) - len(found)
+        return found
+
+    def set_many(self, version: str, items: Dict[str, Dict[str, Any]]) -> None:
+        if not items:
+            return
+
+        momento = self._ahora()
+        rows = [
+            {"clave": clave, "version_modelos": version, "resultado": value, "created_at": momento}
+            for clave, value in items.items()
+        ]
+        try:
+            with self._session_factory() as db:
+                db.execute(self._upsert(db), rows)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Caché persistente no disponible (escritura): {e}")
+            with self._lock:
+                self.errors += 1
+            return
+
+        with self._lock:
+            self.writes += len(rows)
+
+    def _upsert(self, db):
+        """
+        INSERT que sobrescribe la entrada existente (caducada, o guardada a la
+        vez por otro worker): el resultado recién calculado es el bueno.
+        """
+        T = self._model.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            from sqlalchemy.dialects.mysql import insert as insert_mysql
+            stmt = insert_mysql(T)
+            return stmt.on_duplicate_key_update(
+                resultado=stmt.inserted.resultado, created_at=stmt.inserted.created_at
+            )
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+            else:
+                from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+            stmt = insert_dialecto(T)
+            return stmt.on_conflict_do_update(
+                index_elements=["clave", "version_modelos"],
+                set_={"resultado": stmt.excluded.resultado, "created_at": stmt.excluded.created_at}
+            )
+        return insert(T)
+
+    def purgar(self, version_actual: str) -> int:
+        """
+        Elimina las entradas de versiones de modelos distintas a la actual y
+        las caducadas.
+        """
+        M = self._model
+        condicion = M.version_modelos != version_actual
+        if self.ttl_seconds:
+            condicion = condicion | (M.created_at < self._ahora() - timedelta(seconds=self.ttl_seconds))
+        with self._session_factory() as db:
+            borrados = db.query(M).filter(condicion).delete(synchronize_session=False)
+            db.commit()
+        return borrados
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "writes": self.writes,
+                "errors": self.errors,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -0,0 +1,165 @@
+# ia/carrilesIA.py
+"""
+Carriles de prioridad para la inferencia: "interactivo" (análisis
+individual, chat del agente) y "masivo" (lotes, CSV, trabajos).
+
+Solo se limita el carril masivo. El interactivo entra siempre, sin cola:
+un tope fijo de peticiones de chat a la vez dejaría sin sentido el
+micro-batching, que agrupa justamente las peticiones simultáneas. Sus
+peticiones activas sí cuentan como ocupación: el masivo solo toma una plaza
+nueva si el total de activas está por debajo de `slots` y nunca ocupa más
+de `slots - reservados_interactivo`, así que esas plazas quedan siempre
+libres para el chat. El trabajo masivo pide su plaza por sub-lote (no por
+lote entero), así que cede la CPU al chat entre sub-lotes.
+
+El control de admisión rechaza trabajo masivo nuevo cuando su cola supera
+`max_cola_masivo`; los endpoints lo traducen a 429 con Retry-After.
+"""
+
+from __future__ import annotations
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional
+import math
+import threading
+import time
+
+import numpy as np
+
+INTERACTIVO = "interactivo"
+MASIVO = "masivo"
+CARRILES = (INTERACTIVO, MASIVO)
+
+
+class CarrilSaturado(Exception):
+    def __init__(self, carril: str, retry_after: int):
+        super().__init__(f"Carril '{carril}' saturado; reintentar en {retry_after}s")
+        self.carril = carril
+        self.retry_after = retry_after
+
+
+class CarrilesInferencia:
+    def __init__(
+        self,
+        slots: int = 4,
+        reservados_interactivo: int = 1,
+        max_cola_masivo: int = 8,
+        enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.slots = max(1, slots)
+        # El masivo conserva al menos una plaza
+        self.reservados = min(max(0, reservados_interactivo), self.slots - 1)
+        self.max_cola_masivo = max_cola_masivo
+
+        self._cond = threading.Condition()
+        self._activos = {c: 0 for c in CARRILES}
+        self._esperando = {c: 0 for c in CARRILES}
+        self._admitidos = {c: 0 for c in CARRILES}
+        self._rechazados = {c: 0 for c in CARRILES}
+        self._esperas = {c: deque(maxlen=1000) for c in CARRILES}
+        self._duraciones = {c: deque(maxlen=200) for c in CARRILES}
+
+    # --------------------------------------------------
+    # PLAZAS
+    # --------------------------------------------------
+    def _puede_entrar(self, carril: str) -> bool:
+        if carril == INTERACTIVO:
+            return True
+        return (
+            sum(self._activos.values()) < self.slots
+            and self._activos[MASIVO] < self.slots - self.reservados
+        )
+
+    @contextmanager
+    def _plaza(self, carril: str):
+        start = time.perf_counter()
+        with self._cond:
+            self._esperando[carril] += 1
+            try:
+                while not self._puede_entrar(carril):
+                    self._cond.wait()
+            finally:
+                self._esperando[carril] -= 1
+            self._activos[carril] += 1
+            self._admitidos[carril] += 1
+            self._esperas[carril].append(time.perf_counter() - start)
+
+        entrada = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._activos[carril] -= 1
+                self._duraciones[carril].append(time.perf_counter() - entrada)
+                self._cond.notify_all()
+
+    def slot(self, carril: str):
+        """Contexto que ocupa una plaza del carril mientras dura la inferencia."""
+        if not self.enabled:
+            return nullcontext()
+        return self._plaza(carril)
+
+    # --------------------------------------------------
+    # ADMISIÓN
+    # --------------------------------------------------
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que se vacíe la cola masiva actual."""
+        with self._cond:
+            duraciones = list(self._duraciones[MASIVO])
+            cola = self._esperando[MASIVO]
+        media = sum(duraciones) / len(duraciones) if duraciones else 1.0
+        plazas = max(1, self.slots - self.reservados)
+        return max(1, math.ceil(media * (cola + 1) / plazas))
+
+    def admitir(self, carril: str = MASIVO) -> None:
+        """Lanza CarrilSaturado si la cola del carril masivo está llena."""
+        if not self.enabled or carril != MASIVO:
+            return
+        with self._cond:
+            saturado = self._esperando[MASIVO] >= self.max_cola_masivo
+            if saturado:
+                self._rechazados[MASIVO] += 1
+        if saturado:
+            raise CarrilSaturado(MASIVO, self.retry_after())
+
+    # --------------------------------------------------
+    # MÉTRICAS
+    # --------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            carriles = {}
+            for c in CARRILES:
+                esperas = np.asarray(self._esperas[c]) * 1000
+                carriles[c] = {
+                    "cola": self._esperando[c],
+                    "activos": self._activos[c],
+                    "admitidos": self._admitidos[c],
+                    "rechazados": self._rechazados[c],
+                    "espera_media_ms": round(float(esperas.mean()), 2) if esperas.size else 0.0,
+                    "espera_p95_ms": round(float(np.percentile(esperas, 95)), 2) if esperas.size else 0.0,
+                }
+        return {
+            "enabled": self.enabled,
+            "slots": self.slots,
+            "reservados_interactivo": self.reservados,
+            "max_cola_masivo": self.max_cola_masivo,
+            "carriles": carriles,
+        }
+
+
+# Un único juego de carriles por proceso: todos los analizadores comparten la CPU
+_carriles: Optional[CarrilesInferencia] = None
+_carriles_lock = threading.Lock()
+
+def get_carriles(cfg) -> CarrilesInferencia:
+    global _carriles
+    with _carriles_lock:
+        if _carriles is None:
+            _carriles = CarrilesInferencia(
+                slots=cfg.lane_slots,
+                reservados_interactivo=cfg.lane_interactive_reserved,
+                max_cola_masivo=cfg.lane_bulk_max_queue,
+                enabled=cfg.lanes_enabled
+            )
+        return _carriles
@@ -0,0 +1,311 @@
+# ia/categoriasEmbeddings.py
+"""
+Clasificador de categorías por similitud de embeddings.
+
+Alternativa al zero-shot NLI (una pasada por cada una de las 14 categorías):
+el comentario se codifica UNA vez y se compara, con similitud coseno
+vectorizada, contra embeddings precalculados de cada categoría y de frases
+prototipo. Se activa con `IAConfig.category_engine = "embeddings"`.
+
+El umbral de coseno se calibra contra el motor NLI: con una muestra de
+comentarios se toma como referencia la salida NLI con `min_score_categoria`
+y se elige el umbral que maximiza el F1 de acuerdo. La calibración se guarda
+en `IAConfig.embedding_calibration_file`.
+
+Uso (calibración + reporte de acuerdo con comentarios de la BD):
+    python -m backend.ia.categoriasEmbeddings --limite 500
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import hashlib
+import json
+import logging
+import threading
+
+import numpy as np
+
+from backend.ia.configIA import IAConfig
+
+logger = logging.getLogger("NLPAnalyzer")
+
+# Frases prototipo por categoría; la propia etiqueta se añade siempre
+PROTOTIPOS: Dict[str, List[str]] = {
+    "sobrecarga laboral": [
+        "Tengo demasiado trabajo y no alcanzo a terminar mis tareas.",
+        "Trabajamos horas extra constantemente por exceso de carga.",
+    ],
+    "liderazgo": [
+        "Mi jefe no nos orienta ni toma decisiones a tiempo.",
+        "La gestión del supervisor afecta al equipo.",
+    ],
+    "comunicación": [
+        "No nos informan de los cambios y la información no fluye.",
+        "Falta comunicación entre áreas y con la dirección.",
+    ],
+    "reconocimiento": [
+        "Nadie valora ni reconoce el esfuerzo que hacemos.",
+        "Me gustaría que se reconocieran los logros del equipo.",
+    ],
+    "remuneración": [
+        "El salario no es acorde a las responsabilidades.",
+        "Los pagos y beneficios económicos son insuficientes.",
+    ],
+    "equilibrio vida-trabajo": [
+        "No tengo tiempo para mi familia por el trabajo.",
+        "Me escriben fuera del horario laboral y los fines de semana.",
+    ],
+    "ambiente laboral": [
+        "El ambiente en la oficina es tenso e incómodo.",
+        "Hay muy buen clima de trabajo con los compañeros.",
+    ],
+    "procesos": [
+        "Los procesos son burocráticos y hay demasiados pasos de aprobación.",
+        "Los procedimientos internos no están claros.",
+    ],
+    "tecnología/herramientas": [
+        "Las computadoras y el sistema son lentos y fallan.",
+        "Necesitamos mejores herramientas y software para trabajar.",
+    ],
+    "conflictos internos": [
+        "Hay peleas y roces constantes entre compañeros.",
+        "Existe un conflicto entre equipos que nadie resuelve.",
+    ],
+    "recursos insuficientes": [
+        "No tenemos personal ni materiales suficientes.",
+        "Falta presupuesto y recursos para cumplir los objetivos.",
+    ],
+    "formación/capacitación": [
+        "Quisiera recibir capacitación y cursos para crecer.",
+        "No nos entrenan en las nuevas herramientas.",
+    ],
+    "satisfacción general": [
+        "Estoy contento y satisfecho con mi trabajo.",
+        "En general me siento bien en la empresa.",
+    ],
+    "motivación": [
+        "Me siento desmotivado y sin ganas de venir a trabajar.",
+        "Tengo mucha motivación por los nuevos proyectos.",
+    ],
+}
+
+
+def _huella(cfg: IAConfig) -> str:
+    raw = json.dumps(
+        [cfg.embedding_model, list(cfg.categorias), cfg.min_score_categoria],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class EmbeddingCategoryClassifier:
+    def __init__(self, cfg: IAConfig, models):
+        self.cfg = cfg
+        self.models = models
+        self._lock = threading.Lock()
+        self._protos_key: Optional[tuple] = None
+        self._protos: Optional[np.ndarray] = None
+        self._owner: Optional[np.ndarray] = None
+        self._threshold: Optional[float] = None
+        self._threshold_key: Optional[str] = None
+
+    # --------------------------------------------------
+    # EMBEDDINGS
+    # --------------------------------------------------
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embeddings normalizados (mean pooling) en lotes ordenados por longitud."""
+        import torch
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        pipe = self.models.embeddings()
+        tokenizer, model = pipe.tokenizer, pipe.model
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = [None] * len(texts)
+
+        with torch.no_grad():
+            for start in range(0, len(order), self.cfg.batch_size):
+                idx = order[start:start + self.cfg.batch_size]
+                enc = tokenizer(
+                    [texts[i] for i in idx],
+                    padding=True, truncation=True, max_length=256, return_tensors="pt"
+                )
+                hidden = model(**enc).last_hidden_state
+                mask = enc["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+                for pos, i in enumerate(idx):
+                    out[i] = pooled[pos].cpu().numpy()
+
+        emb = np.vstack(out).astype(np.float32)
+        emb /= np.linalg.norm(emb, axis=1, keepdims=True).clip(min=1e-9)
+        return emb
+
+    def _prototypes(self):
+        # Se recalculan si cambia la lista de categorías
+        key = tuple(self.cfg.categorias)
+        with self._lock:
+            if self._protos_key != key:
+                frases, owner = [], []
+                for c, categoria in enumerate(self.cfg.categorias):
+                    for frase in [categoria] + PROTOTIPOS.get(categoria, []):
+                        frases.append(frase)
+                        owner.append(c)
+                self._protos = self.embed(frases)
+                self._owner = np.asarray(owner)
+                self._protos_key = key
+            return self._protos, self._owner
+
+    def scores(self, texts: Sequence[str]) -> np.ndarray:
+        """Matriz (n_textos, n_categorias): máximo coseno contra los prototipos de cada categoría."""
+        protos, owner = self._prototypes()
+        sims = self.embed(texts) @ protos.T
+        # Los prototipos de una misma categoría son contiguos: max por segmento
+        starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+        return np.maximum.reduceat(sims, starts, axis=1)
+
+    # --------------------------------------------------
+    # UMBRAL
+    # --------------------------------------------------
+    @property
+    def threshold(self) -> float:
+        key = _huella(self.cfg)
+        if self._threshold_key != key:
+            self._threshold = self.cfg.embedding_min_score
+            path = Path(self.cfg.embedding_calibration_file)
+            if path.exists():
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("huella") == key:
+                    self._threshold = float(data["umbral"])
+                else:
+                    logger.warning("Calibración de embeddings desactualizada; se usa embedding_min_score")
+            self._threshold_key = key
+        return self._threshold
+
+    def save_threshold(self, umbral: float, muestras: int) -> None:
+        path = Path(self.cfg.embedding_calibration_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "huella": _huella(self.cfg),
+            "umbral": umbral,
+            "muestras": muestras,
+            "referencia_min_score_categoria": self.cfg.min_score_categoria,
+        }, indent=2), encoding="utf-8")
+        self._threshold_key = None
+
+    # --------------------------------------------------
+    # PREDICCIÓN
+    # --------------------------------------------------
+    def labels_from_scores(self, scores: np.ndarray, threshold: Optional[float] = None) -> List[List[str]]:
+        threshold = self.threshold if threshold is None else threshold
+        result = []
+        for row in scores:
+            order = np.argsort(-row)
+            result.append([self.cfg.categorias[c] for c in order if row[c] >= threshold])
+        return result
+
+    def predict(self, texts: Sequence[str]) -> List[List[str]]:
+        return self.labels_from_scores(self.scores(texts))
+
+
+# ======================================================
+# CALIBRACIÓN Y ACUERDO CON NLI
+# ======================================================
+def _binarizar(labels: List[List[str]], categorias: List[str]) -> np.ndarray:
+    index = {c: i for i, c in enumerate(categorias)}
+    m = np.zeros((len(labels), len(categorias)), dtype=bool)
+    for r, row in enumerate(labels):
+        for label in row:
+            if label in index:
+                m[r, index[label]] = True
+    return m
+
+
+def _f1(pred: np.ndarray, ref: np.ndarray) -> float:
+    tp = np.logical_and(pred, ref).sum()
+    fp = np.logical_and(pred, ~ref).sum()
+    fn = np.logical_and(~pred, ref).sum()
+    return float(2 * tp / (2 * tp + fp + fn)) if tp else 0.0
+
+
+def calibrarUmbral(scores: np.ndarray, referencia: List[List[str]], categorias: List[str]) -> float:
+    """Umbral de coseno que maximiza el F1 micro frente a las etiquetas NLI."""
+    ref = _binarizar(referencia, categorias)
+    candidatos = np.unique(np.round(scores, 3))
+    best, best_f1 = float(candidatos.max()) if candidatos.size else 0.5, -1.0
+    for umbral in candidatos:
+        f1 = _f1(scores >= umbral, ref)
+        if f1 > best_f1:
+            best, best_f1 = float(umbral), f1
+    return best
+
+
+def reporteAcuerdo(
+    referencia: List[List[str]],
+    prediccion: List[List[str]],
+    categorias: List[str]
+) -> Dict[str, Any]:
+    """Acuerdo del motor de embeddings con el NLI: global y por categoría."""
+    ref = _binarizar(referencia, categorias)
+    pred = _binarizar(prediccion, categorias)
+
+    union = np.logical_or(ref, pred).sum(axis=1)
+    inter = np.logical_and(ref, pred).sum(axis=1)
+    jaccard = np.where(union > 0, inter / np.maximum(union, 1), 1.0)
+
+    por_categoria = {}
+    for c, categoria in enumerate(categorias):
+        tp = int(np.logical_and(pred[:, c], ref[:, c]).sum())
+        por_categoria[categoria] = {
+            "nli": int(ref[:, c].sum()),
+            "embeddings": int(pred[:, c].sum()),
+            "ambos": tp,
+            "f1": _f1(pred[:, c], ref[:, c]),
+        }
+
+    return {
+        "muestras": len(referencia),
+        "f1_micro": _f1(pred, ref),
+        "jaccard_medio": float(jaccard.mean()) if len(jaccard) else 0.0,
+        "coincidencia_exacta": float((ref == pred).all(axis=1).mean()) if len(ref) else 0.0,
+        "por_categoria": por_categoria,
+    }
+
+
+def calibrarYReportar(analyzer, textos: List[str]) -> Dict[str, Any]:
+    """Calibra el umbral con `textos` y devuelve el reporte de acuerdo resultante."""
+    from backend.ia.iaCore import limpiarTextoBasico, trim
+
+    textos = [trim(limpiarTextoBasico(t), analyzer.cfg.max_len_models) for t in textos if t]
+    referencia = [analyzer._detect_categories_nli(t) for t in textos]
+
+    clf = analyzer.embedding_categorizer
+    scores = clf.scores(textos)
+    umbral = calibrarUmbral(scores, referencia, list(analyzer.cfg.categorias))
+    clf.save_threshold(umbral, len(textos))
+
+    reporte = reporteAcuerdo(referencia, clf.labels_from_scores(scores, umbral), list(analyzer.cfg.categorias))
+    reporte["umbral"] = umbral
+    return reporte
+
+
+if __name__ == "__main__":
+    import argparse
+    from dataclasses import replace
+
+    from backend.config.database import SessionLocal
+    from backend.core.coreModels import AnalisisComentario
+    from backend.ia.iaCore import NLPAnalyzer, cfg_from_settings
+
+    parser = argparse.ArgumentParser(description="Calibra el motor de categorías por embeddings")
+    parser.add_argument("--limite", type=int, default=500)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rows = db.query(AnalisisComentario.comentario).order_by(
+            AnalisisComentario.id.desc()
+        ).limit(args.limite).all()
+
+    analyzer = NLPAnalyzer(replace(cfg_from_settings(), persistent_cache_enabled=False))
+    print(json.dumps(calibrarYReportar(analyzer, [r[0] for r in rows]), indent=2, ensure_ascii=False))
@@ -1,6 +1,7 @@
 # ia/configIA.py
 from dataclasses import dataclass, field
 from typing import List, Dict
+import os
 
 CATEGORIAS_BASE = [
     "sobrecarga laboral", "liderazgo", "comunicación", "reconocimiento",
@@ -30,3 +31,53 @@ class IAConfig:
     stress_keywords: Dict[str,set] = field(default_factory=lambda: STRESS_KEYWORDS)
     max_len_summary: int = 800
     max_len_models: int = 1000
+    # Tamaño de lote para NLPAnalyzer.analyze_batch
+    batch_size: int = 16
+    # Ejecutar emoción, estrés, categorías y resumen a la vez en un pool acotado
+    parallel_stages: bool = False
+    stage_workers: int = 4
+    # Hilos intra-op de cada modelo (torch y ONNX); 0 = automático
+    intra_op_threads: int = 0
+    # Micro-batching de peticiones concurrentes con un solo texto
+    microbatch_enabled: bool = False
+    microbatch_max_size: int = 16
+    microbatch_max_wait_ms: float = 5.0
+    # Carriles de prioridad: plazas de inferencia concurrente para el carril
+    # masivo (el interactivo no espera, pero ocupa), cuántas quedan reservadas
+    # al interactivo y cola máxima del masivo antes de rechazar
+    lanes_enabled: bool = True
+    lane_slots: int = 4
+    lane_interactive_reserved: int = 1
+    lane_bulk_max_queue: int = 8
+    # Caché en memoria de resultados (LRU + TTL)
+    cache_enabled: bool = True
+    cache_max_items: int = 5000
+    cache_ttl_seconds: float = 3600
+    # Segunda capa persistente en BD, compartida entre workers y procesos batch;
+    # sus entradas caducan (y se recalculan) pasado el TTL (0 = sin caducidad)
+    persistent_cache_enabled: bool = True
+    persistent_cache_ttl_seconds: float = 7 * 24 * 3600
+    # Backend de inferencia: "torch" (por defecto), "onnx" (requiere optimum[onnxruntime])
+    # o "fast" (modelo estudiante destilado para sentiment, emoción y categorías)
+    backend: str = "torch"
+    onnx_cache_dir: str = ".onnx_cache"
+    student_dir: str = ".ia_cache/estudiante"
+    student_base_model: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    # Motor de categorías: "nli" (zero-shot, una pasada por categoría) o
+    # "embeddings" (un embedding por comentario + coseno contra prototipos)
+    category_engine: str = "nli"
+    embedding_model: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    embedding_min_score: float = 0.45
+    embedding_calibration_file: str = ".ia_cache/calibracion_categorias.json"
+
+    def resolved_intra_op_threads(self) -> int:
+        """
+        Hilos intra-op efectivos: los fijados en `intra_op_threads` o, con
+        `parallel_stages`, núcleos / stage_workers para que las etapas
+        simultáneas no compitan por todos los núcleos. 0 = los del runtime.
+        """
+        if self.intra_op_threads > 0:
+            return self.intra_op_threads
+        if self.parallel_stages:
+            return max(1, (os.cpu_count() or 1) // max(1, self.stage_workers))
+        return 0
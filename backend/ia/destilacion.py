@@ -0,0 +1,453 @@
+# ia/destilacion.py
+"""
+Destilación de los pipelines "profesores" en un modelo estudiante multitarea.
+
+Las salidas ya guardadas de NLPAnalyzer en `analisis_comentarios` sirven de
+etiquetas: sentimiento (sent_pos/neu/neg), emoción (emotion_label) y
+categorías (categories). Se entrena un encoder pequeño compartido con tres
+cabezas (sentimiento, emoción y categorías multi-etiqueta), todo en CPU.
+
+ModelRegistry lo carga como backend "fast" (`IAConfig.backend = "fast"`):
+los adaptadores imitan la salida de los pipelines de sentiment, emotion y
+zero-shot, de modo que NLPAnalyzer no cambia. Un mismo comentario se
+codifica una sola vez para las tres tareas. El summarizer sigue siendo el
+profesor.
+
+La partición es por hash del texto (`cubeta`): un comentario cae siempre
+del mismo lado, también los repetidos y los que lleguen después. Hay tres
+lados: retenidos (`esRetenido`, solo para medir), calibración (`esCalibracion`,
+donde se ajusta el umbral de categorías) y entrenamiento. Los porcentajes
+se guardan en student.json, y tanto el acuerdo de student.json como
+`evaluar` se miden solo sobre comentarios retenidos, que no se usaron ni
+para entrenar ni para calibrar.
+
+Uso:
+    python -m backend.ia.destilacion entrenar --limite 20000 --epocas 3
+    python -m backend.ia.destilacion evaluar --limite 2000
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+
+import numpy as np
+import torch
+from torch import nn
+from transformers import AutoModel, AutoTokenizer
+
+from backend.ia.configIA import IAConfig
+
+logger = logging.getLogger("NLPAnalyzer")
+
+SENTIMENT_LABELS = ["NEG", "NEU", "POS"]
+HEADS_FILE = "heads.pt"
+META_FILE = "student.json"
+# Porcentaje de comentarios retenidos para medir (no se entrena ni calibra con ellos)
+RETENIDO_PCT = 10
+# Porcentaje siguiente, para ajustar el umbral de categorías
+CALIBRACION_PCT = 10
+
+# Etiquetas en español guardadas en BD -> etiqueta del profesor que
+# `map_emotion` vuelve a traducir a la misma etiqueta en español
+_EMOCION_A_PROFESOR = {
+    "alegría": "joy", "tristeza": "sadness", "enojo": "anger", "miedo": "fear",
+    "rechazo": "disgust", "sorpresa": "surprise", "frustración": "frustration",
+    "agotamiento": "burnout", "ansiedad": "anxiety", "neutral": "others",
+}
+
+
+# ======================================================
+# MODELO
+# ======================================================
+class MultiTaskStudent(nn.Module):
+    def __init__(self, base_model: str, n_emotions: int, n_categories: int, encoder=None):
+        super().__init__()
+        self.encoder = encoder or AutoModel.from_pretrained(base_model)
+        hidden = self.encoder.config.hidden_size
+        self.dropout = nn.Dropout(0.1)
+        self.sentiment = nn.Linear(hidden, len(SENTIMENT_LABELS))
+        self.emotion = nn.Linear(hidden, n_emotions)
+        self.categories = nn.Linear(hidden, n_categories)
+
+    def forward(self, input_ids, attention_mask, **_):
+        hidden = self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+        pooled = self.dropout((hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9))
+        return self.sentiment(pooled), self.emotion(pooled), self.categories(pooled)
+
+
+# ======================================================
+# DATOS
+# ======================================================
+def _sentiment_index(row) -> int:
+    dist = [row.sent_neg or 0.0, row.sent_neu or 0.0, row.sent_pos or 0.0]
+    return int(np.argmax(dist)) if any(dist) else 1
+
+
+def cubeta(texto: str) -> int:
+    """Cubeta estable 0-99 del texto, base de la partición."""
+    return int(hashlib.sha256(texto.encode("utf-8")).hexdigest()[:8], 16) % 100
+
+
+def esRetenido(texto: str, retenido_pct: int) -> bool:
+    """True si el comentario se reserva para medir (ni entrenamiento ni calibración)."""
+    return cubeta(texto) < retenido_pct
+
+
+def esCalibracion(texto: str, retenido_pct: int, calibracion_pct: int) -> bool:
+    """True si el comentario se reserva para ajustar el umbral de categorías."""
+    return retenido_pct <= cubeta(texto) < retenido_pct + calibracion_pct
+
+
+def cargarEjemplos(
+    db,
+    limite: int,
+    retenido_pct: Optional[int] = None,
+    retenidos: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Los `limite` comentarios más recientes. Con `retenido_pct`, solo los del
+    lado indicado de la partición (retenidos o de entrenamiento).
+    """
+    from backend.core.coreModels import AnalisisComentario
+
+    query = db.query(
+        AnalisisComentario.comentario,
+        AnalisisComentario.emotion_label,
+        AnalisisComentario.sent_pos,
+        AnalisisComentario.sent_neu,
+        AnalisisComentario.sent_neg,
+        AnalisisComentario.categories
+    ).filter(AnalisisComentario.comentario != "").order_by(
+        AnalisisComentario.id.desc()
+    )
+
+    ejemplos = []
+    filas = query.limit(limite) if retenido_pct is None else query.yield_per(1000)
+    for r in filas:
+        if retenido_pct is not None and esRetenido(r.comentario, retenido_pct) != retenidos:
+            continue
+        ejemplos.append({
+            "texto": r.comentario,
+            "sentiment": _sentiment_index(r),
+            "emotion": r.emotion_label or "neutral",
+            "categories": [c.get("label") for c in (r.categories or []) if isinstance(c, dict)],
+        })
+        if len(ejemplos) >= limite:
+            break
+    return ejemplos
+
+
+def _batches(items: Sequence, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# ======================================================
+# EVALUACIÓN
+# ======================================================
+def _micro_f1(pred: np.ndarray, ref: np.ndarray) -> float:
+    tp = np.logical_and(pred, ref).sum()
+    fp = np.logical_and(pred, ~ref).sum()
+    fn = np.logical_and(~pred, ref).sum()
+    return float(2 * tp / (2 * tp + fp + fn)) if tp else 0.0
+
+
+def _predict_raw(model, tokenizer, textos: List[str], max_length: int, batch_size: int = 64):
+    model.eval()
+    sent, emo, cat = [], [], []
+    with torch.no_grad():
+        for chunk in _batches(textos, batch_size):
+            enc = tokenizer(chunk, padding=True, truncation=True, max_length=max_length, return_tensors="pt")
+            s, e, c = model(**enc)
+            sent.append(torch.softmax(s, -1).numpy())
+            emo.append(torch.softmax(e, -1).numpy())
+            cat.append(torch.sigmoid(c).numpy())
+    return np.vstack(sent), np.vstack(emo), np.vstack(cat)
+
+
+def _best_threshold(probs: np.ndarray, ref: np.ndarray) -> float:
+    best, best_f1 = 0.5, -1.0
+    for t in np.arange(0.05, 0.96, 0.05):
+        f1 = _micro_f1(probs >= t, ref)
+        if f1 > best_f1:
+            best, best_f1 = float(t), f1
+    return best
+
+
+def reporteAcuerdo(model, tokenizer, meta: Dict[str, Any], ejemplos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Acuerdo del estudiante con los profesores sobre `ejemplos`."""
+    if not ejemplos:
+        return {"muestras": 0}
+
+    textos = [e["texto"] for e in ejemplos]
+    start = time.perf_counter()
+    sent, emo, cat = _predict_raw(model, tokenizer, textos, meta["max_length"])
+    elapsed = time.perf_counter() - start
+
+    emociones, categorias = meta["emociones"], meta["categorias"]
+    ref_cat = np.array([[c in e["categories"] for c in categorias] for e in ejemplos], dtype=bool)
+
+    return {
+        "muestras": len(ejemplos),
+        "sentimiento_acuerdo": float(np.mean(sent.argmax(1) == [e["sentiment"] for e in ejemplos])),
+        "emocion_acuerdo": float(np.mean([
+            emociones[i] == e["emotion"] for i, e in zip(emo.argmax(1), ejemplos)
+        ])),
+        "categorias_f1_micro": _micro_f1(cat >= meta["umbral_categorias"], ref_cat),
+        "ms_por_comentario": 1000 * elapsed / len(ejemplos),
+    }
+
+
+# ======================================================
+# ENTRENAMIENTO
+# ======================================================
+def entrenar(
+    ejemplos: List[Dict[str, Any]],
+    salida: str,
+    cfg: Optional[IAConfig] = None,
+    epocas: int = 3,
+    batch_size: int = 32,
+    lr: float = 5e-5,
+    max_length: int = 128,
+    semilla: int = 13,
+    retenido_pct: int = RETENIDO_PCT,
+    calibracion_pct: int = CALIBRACION_PCT
+) -> Dict[str, Any]:
+    cfg = cfg or IAConfig()
+    random.seed(semilla)
+    torch.manual_seed(semilla)
+
+    categorias = list(cfg.categorias)
+    emociones = sorted({e["emotion"] for e in ejemplos} | {"neutral"})
+    emo_index = {e: i for i, e in enumerate(emociones)}
+
+    val = [e for e in ejemplos if esRetenido(e["texto"], retenido_pct)]
+    calibracion = [e for e in ejemplos if esCalibracion(e["texto"], retenido_pct, calibracion_pct)]
+    train = [e for e in ejemplos if cubeta(e["texto"]) >= retenido_pct + calibracion_pct]
+
+    tokenizer = AutoTokenizer.from_pretrained(cfg.student_base_model)
+    model = MultiTaskStudent(cfg.student_base_model, len(emociones), len(categorias))
+    optimizer = torch.optim.AdamW(model.parameters(), lr=lr)
+    ce = nn.CrossEntropyLoss()
+    bce = nn.BCEWithLogitsLoss()
+
+    for epoca in range(epocas):
+        model.train()
+        random.shuffle(train)
+        total, pasos = 0.0, 0
+        for chunk in _batches(train, batch_size):
+            enc = tokenizer([e["texto"] for e in chunk], padding=True, truncation=True,
+                            max_length=max_length, return_tensors="pt")
+            y_sent = torch.tensor([e["sentiment"] for e in chunk])
+            y_emo = torch.tensor([emo_index[e["emotion"]] for e in chunk])
+            y_cat = torch.tensor([[float(c in e["categories"]) for c in categorias] for e in chunk])
+
+            s, em, c = model(**enc)
+            loss = ce(s, y_sent) + ce(em, y_emo) + bce(c, y_cat)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item()
+            pasos += 1
+        logger.info(f"Época {epoca + 1}/{epocas}: loss medio {total / max(pasos, 1):.4f}")
+
+    meta: Dict[str, Any] = {
+        "base_model": cfg.student_base_model,
+        "emociones": emociones,
+        "categorias": categorias,
+        "max_length": max_length,
+        "umbral_categorias": 0.5,
+        "entrenado_con": len(train),
+        "calibrado_con": len(calibracion),
+        "particion": {
+            "metodo": "sha256(texto) % 100: < retenido_pct retenido, < retenido_pct + calibracion_pct calibración",
+            "retenido_pct": retenido_pct,
+            "calibracion_pct": calibracion_pct
+        },
+        "version": time.strftime("%Y%m%d%H%M%S"),
+    }
+
+    # Umbral de categorías ajustado en calibración para acercarse al profesor;
+    # el acuerdo se mide aparte, sobre retenidos que el umbral no ha visto
+    if calibracion:
+        _, _, cat = _predict_raw(model, tokenizer, [e["texto"] for e in calibracion], max_length)
+        ref = np.array([[c in e["categories"] for c in categorias] for e in calibracion], dtype=bool)
+        meta["umbral_categorias"] = _best_threshold(cat, ref)
+    meta["acuerdo_validacion"] = reporteAcuerdo(model, tokenizer, meta, val)
+
+    path = Path(salida)
+    path.mkdir(parents=True, exist_ok=True)
+    model.encoder.save_pretrained(path / "encoder")
+    tokenizer.save_pretrained(path / "encoder")
+    torch.save({k: v for k, v in model.state_dict().items() if not k.startswith("encoder.")}, path / HEADS_FILE)
+    (path / META_FILE).write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+    return meta
+
+
+def cargarEstudiante(path: str):
+    path = Path(path)
+    meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+    encoder = AutoModel.from_pretrained(path / "encoder")
+    tokenizer = AutoTokenizer.from_pretrained(path / "encoder")
+    model = MultiTaskStudent(meta["base_model"], len(meta["emociones"]), len(meta["categorias"]), encoder=encoder)
+    model.load_state_dict(torch.load(path / HEADS_FILE), strict=False)
+    model.eval()
+    return model, tokenizer, meta
+
+
+# ======================================================
+# ADAPTADORES PARA ModelRegistry (backend "fast")
+# ======================================================
+class StudentRuntime:
+    """
+    Modelo estudiante cargado una vez por proceso. Guarda las salidas de
+    los últimos textos para que sentiment, emotion y categorías de un mismo
+    comentario compartan un único forward del encoder.
+    """
+
+    def __init__(self, path: str, memo_size: int = 256):
+        self.model, self.tokenizer, self.meta = cargarEstudiante(path)
+        self._memo: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    def predict(self, textos: List[str]) -> List[tuple]:
+        with self._lock:
+            missing = [t for t in dict.fromkeys(textos) if t not in self._memo]
+
+        if missing:
+            sent, emo, cat = _predict_raw(self.model, self.tokenizer, missing, self.meta["max_length"])
+            with self._lock:
+                for i, t in enumerate(missing):
+                    self._memo[t] = (sent[i], emo[i], cat[i])
+                    self._memo.move_to_end(t)
+                while len(self._memo) > self._memo_size:
+                    self._memo.popitem(last=False)
+
+        with self._lock:
+            # Si la memo se llenó durante la llamada se recalcula lo que falte
+            if any(t not in self._memo for t in textos):
+                s, e, c = _predict_raw(self.model, self.tokenizer, textos, self.meta["max_length"])
+                return list(zip(s, e, c))
+            return [self._memo[t] for t in textos]
+
+
+class StudentPipeline:
+    """Imita la interfaz de un pipeline de transformers para una cabeza del estudiante."""
+
+    def __init__(self, runtime: StudentRuntime, task: str, cfg: IAConfig):
+        self.runtime = runtime
+        self.task = task
+        self.cfg = cfg
+        self.model = runtime.model
+        self.tokenizer = runtime.tokenizer
+
+    def _category_scores(self, probs: np.ndarray) -> np.ndarray:
+        # Reescala de forma monótona para que el umbral aprendido coincida
+        # con min_score_categoria, que es el que aplica NLPAnalyzer
+        t = self.runtime.meta["umbral_categorias"]
+        m = self.cfg.min_score_categoria
+        return np.where(probs < t, probs * m / t, m + (probs - t) * (1 - m) / (1 - t))
+
+    def _one(self, out, candidate_labels=None) -> Dict[str, Any]:
+        sent, emo, cat = out
+        if self.task == "sentiment":
+            i = int(sent.argmax())
+            return {"label": SENTIMENT_LABELS[i], "score": float(sent[i])}
+
+        if self.task == "emotion":
+            i = int(emo.argmax())
+            label = self.runtime.meta["emociones"][i]
+            return {"label": _EMOCION_A_PROFESOR.get(label, "others"), "score": float(emo[i])}
+
+        categorias = self.runtime.meta["categorias"]
+        scores = dict(zip(categorias, self._category_scores(cat)))
+        labels = [c for c in (candidate_labels or categorias) if c in scores]
+        labels.sort(key=lambda c: -scores[c])
+        return {"labels": labels, "scores": [float(scores[c]) for c in labels]}
+
+    def __call__(self, inputs, *args, **kwargs):
+        candidate_labels = args[0] if args else kwargs.get("candidate_labels")
+        textos = inputs if isinstance(inputs, list) else [inputs]
+        outs = [self._one(o, candidate_labels) for o in self.runtime.predict(textos)]
+
+        if isinstance(inputs, list):
+            return outs
+        return outs[0] if self.task == "zeroshot" else outs[:1]
+
+
+_versiones: Dict[str, tuple] = {}
+
+
+def versionEstudiante(cfg: IAConfig) -> Optional[str]:
+    """Versión del estudiante en disco (entra en la huella de la caché de resultados)."""
+    path = Path(cfg.student_dir) / META_FILE
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    cached = _versiones.get(cfg.student_dir)
+    if cached is None or cached[0] != mtime:
+        meta = json.loads(path.read_text(encoding="utf-8"))
+        cached = (mtime, meta.get("version"))
+        _versiones[cfg.student_dir] = cached
+    return cached[1]
+
+
+_runtimes: Dict[str, StudentRuntime] = {}
+_runtimes_lock = threading.Lock()
+
+
+def cargarPipelineEstudiante(task: str, cfg: IAConfig) -> StudentPipeline:
+    with _runtimes_lock:
+        if cfg.student_dir not in _runtimes:
+            logger.info(f"Cargando modelo estudiante desde {cfg.student_dir}")
+            _runtimes[cfg.student_dir] = StudentRuntime(cfg.student_dir)
+        runtime = _runtimes[cfg.student_dir]
+
+    if task == "zeroshot" and runtime.meta["categorias"] != list(cfg.categorias):
+        raise ValueError("El estudiante se entrenó con otras categorías; hay que reentrenarlo")
+    return StudentPipeline(runtime, task, cfg)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.config.database import SessionLocal
+    from backend.ia.iaCore import cfg_from_settings
+
+    parser = argparse.ArgumentParser(description="Destilación del modelo estudiante multitarea")
+    parser.add_argument("accion", choices=["entrenar", "evaluar"])
+    parser.add_argument("--limite", type=int, default=20000)
+    parser.add_argument("--epocas", type=int, default=3)
+    parser.add_argument("--salida", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cfg = cfg_from_settings()
+    salida = args.salida or cfg.student_dir
+
+    if args.accion == "entrenar":
+        with SessionLocal() as db:
+            ejemplos = cargarEjemplos(db, args.limite)
+        resultado = entrenar(ejemplos, salida, cfg, epocas=args.epocas)
+    else:
+        model, tokenizer, meta = cargarEstudiante(salida)
+        particion = meta.get("particion")
+        if particion is None or "calibracion_pct" not in particion:
+            # Sin calibración aparte el umbral se ajustó sobre los retenidos
+            raise SystemExit("El estudiante se entrenó sin partición de calibración: reentrénalo para evaluarlo")
+        # Solo comentarios retenidos: no se usaron al entrenar ni al calibrar
+        with SessionLocal() as db:
+            ejemplos = cargarEjemplos(db, args.limite, particion["retenido_pct"], retenidos=True)
+        resultado = reporteAcuerdo(model, tokenizer, meta, ejemplos)
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
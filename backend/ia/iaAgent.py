@@ -16,7 +16,7 @@ from typing import Dict, Any, List, Optional, Tuple
 import logging
 from datetime import datetime
 
-from backend.ia.iaCore import NLPAnalyzer
+from backend.ia.iaCore import NLPAnalyzer, get_analyzer
 from backend.ia.preProcesamiento import limpiarTextoBasico
 
 logger = logging.getLogger("AgenteAutonomo")
@@ -464,7 +464,7 @@ class AgenteAutonomo:
 
     def __init__(self, nlp_analyzer: Optional[NLPAnalyzer] = None):
         """Inicializa con acceso al analizador NLP existente"""
-        self.nlp = nlp_analyzer or NLPAnalyzer()
+        self.nlp = nlp_analyzer or get_analyzer()
         self.cfg = AgenteConfig()
         self.estrategias = EstrategiasPreguntas()
         self.detector = DetectorBloqueos()
@@ -1,10 +1,23 @@
 from __future__ import annotations
 from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+import copy
 import logging
+import threading
+import time
 
 from transformers import pipeline, Pipeline
 from backend.ia.configIA import IAConfig
 from backend.ia.preProcesamiento import limpiarTextoBasico
+from backend.ia.onnxBackend import ONNX_PIPELINES, cargarPipelineONNX, tamanoONNX
+from backend.ia.categoriasEmbeddings import EmbeddingCategoryClassifier
+from backend.ia.schedulerIA import MicroBatcher
+from backend.ia.carrilesIA import INTERACTIVO, MASIVO, get_carriles
+from backend.ia.destilacion import cargarPipelineEstudiante, versionEstudiante
+from backend.ia.cacheIA import (
+    InferenceCache, PersistentInferenceCache, huellaConfig, claveAnalisis, hashTexto
+)
 
 # ======================================================
 # CONFIGURACIÓN DE LOGS
@@ -40,6 +53,18 @@ EMOTION_MAP = {
 
 DEFAULT_EMOTION = "neutral"
 
+# Marca interna de un elemento cuyo pipeline falló dentro de un lote
+_FALLO = object()
+
+# Pipelines que el modelo estudiante (backend "fast") puede sustituir
+STUDENT_PIPELINES = {"sentiment", "emotion", "zeroshot"}
+
+# Pipelines cuyas llamadas individuales concurrentes se agrupan en micro-lotes
+MICROBATCH_PIPELINES = {"sentiment", "emotion", "zeroshot", "summarizer"}
+
+# Etapas independientes de un análisis (emoción, estrés, categorías, resumen)
+ETAPAS = 4
+
 def map_emotion(label: str) -> str:
     label = (label or "").lower().strip()
     return EMOTION_MAP.get(label, DEFAULT_EMOTION)
@@ -51,60 +76,236 @@ def trim(text: str, max_len: int) -> str:
     text = text.strip()
     return text if len(text) <= max_len else text[:max_len].rsplit(" ", 1)[0]
 
+def primero(output):
+    # Los pipelines devuelven [dict] para un texto suelto y dict por elemento en lotes
+    return output[0] if isinstance(output, list) else output
+
 # ======================================================
 # REGISTRO DE MODELOS
 # ======================================================
 class ModelRegistry:
+    # nombre -> (tarea de transformers, atributo de IAConfig con el id del modelo, descripción)
+    PIPELINES = {
+        "sentiment": ("sentiment-analysis", "sentiment_model", "Sentiment Analysis"),
+        "emotion": ("text-classification", "emotion_model", "Emotion Detection"),
+        "zeroshot": ("zero-shot-classification", "zeroshot_model", "Zero-Shot"),
+        "summarizer": ("summarization", "summarizer_model", "Summarization"),
+        "embeddings": ("feature-extraction", "embedding_model", "Embeddings"),
+    }
+
+    WARMUP_TEXT = (
+        "Me siento bien con mi equipo, aunque la carga de trabajo ha aumentado "
+        "bastante este mes y las reuniones no dejan tiempo para terminar las tareas."
+    )
+
     def __init__(self, cfg: IAConfig):
         self.cfg = cfg
-        self._sentiment = None
-        self._emotion = None
-        self._zeroshot = None
-        self._summary = None
+        self._pipelines: Dict[str, Pipeline] = {}
+        self._lock = threading.Lock()
+        # Backend con el que realmente se cargó cada pipeline ("torch" | "onnx" | "fast")
+        self.backends: Dict[str, str] = {}
+        self._active = 0
+        self._active_lock = threading.Lock()
+        # pendiente -> cargando -> listo | error
+        self._state: Dict[str, str] = {name: "pendiente" for name in self.PIPELINES}
+
+    def _get(self, name: str):
+        pipe = self._pipelines.get(name)
+        if pipe is not None:
+            return pipe
+
+        # Evita que dos peticiones concurrentes carguen el mismo modelo dos veces
+        with self._lock:
+            if name not in self._pipelines:
+                task, attr, desc = self.PIPELINES[name]
+                logger.info(f"Cargando modelo de {desc}")
+                self._state[name] = "cargando"
+                try:
+                    pipe = self._load(name, task, getattr(self.cfg, attr))
+                    if self.cfg.microbatch_enabled and name in MICROBATCH_PIPELINES:
+                        pipe = MicroBatcher(
+                            name,
+                            pipe,
+                            max_batch=self.cfg.microbatch_max_size,
+                            max_wait_ms=self.cfg.microbatch_max_wait_ms,
+                            single_as_list=name != "zeroshot",
+                            active_fn=self.active_requests
+                        )
+                    self._pipelines[name] = pipe
+                except Exception:
+                    self._state[name] = "error"
+                    raise
+                self._state[name] = "listo"
+            return self._pipelines[name]
+
+    def _load(self, name: str, task: str, model_id: str):
+        if self.cfg.backend == "fast" and name in STUDENT_PIPELINES:
+            try:
+                pipe = cargarPipelineEstudiante(name, self.cfg)
+                self.backends[name] = "fast"
+                return pipe
+            except (OSError, ValueError) as e:
+                logger.warning(f"Modelo estudiante no disponible ({e}); se usa el profesor para '{name}'")
+
+        if self.cfg.backend == "onnx" and name in ONNX_PIPELINES:
+            try:
+                pipe = cargarPipelineONNX(task, self.cfg, model_id)
+                self.backends[name] = "onnx"
+                return pipe
+            except ImportError as e:
+                logger.warning(f"Backend ONNX no disponible ({e}); se usa PyTorch para '{name}'")
+
+        self.backends[name] = "torch"
+        return pipeline(task, model=model_id, device=-1, truncation=True)
+
+    @contextmanager
+    def request(self):
+        """Marca una petición de análisis en curso (lo usa el micro-batching)."""
+        with self._active_lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._active_lock:
+                self._active -= 1
+
+    def active_requests(self) -> int:
+        return self._active
+
+    def scheduler_stats(self) -> Dict[str, Any]:
+        return {
+            name: pipe.stats() for name, pipe in self._pipelines.items()
+            if isinstance(pipe, MicroBatcher)
+        }
 
     def sentiment(self):
-        if self._sentiment is None:
-            logger.info("Cargando modelo de Sentiment Analysis")
-            self._sentiment = pipeline(
-                "sentiment-analysis",
-                model=self.cfg.sentiment_model,
-                device=-1,
-                truncation=True
-            )
-        return self._sentiment
+        return self._get("sentiment")
 
     def emotion(self):
-        if self._emotion is None:
-            logger.info("Cargando modelo de Emotion Detection")
-            self._emotion = pipeline(
-                "text-classification",
-                model=self.cfg.emotion_model,
-                device=-1,
-                truncation=True
-            )
-        return self._emotion
+        return self._get("emotion")
 
     def zeroshot(self):
-        if self._zeroshot is None:
-            logger.info("Cargando modelo Zero-Shot")
-            self._zeroshot = pipeline(
-                "zero-shot-classification",
-                model=self.cfg.zeroshot_model,
-                device=-1,
-                truncation=True
-            )
-        return self._zeroshot
+        return self._get("zeroshot")
 
     def summarizer(self):
-        if self._summary is None:
-            logger.info("Cargando modelo de Summarization")
-            self._summary = pipeline(
-                "summarization",
-                model=self.cfg.summarizer_model,
-                device=-1,
-                truncation=True
-            )
-        return self._summary
+        return self._get("summarizer")
+
+    def embeddings(self):
+        return self._get("embeddings")
+
+    def active_pipelines(self) -> List[str]:
+        """Pipelines que usa la configuración actual (solo un motor de categorías)."""
+        unused = "zeroshot" if self.cfg.category_engine == "embeddings" else "embeddings"
+        return [name for name in self.PIPELINES if name != unused]
+
+    def warmup(self, names: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Carga los pipelines y ejecuta una inferencia de prueba en cada uno
+        para que la primera petición real no pague la carga ni la
+        inicialización perezosa de torch. Devuelve el estado final.
+        """
+        calls = {
+            "sentiment": lambda p: p(self.WARMUP_TEXT),
+            "emotion": lambda p: p(self.WARMUP_TEXT),
+            "zeroshot": lambda p: p(self.WARMUP_TEXT, self.cfg.categorias, multi_label=True),
+            "summarizer": lambda p: p(self.WARMUP_TEXT, max_length=80, min_length=30, do_sample=False),
+            "embeddings": lambda p: p(self.WARMUP_TEXT),
+        }
+        for name in names or self.active_pipelines():
+            try:
+                pipe = self._get(name)
+                self._state[name] = "cargando"
+                start = time.perf_counter()
+                calls[name](pipe)
+                self._state[name] = "listo"
+                logger.info(f"Modelo '{name}' listo ({time.perf_counter() - start:.2f}s de warm-up)")
+            except Exception as e:
+                self._state[name] = "error"
+                logger.error(f"Error en warm-up de '{name}': {e}")
+        return self.status()
+
+    def status(self) -> Dict[str, str]:
+        return dict(self._state)
+
+    def ready(self) -> bool:
+        return all(self._state[name] == "listo" for name in self.active_pipelines())
+
+    def memory_report(self) -> List[Dict[str, Any]]:
+        """Pipelines cargados y tamaño residente de sus pesos."""
+        report = []
+        seen: Dict[int, str] = {}
+        for name, (_, attr, _) in self.PIPELINES.items():
+            pipe = self._pipelines.get(name)
+            entry = {"pipeline": name, "model": getattr(self.cfg, attr), "loaded": pipe is not None}
+            if pipe is not None:
+                entry["backend"] = self.backends.get(name)
+            if self.backends.get(name) == "fast":
+                entry["model"] = self.cfg.student_dir
+            model = getattr(pipe, "model", None)
+            if self.backends.get(name) == "onnx":
+                entry["mb"] = tamanoONNX(self.cfg, getattr(self.cfg, attr))
+            elif model is not None and id(model) in seen:
+                # Las cabezas del estudiante comparten encoder: no se cuenta dos veces
+                entry["compartido_con"] = seen[id(model)]
+            elif hasattr(model, "parameters"):
+                params, size = 0, 0
+                for t in list(model.parameters()) + list(model.buffers()):
+                    params += t.numel()
+                    size += t.numel() * t.element_size()
+                entry.update({"parametros": params, "mb": round(size / 1024 ** 2, 1)})
+                seen[id(model)] = name
+            report.append(entry)
+        return report
+
+
+# Un único registro por conjunto de modelos y proceso: todos los routers
+# y el agente comparten los mismos pesos en memoria
+_registries: Dict[Tuple[str, ...], ModelRegistry] = {}
+_registries_lock = threading.Lock()
+
+def get_model_registry(cfg: IAConfig) -> ModelRegistry:
+    key = (cfg.backend, cfg.microbatch_enabled) + tuple(getattr(cfg, attr) for _, attr, _ in ModelRegistry.PIPELINES.values())
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = ModelRegistry(cfg)
+        return _registries[key]
+
+def loaded_registries() -> List[ModelRegistry]:
+    with _registries_lock:
+        return list(_registries.values())
+
+# ======================================================
+# TIEMPOS POR ETAPA
+# ======================================================
+class StageTimings:
+    """Acumula tiempo de reloj (wall-clock) por etapa del análisis."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            d = self._data.setdefault(stage, {"count": 0, "total_s": 0.0, "max_s": 0.0, "last_s": 0.0})
+            d["count"] += 1
+            d["total_s"] += seconds
+            d["max_s"] = max(d["max_s"], seconds)
+            d["last_s"] = seconds
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {**d, "avg_s": d["total_s"] / d["count"] if d["count"] else 0.0}
+                for stage, d in self._data.items()
+            }
 
 # ======================================================
 # ANALIZADOR PRINCIPAL
@@ -112,68 +313,181 @@ class ModelRegistry:
 class NLPAnalyzer:
     def __init__(self, cfg: Optional[IAConfig] = None):
         self.cfg = cfg or IAConfig()
-        self.models = ModelRegistry(self.cfg)
+        self.models = get_model_registry(self.cfg)
+        self.cache = (
+            InferenceCache(self.cfg.cache_max_items, self.cfg.cache_ttl_seconds)
+            if self.cfg.cache_enabled else None
+        )
+        self.persistent_cache = (
+            PersistentInferenceCache(ttl_seconds=self.cfg.persistent_cache_ttl_seconds)
+            if self.cfg.persistent_cache_enabled else None
+        )
+        self.embedding_categorizer = EmbeddingCategoryClassifier(self.cfg, self.models)
+        self.timings = StageTimings()
+        # Prioridad del chat frente a los lotes (compartido por todo el proceso)
+        self.carriles = get_carriles(self.cfg)
+        # Un pool de etapas por carril: las etapas del chat no hacen cola
+        # detrás de las de un lote ya admitido
+        self._stage_pools: Dict[str, ThreadPoolExecutor] = {}
+        self._stage_pool_lock = threading.Lock()
+
+    def _fingerprint(self) -> str:
+        extra = None
+        if self.cfg.category_engine == "embeddings":
+            # Recalibrar el umbral cambia los resultados: forma parte de la huella
+            extra = {"umbral_embeddings": self.embedding_categorizer.threshold}
+        if self.cfg.backend == "fast":
+            # Reentrenar el estudiante también invalida los resultados guardados
+            extra = dict(extra or {}, estudiante=versionEstudiante(self.cfg))
+        return huellaConfig(self.cfg, extra)
+
+    # --------------------------------------------------
+    # CACHÉ DE RESULTADOS (L1 en memoria, L2 persistente)
+    # --------------------------------------------------
+    def _lookup(self, clean_texts: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Busca resultados ya calculados para los textos limpios. Devuelve
+        {texto: resultado sin meta}. La huella se recalcula en cada llamada:
+        si cambian categorías o modelos las entradas anteriores dejan de
+        coincidir sin invalidación explícita.
+        """
+        if self.cache is None and self.persistent_cache is None:
+            return {}
+
+        huella = self._fingerprint()
+        found: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+
+        for t in dict.fromkeys(clean_texts):
+            cached = self.cache.get(claveAnalisis(t, huella)) if self.cache is not None else None
+            if cached is not None:
+                found[t] = cached
+            else:
+                missing.append(t)
+
+        if missing and self.persistent_cache is not None:
+            by_digest = {hashTexto(t): t for t in missing}
+            for digest, value in self.persistent_cache.get_many(huella, list(by_digest)).items():
+                t = by_digest[digest]
+                found[t] = value
+                if self.cache is not None:
+                    self.cache.set(claveAnalisis(t, huella), value)
+
+        return found
+
+    def _store(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Guarda {texto limpio: resultado} en ambas capas (sin la meta del
+        llamador). Solo resultados completos: los degradados (alguna etapa
+        cayó en su valor por defecto) no se pasan aquí.
+        """
+        if not results or (self.cache is None and self.persistent_cache is None):
+            return
+
+        huella = self._fingerprint()
+        values = {t: {k: v for k, v in r.items() if k != "meta"} for t, r in results.items()}
+
+        if self.cache is not None:
+            for t, value in values.items():
+                self.cache.set(claveAnalisis(t, huella), value)
+
+        if self.persistent_cache is not None:
+            self.persistent_cache.set_many(huella, {hashTexto(t): v for t, v in values.items()})
+
+    @staticmethod
+    def _fallo(fallos: Optional[List[str]], stage: str, error: Exception) -> None:
+        """Anota que la etapa usó su valor por defecto: el resultado no se cachea."""
+        logger.warning(f"Etapa '{stage}' fallida, se usa el valor por defecto: {error}")
+        if fallos is not None:
+            fallos.append(stage)
+
+    @staticmethod
+    def _with_meta(result: Dict[str, Any], meta: dict) -> Dict[str, Any]:
+        result = copy.deepcopy(result)
+        result["meta"] = meta
+        return result
 
     # --------------------------------------------------
     # EMOCIÓN
     # --------------------------------------------------
-    def _detect_emotion(self, text: str) -> Tuple[str, float]:
+    @staticmethod
+    def _emotion_from_output(output) -> Tuple[str, float]:
+        output = primero(output)
+        return map_emotion(output["label"]), float(output["score"])
+
+    def _detect_emotion(self, text: str, fallos: Optional[List[str]] = None) -> Tuple[str, float]:
         if not meaningful(text):
             return DEFAULT_EMOTION, 0.0
 
         try:
             result = self.models.emotion()(trim(text, self.cfg.max_len_models))
-            label = result[0]["label"]
-            score = float(result[0]["score"])
-            return map_emotion(label), score
-        except Exception:
+            return self._emotion_from_output(result)
+        except Exception as e:
+            self._fallo(fallos, "emotion", e)
             return DEFAULT_EMOTION, 0.0
 
     # --------------------------------------------------
     # ESTRÉS
     # --------------------------------------------------
-    def _detect_stress(self, text: str):
-        try:
-            result = self.models.sentiment()(trim(text, self.cfg.max_len_models))[0]
-            label = result["label"].upper()
-            score = float(result["score"])
+    def _stress_from_output(self, output):
+        output = primero(output)
+        label = output["label"].upper()
+        score = float(output["score"])
 
-            sentiment = "neutral"
-            if "NEG" in label:
-                sentiment = "negative"
-            elif "POS" in label:
-                sentiment = "positive"
+        sentiment = "neutral"
+        if "NEG" in label:
+            sentiment = "negative"
+        elif "POS" in label:
+            sentiment = "positive"
 
-            stress_level = self.cfg.stress_map.get(sentiment, "medio")
-            dist = {"positive": 0, "neutral": 0, "negative": 0}
-            dist[sentiment] = score
+        stress_level = self.cfg.stress_map.get(sentiment, "medio")
+        dist = {"positive": 0, "neutral": 0, "negative": 0}
+        dist[sentiment] = score
 
-            return stress_level, dist
-        except Exception:
+        return stress_level, dist
+
+    def _detect_stress(self, text: str, fallos: Optional[List[str]] = None):
+        try:
+            result = self.models.sentiment()(trim(text, self.cfg.max_len_models))
+            return self._stress_from_output(result)
+        except Exception as e:
+            self._fallo(fallos, "stress", e)
             return "medio", {"positive": 0, "neutral": 1, "negative": 0}
 
     # --------------------------------------------------
     # CATEGORÍAS
     # --------------------------------------------------
-    def _detect_categories(self, text: str) -> List[str]:
+    def _categories_from_output(self, output) -> List[str]:
+        return [
+            label for label, score in zip(output["labels"], output["scores"])
+            if score >= self.cfg.min_score_categoria
+        ]
+
+    def _detect_categories(self, text: str, fallos: Optional[List[str]] = None) -> List[str]:
+        if self.cfg.category_engine == "embeddings":
+            try:
+                return self.embedding_categorizer.predict([trim(text, self.cfg.max_len_models)])[0]
+            except Exception as e:
+                self._fallo(fallos, "categories", e)
+                return []
+        return self._detect_categories_nli(text, fallos)
+
+    def _detect_categories_nli(self, text: str, fallos: Optional[List[str]] = None) -> List[str]:
         try:
             result = self.models.zeroshot()(
                 trim(text, self.cfg.max_len_models),
                 self.cfg.categorias,
                 multi_label=True
             )
-
-            return [
-                label for label, score in zip(result["labels"], result["scores"])
-                if score >= self.cfg.min_score_categoria
-            ]
-        except Exception:
+            return self._categories_from_output(result)
+        except Exception as e:
+            self._fallo(fallos, "categories", e)
             return []
 
     # --------------------------------------------------
     # RESUMEN
     # --------------------------------------------------
-    def _summarize(self, text: str) -> str:
+    def _summarize(self, text: str, fallos: Optional[List[str]] = None) -> str:
         if len(text) <= 140:
             return text
 
@@ -184,8 +498,9 @@ class NLPAnalyzer:
                 min_length=30,
                 do_sample=False
             )
-            return result[0]["summary_text"]
-        except Exception:
+            return primero(result)["summary_text"]
+        except Exception as e:
+            self._fallo(fallos, "summary", e)
             return text[:160]
 
     # --------------------------------------------------
@@ -271,30 +586,347 @@ class NLPAnalyzer:
     # --------------------------------------------------
     # API PRINCIPAL
     # --------------------------------------------------
-    def analyze_comment(self, text: str, meta: dict | None = None) -> Dict[str, Any]:
+    @staticmethod
+    def _empty_result(meta: dict) -> Dict[str, Any]:
+        return {
+            "emotion": {"label": DEFAULT_EMOTION, "score": 0.0},
+            "stress": {"level": "bajo", "sentiment_dist": {"positive": 0, "neutral": 1, "negative": 0}},
+            "categories": [],
+            "summary": "",
+            "suggestion": "Comentario insuficiente para análisis.",
+            "meta": meta
+        }
+
+    def _build_result(
+        self,
+        clean_text: str,
+        meta: dict,
+        emotion: Tuple[str, float],
+        stress: Tuple[str, Dict[str, float]],
+        categories: List[str],
+        summary: str
+    ) -> Dict[str, Any]:
+        emotion_label, emo_score = emotion
+        stress_level, dist = stress
+        return {
+            "emotion": {"label": emotion_label, "score": emo_score},
+            "stress": {"level": stress_level, "sentiment_dist": dist},
+            "categories": [{"label": c} for c in categories],
+            "summary": summary,
+            "suggestion": self._generate_suggestion(stress_level, emotion_label, categories, clean_text),
+            "meta": meta
+        }
+
+    def analyze_comment(self, text: str, meta: dict | None = None, carril: str = INTERACTIVO) -> Dict[str, Any]:
         meta = meta or {}
         clean_text = limpiarTextoBasico(text)
 
         if not meaningful(clean_text):
-            return {
-                "emotion": {"label": DEFAULT_EMOTION, "score": 0.0},
-                "stress": {"level": "bajo", "sentiment_dist": {"positive": 0, "neutral": 1, "negative": 0}},
-                "categories": [],
-                "summary": "",
-                "suggestion": "Comentario insuficiente para análisis.",
-                "meta": meta
-            }
+            return self._empty_result(meta)
+
+        cached = self._lookup([clean_text]).get(clean_text)
+        if cached is not None:
+            return self._with_meta(cached, meta)
+
+        # Etapas que cayeron en su valor por defecto (list.append es atómico)
+        fallos: List[str] = []
+        with self.carriles.slot(carril), self.models.request():
+            stages = self._run_stages(carril, {
+                "emotion": lambda: self._detect_emotion(clean_text, fallos),
+                "stress": lambda: self._detect_stress(clean_text, fallos),
+                "categories": lambda: self._detect_categories(clean_text, fallos),
+                "summary": lambda: self._summarize(clean_text, fallos),
+            })
+        result = self._build_result(
+            clean_text,
+            meta,
+            stages["emotion"],
+            stages["stress"],
+            stages["categories"],
+            stages["summary"]
+        )
+        if not fallos:
+            self._store({clean_text: result})
+        return result
 
-        emotion, emo_score = self._detect_emotion(clean_text)
-        stress, dist = self._detect_stress(clean_text)
-        categories = self._detect_categories(clean_text)
-        summary = self._summarize(clean_text)
+    # --------------------------------------------------
+    # EJECUCIÓN DE ETAPAS
+    # --------------------------------------------------
+    def _pool(self, carril: str) -> ThreadPoolExecutor:
+        with self._stage_pool_lock:
+            if carril not in self._stage_pools:
+                workers = max(1, self.cfg.stage_workers)
+                if carril == INTERACTIVO and self.cfg.microbatch_enabled:
+                    # Las etapas del chat esperan sobre todo a su micro-lote: con
+                    # solo stage_workers hilos las peticiones simultáneas harían
+                    # cola aquí y los lotes no llegarían a formarse
+                    workers = max(workers, self.cfg.microbatch_max_size * ETAPAS)
+                # Los hilos de torch son estado del proceso: se fijan una vez al
+                # arrancar (configure_torch_threads), no al crear el pool
+                logger.info(f"Etapas en paralelo del carril {carril}: {workers} workers")
+                self._stage_pools[carril] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix=f"nlp-etapa-{carril}"
+                )
+            return self._stage_pools[carril]
+
+    def _timed(self, stage: str, fn):
+        with self.timings.measure(stage):
+            return fn()
+
+    def _run_stages(self, carril: str, stages: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ejecuta las etapas independientes del análisis. Con
+        `IAConfig.parallel_stages` se lanzan a la vez en el pool acotado
+        del carril; en ambos modos se registra el tiempo de cada etapa.
+        """
+        if not self.cfg.parallel_stages:
+            return {name: self._timed(name, fn) for name, fn in stages.items()}
+
+        pool = self._pool(carril)
+        with self.timings.measure("total_paralelo"):
+            futures = {name: pool.submit(self._timed, name, fn) for name, fn in stages.items()}
+            return {name: f.result() for name, f in futures.items()}
 
-        return {
-            "emotion": {"label": emotion, "score": emo_score},
-            "stress": {"level": stress, "sentiment_dist": dist},
-            "categories": [{"label": c} for c in categories],
-            "summary": summary,
-            "suggestion": self._generate_suggestion(stress, emotion, categories, clean_text),
-            "meta": meta
+    # --------------------------------------------------
+    # API POR LOTES
+    # --------------------------------------------------
+    def _run_batched(
+        self,
+        texts: List[str],
+        call,
+        single,
+        carril: Optional[str] = None,
+        batch_size: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Ejecuta `call(lista)` sobre los textos ordenados por longitud para
+        minimizar el padding y devuelve los resultados en el orden original.
+        Si el lote falla se procesa texto a texto con `single`, de modo que un
+        comentario problemático no invalida al resto (igual que en modo individual).
+        Con `carril` cada sub-lote de `batch_size` ocupa su propia plaza, de
+        modo que el trabajo interactivo puede colarse entre sub-lotes.
+        """
+        if not texts:
+            return []
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        ordered = [texts[i] for i in order]
+        step = batch_size if carril is not None and batch_size else len(ordered)
+
+        outputs: List[Any] = []
+        for start in range(0, len(ordered), step):
+            chunk = ordered[start:start + step]
+            with self.carriles.slot(carril) if carril is not None else nullcontext():
+                try:
+                    outputs.extend(call(chunk))
+                except Exception as e:
+                    logger.warning(f"Lote fallido, se procesa individualmente: {e}")
+                    for t in chunk:
+                        try:
+                            outputs.append(single(t))
+                        except Exception:
+                            outputs.append(_FALLO)
+
+        results: List[Any] = [None] * len(texts)
+        for pos, i in enumerate(order):
+            results[i] = outputs[pos]
+        return results
+
+    @staticmethod
+    def _safe(parse, output, fallback, fallos: List[str], stage: str):
+        if output is _FALLO:
+            fallos.append(stage)
+            return fallback
+        try:
+            return parse(output)
+        except Exception:
+            fallos.append(stage)
+            return fallback
+
+    def analyze_batch(
+        self,
+        texts: List[str],
+        metas: Optional[List[dict]] = None,
+        batch_size: Optional[int] = None,
+        carril: str = MASIVO
+    ) -> List[Dict[str, Any]]:
+        """
+        Versión por lotes de `analyze_comment`: cada pipeline recibe la lista
+        completa de textos (agrupados por `batch_size`) en lugar de uno a uno.
+        Devuelve, en el mismo orden, exactamente lo que devolvería
+        `analyze_comment` para cada elemento. Corre en el carril masivo.
+        """
+        if metas is None:
+            metas = [{} for _ in texts]
+        if len(metas) != len(texts):
+            raise ValueError("texts y metas deben tener la misma longitud")
+
+        bs = batch_size or self.cfg.batch_size
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+
+        clean: Dict[int, str] = {}
+        for i, (text, meta) in enumerate(zip(texts, metas)):
+            clean_text = limpiarTextoBasico(text)
+            if meaningful(clean_text):
+                clean[i] = clean_text
+            else:
+                results[i] = self._empty_result(meta or {})
+
+        # Una sola consulta a la caché (memoria y persistente) para todo el lote
+        cached = self._lookup(list(clean.values()))
+        pending: List[int] = []
+        for i, clean_text in clean.items():
+            if clean_text in cached:
+                results[i] = self._with_meta(cached[clean_text], metas[i] or {})
+            else:
+                pending.append(i)
+
+        if not pending:
+            return results
+
+        # Los textos repetidos dentro del lote se infieren una sola vez
+        first_by_text: Dict[str, int] = {}
+        duplicates: List[int] = []
+        for i in pending:
+            if clean[i] in first_by_text:
+                duplicates.append(i)
+            else:
+                first_by_text[clean[i]] = i
+        pending = list(first_by_text.values())
+
+        model_inputs = [trim(clean[i], self.cfg.max_len_models) for i in pending]
+
+        if self.cfg.category_engine == "embeddings":
+            # Un solo embedding por comentario; las etiquetas ya vienen resueltas
+            parse_categories = list
+            run_categories = lambda: self._run_batched(
+                model_inputs,
+                self.embedding_categorizer.predict,
+                lambda x: self.embedding_categorizer.predict([x])[0],
+                carril, bs
+            )
+        else:
+            parse_categories = self._categories_from_output
+            run_categories = lambda: self._run_batched(
+                model_inputs,
+                lambda xs: self.models.zeroshot()(xs, self.cfg.categorias, multi_label=True, batch_size=bs),
+                lambda x: self.models.zeroshot()(x, self.cfg.categorias, multi_label=True),
+                carril, bs
+            )
+
+        # Solo los textos largos pasan por el summarizer
+        long_ids = [i for i in pending if len(clean[i]) > 140]
+        summary_kwargs = {"max_length": 80, "min_length": 30, "do_sample": False}
+
+        stages = self._run_stages(carril, {
+            "lote_emotion": lambda: self._run_batched(
+                model_inputs,
+                lambda xs: self.models.emotion()(xs, batch_size=bs),
+                lambda x: self.models.emotion()(x),
+                carril, bs
+            ),
+            "lote_stress": lambda: self._run_batched(
+                model_inputs,
+                lambda xs: self.models.sentiment()(xs, batch_size=bs),
+                lambda x: self.models.sentiment()(x),
+                carril, bs
+            ),
+            "lote_categories": run_categories,
+            "lote_summary": lambda: self._run_batched(
+                [trim(clean[i], self.cfg.max_len_summary) for i in long_ids],
+                lambda xs: self.models.summarizer()(xs, batch_size=bs, **summary_kwargs),
+                lambda x: self.models.summarizer()(x, **summary_kwargs),
+                carril, bs
+            ),
+        })
+        emotions = stages["lote_emotion"]
+        stresses = stages["lote_stress"]
+        categories = stages["lote_categories"]
+        summaries_out = stages["lote_summary"]
+
+        # Etapas que cayeron en su valor por defecto, por elemento
+        fallos: Dict[int, List[str]] = {i: [] for i in pending}
+        summaries = {
+            i: self._safe(lambda o: primero(o)["summary_text"], out, clean[i][:160], fallos[i], "summary")
+            for i, out in zip(long_ids, summaries_out)
         }
+
+        for pos, i in enumerate(pending):
+            results[i] = self._build_result(
+                clean[i],
+                metas[i] or {},
+                self._safe(self._emotion_from_output, emotions[pos], (DEFAULT_EMOTION, 0.0), fallos[i], "emotion"),
+                self._safe(
+                    self._stress_from_output, stresses[pos],
+                    ("medio", {"positive": 0, "neutral": 1, "negative": 0}), fallos[i], "stress"
+                ),
+                self._safe(parse_categories, categories[pos], [], fallos[i], "categories"),
+                summaries.get(i, clean[i])
+            )
+
+        degradados = [i for i in pending if fallos[i]]
+        if degradados:
+            logger.warning(f"{len(degradados)} resultados degradados del lote no se guardan en caché")
+        self._store({clean[i]: results[i] for i in pending if not fallos[i]})
+
+        for i in duplicates:
+            results[i] = self._with_meta(results[first_by_text[clean[i]]], metas[i] or {})
+
+        return results
+
+
+# ======================================================
+# INSTANCIA COMPARTIDA
+# ======================================================
+_analyzer: Optional[NLPAnalyzer] = None
+_analyzer_lock = threading.Lock()
+_torch_threads: Optional[int] = None
+
+def configure_torch_threads(threads: int) -> Optional[int]:
+    """
+    Fija los hilos intra-op de torch para todo el proceso (0 = los que
+    elija torch). Se llama una vez al arrancar con
+    `IAConfig.resolved_intra_op_threads()`, el mismo valor que usan las
+    sesiones ONNX. Devuelve el valor efectivo, o None sin torch.
+    """
+    global _torch_threads
+    try:
+        import torch
+    except ImportError:
+        return None
+    if threads > 0:
+        torch.set_num_threads(threads)
+        logger.info(f"Hilos de torch: {threads}")
+    _torch_threads = torch.get_num_threads()
+    return _torch_threads
+
+def torch_threads() -> Optional[int]:
+    return _torch_threads
+
+def cfg_from_settings() -> IAConfig:
+    """IAConfig por defecto con los ajustes operativos tomados de Settings/.env."""
+    from backend.config.settings import settings
+    return IAConfig(
+        backend=settings.ia_backend,
+        onnx_cache_dir=settings.onnx_cache_dir,
+        student_dir=settings.student_dir,
+        category_engine=settings.category_engine,
+        parallel_stages=settings.parallel_stages,
+        stage_workers=settings.stage_workers,
+        intra_op_threads=settings.intra_op_threads,
+        microbatch_enabled=settings.microbatch_enabled,
+        microbatch_max_size=settings.microbatch_max_size,
+        microbatch_max_wait_ms=settings.microbatch_max_wait_ms,
+        lanes_enabled=settings.lanes_enabled,
+        lane_slots=settings.lane_slots,
+        lane_interactive_reserved=settings.lane_interactive_reserved,
+        lane_bulk_max_queue=settings.lane_bulk_max_queue
+    )
+
+def get_analyzer() -> NLPAnalyzer:
+    """Analizador único del proceso (comparte modelos y cachés entre routers)."""
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            _analyzer = NLPAnalyzer(cfg_from_settings())
+        return _analyzer
@@ -0,0 +1,166 @@
+# ia/onnxBackend.py
+"""
+Backend ONNX Runtime para los clasificadores de ModelRegistry.
+
+Los modelos de sentiment, emoción y zero-shot (todos de clasificación de
+secuencias) se exportan a ONNX la primera vez, se optimiza el grafo y se
+guardan en `IAConfig.onnx_cache_dir`; los arranques siguientes cargan el
+grafo ya exportado. El summarizer (generación seq2seq) sigue en PyTorch.
+
+Dependencia opcional: `optimum[onnxruntime]`. Si no está instalada,
+ModelRegistry vuelve a PyTorch con un aviso.
+
+Uso para comprobar paridad con PyTorch:
+    python -m backend.ia.onnxBackend
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+import os
+
+from transformers import AutoTokenizer, pipeline
+
+from backend.ia.configIA import IAConfig
+
+logger = logging.getLogger("NLPAnalyzer")
+
+# Pipelines de ModelRegistry que pueden ejecutarse con ONNX Runtime
+ONNX_PIPELINES = {"sentiment", "emotion", "zeroshot"}
+
+OPTIMIZED_FILE = "model_optimized.onnx"
+EXPORTED_FILE = "model.onnx"
+
+PARITY_TEXTS = [
+    "Estoy agotado, la carga de trabajo es imposible y nadie nos escucha.",
+    "Me encanta mi equipo, el ambiente laboral es excelente.",
+    "Las herramientas que usamos son lentas y fallan constantemente.",
+    "Mi jefe nunca responde los correos y las decisiones se retrasan semanas.",
+    "Todo bien por ahora, sin novedades.",
+    "Quisiera más capacitación para crecer profesionalmente.",
+]
+
+
+def _session_options(cfg: IAConfig):
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    threads = cfg.resolved_intra_op_threads() or os.cpu_count() or 1
+    opts.intra_op_num_threads = threads
+    return opts
+
+
+def rutaModelo(cfg: IAConfig, model_id: str) -> Path:
+    return Path(cfg.onnx_cache_dir) / model_id.replace("/", "__")
+
+
+def exportarModelo(cfg: IAConfig, model_id: str) -> Path:
+    """Exporta y optimiza el modelo si aún no está en disco. Devuelve su carpeta."""
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTOptimizer
+    from optimum.onnxruntime.configuration import AutoOptimizationConfig
+
+    path = rutaModelo(cfg, model_id)
+    if (path / OPTIMIZED_FILE).exists() or (path / EXPORTED_FILE).exists():
+        return path
+
+    logger.info(f"Exportando {model_id} a ONNX en {path}")
+    path.mkdir(parents=True, exist_ok=True)
+    model = ORTModelForSequenceClassification.from_pretrained(model_id, export=True)
+    model.save_pretrained(path)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(path)
+
+    try:
+        optimizer = ORTOptimizer.from_pretrained(model)
+        optimizer.optimize(save_dir=path, optimization_config=AutoOptimizationConfig.O2())
+    except Exception as e:
+        # El grafo sin fusionar sigue siendo válido; ORT aplica sus optimizaciones al cargar
+        logger.warning(f"No se pudo optimizar el grafo de {model_id}: {e}")
+
+    return path
+
+
+def cargarPipelineONNX(task: str, cfg: IAConfig, model_id: str):
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    path = exportarModelo(cfg, model_id)
+    file_name = OPTIMIZED_FILE if (path / OPTIMIZED_FILE).exists() else EXPORTED_FILE
+    model = ORTModelForSequenceClassification.from_pretrained(
+        path,
+        file_name=file_name,
+        provider="CPUExecutionProvider",
+        session_options=_session_options(cfg)
+    )
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    return pipeline(task, model=model, tokenizer=tokenizer, truncation=True)
+
+
+def tamanoONNX(cfg: IAConfig, model_id: str) -> Optional[float]:
+    """Tamaño en MB del grafo cargado (los pesos ONNX viven fuera de torch)."""
+    path = rutaModelo(cfg, model_id)
+    for name in (OPTIMIZED_FILE, EXPORTED_FILE):
+        if (path / name).exists():
+            return round((path / name).stat().st_size / 1024 ** 2, 1)
+    return None
+
+
+# ======================================================
+# PARIDAD CON PYTORCH
+# ======================================================
+def verificarParidad(
+    cfg: Optional[IAConfig] = None,
+    textos: Optional[List[str]] = None,
+    tolerancia: float = 0.02
+) -> Dict[str, Any]:
+    """
+    Ejecuta los mismos textos con PyTorch y con ONNX y compara, por
+    pipeline, la etiqueta ganadora y la diferencia máxima de score.
+    """
+    from backend.ia.iaCore import ModelRegistry
+    from dataclasses import replace
+
+    cfg = cfg or IAConfig()
+    textos = textos or PARITY_TEXTS
+    torch_models = ModelRegistry(replace(cfg, backend="torch"))
+    onnx_models = ModelRegistry(replace(cfg, backend="onnx"))
+
+    def top(output):
+        if "labels" in output:
+            return output["labels"][0], dict(zip(output["labels"], output["scores"]))
+        return output["label"], {output["label"]: output["score"]}
+
+    reporte: Dict[str, Any] = {}
+    for name in sorted(ONNX_PIPELINES):
+        extra = (cfg.categorias,) if name == "zeroshot" else ()
+        kwargs = {"multi_label": True} if name == "zeroshot" else {}
+        ref = getattr(torch_models, name)()(textos, *extra, **kwargs)
+        out = getattr(onnx_models, name)()(textos, *extra, **kwargs)
+
+        if onnx_models.backends.get(name) != "onnx":
+            reporte[name] = {"ok": False, "error": "ONNX Runtime no disponible"}
+            continue
+
+        coincidencias, max_diff = 0, 0.0
+        for r, o in zip(ref, out):
+            r_label, r_scores = top(r)
+            o_label, o_scores = top(o)
+            coincidencias += int(r_label == o_label)
+            for label, score in r_scores.items():
+                if label in o_scores:
+                    max_diff = max(max_diff, abs(score - o_scores[label]))
+
+        reporte[name] = {
+            "textos": len(textos),
+            "acuerdo_etiqueta": coincidencias / len(textos),
+            "max_diff_score": max_diff,
+            "ok": coincidencias == len(textos) and max_diff <= tolerancia,
+        }
+
+    return reporte
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(verificarParidad(), indent=2, ensure_ascii=False))
@@ -0,0 +1,148 @@
+# ia/schedulerIA.py
+"""
+Micro-batching dinámico de inferencia.
+
+`MicroBatcher` envuelve un pipeline de ModelRegistry. Las llamadas con un
+solo texto que llegan desde distintos hilos (peticiones concurrentes de
+FastAPI) se encolan; un hilo por modelo las agrupa durante como mucho
+`max_wait_ms` (o hasta `max_batch`) y ejecuta un único forward por lote.
+Cada llamador recibe exactamente la salida que habría obtenido llamando al
+pipeline con su texto.
+
+Si no hay otras peticiones de análisis en curso (`active_fn`) el lote se
+despacha de inmediato, de modo que en reposo no se añade latencia. Las
+llamadas que ya traen una lista (analyze_batch) pasan directamente al
+pipeline.
+"""
+
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger("NLPAnalyzer")
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        name: str,
+        pipe,
+        max_batch: int = 16,
+        max_wait_ms: float = 5.0,
+        single_as_list: bool = True,
+        active_fn: Optional[Callable[[], int]] = None
+    ):
+        self.name = name
+        self.pipe = pipe
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        # sentiment/emotion/summarizer devuelven [dict] para un texto suelto; zero-shot devuelve dict
+        self.single_as_list = single_as_list
+
+        self._queue: "queue.Queue[Tuple[str, str, tuple, dict, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._inflight = 0
+        # Peticiones de análisis en curso en todo el proceso (no solo en este modelo)
+        self._active_fn = active_fn or (lambda: self._inflight)
+        self._thread = threading.Thread(target=self._loop, name=f"microbatch-{name}", daemon=True)
+        self._thread.start()
+
+        self.batches = 0
+        self.items = 0
+        self.max_seen = 0
+
+    # La API del pipeline (model, tokenizer...) sigue accesible
+    def __getattr__(self, attr):
+        return getattr(self.pipe, attr)
+
+    def __call__(self, inputs, *args, **kwargs):
+        if isinstance(inputs, list):
+            return self.pipe(inputs, *args, **kwargs)
+
+        key = repr((args, sorted(kwargs.items())))
+        future: Future = Future()
+        with self._lock:
+            self._inflight += 1
+        try:
+            self._queue.put((key, inputs, args, kwargs, future))
+            return future.result()
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    # --------------------------------------------------
+    # HILO DE DESPACHO
+    # --------------------------------------------------
+    def _collect(self) -> List[Tuple[str, str, tuple, dict, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+
+            # Solo merece la pena esperar si hay otras peticiones en curso
+            others = self._active_fn() - len(batch)
+            remaining = deadline - time.monotonic()
+            if others <= 0 or remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+
+            groups: Dict[str, list] = {}
+            for item in batch:
+                groups.setdefault(item[0], []).append(item)
+
+            for items in groups.values():
+                self._run(items)
+
+    def _run(self, items) -> None:
+        _, _, args, kwargs, _ = items[0]
+        texts = [text for _, text, _, _, _ in items]
+
+        with self._lock:
+            self.batches += 1
+            self.items += len(items)
+            self.max_seen = max(self.max_seen, len(items))
+
+        try:
+            outputs = self.pipe(texts, *args, batch_size=len(texts), **kwargs)
+            for (_, _, _, _, future), out in zip(items, outputs):
+                future.set_result([out] if self.single_as_list else out)
+        except Exception as e:
+            # Un texto problemático no debe tumbar al resto del lote
+            logger.warning(f"Micro-lote de '{self.name}' fallido, se procesa individualmente: {e}")
+            for _, text, a, kw, future in items:
+                if future.done():
+                    continue
+                try:
+                    future.set_result(self.pipe(text, *a, **kw))
+                except Exception as item_error:
+                    future.set_exception(item_error)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch": (self.items / self.batches) if self.batches else 0.0,
+                "max_batch_seen": self.max_seen,
+                "queue": self._queue.qsize(),
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+            }
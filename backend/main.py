@@ -1,9 +1,15 @@
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.config.settings import settings
 from backend.config.database import Base, engine
 from backend.core.coreModels import AnalisisComentario
+from backend.ia.iaCore import cfg_from_settings, configure_torch_threads, get_analyzer
+from backend.core.trabajosLote import WorkerTrabajos
+from backend.core.paginacion import HEADER_CURSOR
+from backend.core.planificadorPatrones import PlanificadorPatrones
 
 from backend.api.analizarComentario import router as analizarComentarioRouter
 from backend.api.analizarLote import router as analizarLoteRouter
@@ -13,6 +19,7 @@ from backend.api.estadisticas import router as estadisticasRouter
 from backend.api.auth import router as authRouter
 from backend.api.agente import router as agenteRouter
 from backend.api.agente_estadisticas_simple import router_stats as statsRouter
+from backend.api.modelos import router as modelosRouter
 
 # Crear tablas al iniciar
 Base.metadata.create_all(bind=engine)
@@ -25,6 +32,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[HEADER_CURSOR],
 )
 
 app.include_router(authRouter)
@@ -35,6 +43,55 @@ app.include_router(alertasRouter)
 app.include_router(estadisticasRouter)
 app.include_router(agenteRouter)
 app.include_router(statsRouter)
+app.include_router(modelosRouter)
+
+@app.on_event("startup")
+def configurarHilosTorch():
+    configure_torch_threads(cfg_from_settings().resolved_intra_op_threads())
+
+@app.on_event("startup")
+def warmupModelos():
+    if not settings.warmup_models:
+        return
+
+    registry = get_analyzer().models
+    if settings.warmup_background:
+        threading.Thread(target=registry.warmup, name="warmup-modelos", daemon=True).start()
+    else:
+        registry.warmup()
+
+workerTrabajos = WorkerTrabajos(
+    get_analyzer,
+    workers=settings.job_workers,
+    chunk_size=settings.job_chunk_size,
+    lease_seconds=settings.job_lease_seconds,
+    chunk_retries=settings.job_chunk_retries
+)
+
+@app.on_event("startup")
+def iniciarTrabajos():
+    # Reencola los trabajos que quedaron a medias y arranca los workers
+    if settings.job_workers > 0:
+        workerTrabajos.start()
+
+@app.on_event("shutdown")
+def detenerTrabajos():
+    workerTrabajos.stop(timeout=5)
+
+planificadorPatrones = PlanificadorPatrones(
+    poll_seconds=settings.patterns_poll_seconds,
+    debounce_seconds=settings.patterns_debounce_seconds
+)
+
+@app.on_event("startup")
+def iniciarPlanificadorPatrones():
+    # Reevalúa /alertas/patrones/ tras las escrituras y avisa de los cambios
+    if settings.patterns_scheduler:
+        planificadorPatrones.start()
+
+@app.on_event("shutdown")
+def detenerPlanificadorPatrones():
+    planificadorPatrones.stop(timeout=5)
 
 @app.get("/")
 def root():
@@ -0,0 +1,219 @@
+# utils/benchmarkEstadisticas.py
+"""
+Benchmark de los endpoints de /estadisticas/: lectura del agregado
+resumen_diario frente al recorrido anterior en Python sobre todas las
+filas ORM de analisis_comentarios. Comprueba además que ambos caminos
+devuelven exactamente la misma respuesta. Las filas se generan con SQL
+directo, así que el agregado se rellena con reconstruirResumen (su
+tiempo se imprime aparte).
+
+Por defecto genera 10k, 100k y 1M filas en una SQLite temporal; con --url
+se mide contra otra BD (las filas generadas se borran al terminar). El
+camino anterior carga todas las filas en memoria, así que solo se mide
+hasta --max-anterior filas.
+
+    python -m backend.utils.benchmarkEstadisticas
+    python -m backend.utils.benchmarkEstadisticas --filas 10000 100000 --max-anterior 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend.config.database import Base
+from backend.core.coreModels import AnalisisComentario, ResumenDiario, VersionDatos
+from backend.core.resumenDiario import reconstruirResumen
+from backend.utils.helpers import parsearFecha
+from backend.api.estadisticas import (
+    obtenerEstadisticas, estadisticasPorDepartamento, estadisticasPorEquipo, obtenerTendencias
+)
+
+A = AnalisisComentario
+
+NIVELES = ["alto", "medio", "bajo", "bajo"]
+EMOCIONES = ["alegría", "tristeza", "enojo", "miedo", "sorpresa", "neutral", "frustración"]
+DIAS_TENDENCIAS = 30
+CATEGORIAS = ["sobrecarga laboral", "liderazgo", "comunicación", "reconocimiento", "salario", "ambiente"]
+
+# ==========================================================
+# CAMINO ANTERIOR (filas ORM completas + bucle en Python)
+# ==========================================================
+def anteriorEstadisticas(db):
+    registros = db.query(A).all()
+    total = len(registros)
+    stress_counts = {"alto": 0, "medio": 0, "bajo": 0}
+    emo_counts, cat_counts = {}, {}
+    sent_sum = {"pos": 0.0, "neu": 0.0, "neg": 0.0}
+    for r in registros:
+        stress_counts[r.stress_level] = stress_counts.get(r.stress_level, 0) + 1
+        emo_counts[r.emotion_label] = emo_counts.get(r.emotion_label, 0) + 1
+        sent_sum["pos"] += r.sent_pos
+        sent_sum["neu"] += r.sent_neu
+        sent_sum["neg"] += r.sent_neg
+        if isinstance(r.categories, list):
+            for cat in r.categories:
+                label = cat.get("label", "")
+                cat_counts[label] = cat_counts.get(label, 0) + 1
+    categorias_ord = sorted(cat_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    return {
+        "total": total,
+        "stress": stress_counts,
+        "emociones": emo_counts,
+        "sentimiento_promedio": {
+            "positivo": sent_sum["pos"] / total,
+            "neutral": sent_sum["neu"] / total,
+            "negativo": sent_sum["neg"] / total
+        },
+        "categorias_principales": [{"categoria": c, "count": cnt} for c, cnt in categorias_ord]
+    }
+
+def anteriorDepartamentos(db):
+    dept_data = {}
+    for r in db.query(A).all():
+        dept = r.departamento or "Sin departamento"
+        d = dept_data.setdefault(dept, {"total": 0, "stress_alto": 0, "stress_medio": 0, "stress_bajo": 0, "emociones": {}})
+        d["total"] += 1
+        if r.stress_level == "alto":
+            d["stress_alto"] += 1
+        elif r.stress_level == "medio":
+            d["stress_medio"] += 1
+        else:
+            d["stress_bajo"] += 1
+        d["emociones"][r.emotion_label] = d["emociones"].get(r.emotion_label, 0) + 1
+    return dept_data
+
+def anteriorEquipos(db):
+    equipo_data = {}
+    for r in db.query(A).all():
+        eq = r.equipo or "Sin equipo"
+        e = equipo_data.setdefault(eq, {"total": 0, "stress_alto": 0, "departamento": r.departamento})
+        e["total"] += 1
+        if r.stress_level == "alto":
+            e["stress_alto"] += 1
+    return equipo_data
+
+def anteriorTendencias(db, dias=DIAS_TENDENCIAS):
+    filas = [r for r in db.query(A).order_by(A.fecha_dia).all() if r.fecha_dia]
+    if not filas:
+        return {}
+    desde = filas[-1].fecha_dia - timedelta(days=dias - 1)
+    fechas_data = {}
+    for r in filas:
+        if r.fecha_dia < desde:
+            continue
+        fecha = r.fecha_dia.isoformat()
+        f = fechas_data.setdefault(fecha, {"total": 0, "stress_alto": 0, "stress_medio": 0, "stress_bajo": 0})
+        f["total"] += 1
+        if r.stress_level == "alto":
+            f["stress_alto"] += 1
+        elif r.stress_level == "medio":
+            f["stress_medio"] += 1
+        else:
+            f["stress_bajo"] += 1
+    return fechas_data
+
+# __wrapped__: se mide la agregación, no la caché de respuestas
+CASOS = [
+    ("general", anteriorEstadisticas, lambda db: obtenerEstadisticas.__wrapped__(db=db)),
+    ("departamentos", anteriorDepartamentos, lambda db: estadisticasPorDepartamento.__wrapped__(db=db)),
+    ("equipos", anteriorEquipos, lambda db: estadisticasPorEquipo.__wrapped__(db=db)),
+    ("tendencias", anteriorTendencias, lambda db: obtenerTendencias.__wrapped__(dias=DIAS_TENDENCIAS, db=db)),
+]
+
+# ==========================================================
+# DATOS Y MEDICIÓN
+# ==========================================================
+def generarFilas(session_factory, n: int, chunk: int = 20000) -> None:
+    rnd = random.Random(n)
+    with session_factory() as db:
+        for inicio in range(0, n, chunk):
+            filas = []
+            for i in range(inicio, min(n, inicio + chunk)):
+                neg = rnd.random()
+                fecha = "" if i % 97 == 0 else f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}"
+                filas.append({
+                    "comentario": f"Comentario de prueba {i}",
+                    "emotion_label": rnd.choice(EMOCIONES),
+                    "emotion_score": rnd.random(),
+                    "stress_level": rnd.choice(NIVELES),
+                    "sent_pos": (1 - neg) / 2,
+                    "sent_neu": (1 - neg) / 2,
+                    "sent_neg": neg,
+                    "categories": [{"label": c} for c in rnd.sample(CATEGORIAS, 2)],
+                    "summary": "",
+                    "suggestion": "",
+                    "departamento": "" if i % 50 == 0 else f"Depto {i % 12}",
+                    "equipo": "" if i % 40 == 0 else f"Equipo {i % 60}",
+                    "fecha": fecha,
+                    "fecha_dia": parsearFecha(fecha),
+                })
+            db.execute(insert(A), filas)
+        db.commit()
+
+def normalizar(valor):
+    """Redondea floats: el agregado suma el sentimiento en otro orden."""
+    if isinstance(valor, float):
+        return round(valor, 9)
+    if isinstance(valor, dict):
+        return {k: normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [normalizar(v) for v in valor]
+    return valor
+
+def cronometrar(session_factory, fn):
+    with session_factory() as db:
+        start = time.perf_counter()
+        resultado = fn(db)
+        return resultado, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de agregación de estadísticas")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-anterior", type=int, default=100_000,
+                        help="Tamaño máximo para medir el camino anterior (carga todo en memoria)")
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy; por defecto SQLite temporal")
+    args = parser.parse_args()
+
+    print(f"{'filas':>9}  {'endpoint':<14}{'anterior s':>12}{'resumen s':>10}{'mejora':>9}  iguales")
+    for n in args.filas:
+        tmp = None
+        url = args.url
+        if url is None:
+            tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+            tmp.close()
+            url = f"sqlite:///{tmp.name}"
+
+        engine = create_engine(url)
+        Base.metadata.create_all(engine, tables=[A.__table__, ResumenDiario.__table__, VersionDatos.__table__])
+        session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+        try:
+            generarFilas(session_factory, n)
+            _, t_rec = cronometrar(session_factory, reconstruirResumen)
+            print(f"{n:>9}  {'(reconstruir)':<14}{'-':>12}{t_rec:>10.3f}")
+            for nombre, anterior, nuevo in CASOS:
+                res_sql, t_sql = cronometrar(session_factory, nuevo)
+                if n <= args.max_anterior:
+                    res_ant, t_ant = cronometrar(session_factory, anterior)
+                    iguales = "sí" if normalizar(res_ant) == normalizar(res_sql) else "NO"
+                    print(f"{n:>9}  {nombre:<14}{t_ant:>12.3f}{t_sql:>10.3f}{'x%.1f' % (t_ant / t_sql):>9}  {iguales}")
+                else:
+                    print(f"{n:>9}  {nombre:<14}{'-':>12}{t_sql:>10.3f}{'-':>9}  -")
+        finally:
+            if args.url is not None:
+                with session_factory() as db:
+                    db.execute(delete(A).where(A.comentario.like("Comentario de prueba %")))
+                    db.commit()
+                    reconstruirResumen(db)
+            engine.dispose()
+            if tmp is not None:
+                os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 # utils/helpers.py
 import csv
-from typing import List, Dict
+from datetime import date, datetime
+from typing import List, Dict, Optional
 
 def cargarCSV(ruta: str) -> List[Dict]:
     filas: List[Dict] = []
@@ -9,3 +10,31 @@ def cargarCSV(ruta: str) -> List[Dict]:
         for row in reader:
             filas.append(row)
     return filas
+
+# Formatos de fecha habituales en las exportaciones de RRHH
+FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y")
+
+def parsearFecha(valor) -> Optional[date]:
+    """Fecha del texto libre de `fecha`; None si no se reconoce."""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor or "").strip()[:10]
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+def fechaFiltro(nombre: str, valor) -> Optional[date]:
+    """Fecha de un parámetro de filtro en cualquiera de FORMATOS_FECHA; None si viene vacío."""
+    if valor is None or str(valor).strip() == "":
+        return None
+    fecha = parsearFecha(valor)
+    if fecha is None:
+        raise ValueError(
+            f"{nombre}: fecha no reconocida {valor!r} (formatos: AAAA-MM-DD, DD/MM/AAAA, AAAA/MM/DD, DD-MM-AAAA)"
+        )
+    return fecha
@@ -0,0 +1,90 @@
+# utils/lectorCSV.py
+"""
+Lectura incremental de CSV subidos (exportaciones de RRHH).
+
+Detecta la codificación (BOM, UTF-8, Windows-1252 o Latin-1) validando
+el archivo entero por bloques, y el delimitador (`,`, `;`, tabulador o `|`)
+con una muestra del inicio; luego recorre las filas una a una sobre el
+archivo binario, sin cargarlo entero. La decodificación es estricta: un
+byte inválido es un error, nunca un U+FFFD guardado en los comentarios.
+"""
+
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+import codecs
+import csv
+import io
+
+TAMANO_MUESTRA = 64 * 1024
+DELIMITADORES = ",;\t|"
+
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def _decodificable(archivo: BinaryIO, encoding: str) -> bool:
+    """Si el archivo entero es válido en `encoding` (por bloques; deja el cursor al inicio)."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        while True:
+            bloque = archivo.read(TAMANO_MUESTRA)
+            decoder.decode(bloque, final=not bloque)
+            if not bloque:
+                return True
+    except UnicodeDecodeError:
+        return False
+    finally:
+        archivo.seek(0)
+
+
+def detectarCodificacion(archivo: BinaryIO) -> str:
+    inicio = archivo.read(4)
+    archivo.seek(0)
+    for bom, encoding in _BOMS:
+        if inicio.startswith(bom):
+            return encoding
+
+    # Todo el archivo, no una muestra: un acento en Windows-1252 pasado el
+    # inicio haría pasar el archivo por UTF-8. Excel en español exporta en
+    # Windows-1252; Latin-1 acepta cualquier byte
+    for encoding in ("utf-8", "cp1252"):
+        if _decodificable(archivo, encoding):
+            return encoding
+    return "latin-1"
+
+
+def detectarDelimitador(texto: str) -> str:
+    lineas = texto.splitlines()
+    # Sin la última línea, que puede estar cortada
+    muestra = "\n".join(lineas[:-1] if len(lineas) > 1 else lineas)
+    try:
+        return csv.Sniffer().sniff(muestra, delimiters=DELIMITADORES).delimiter
+    except csv.Error:
+        cabecera = lineas[0] if lineas else ""
+        return max(DELIMITADORES, key=cabecera.count) if any(d in cabecera for d in DELIMITADORES) else ","
+
+
+def leerFilasCSV(archivo: BinaryIO) -> Tuple[List[str], Iterator[Dict[str, str]], Dict[str, str]]:
+    """
+    Devuelve (columnas, iterador de filas, formato detectado). Las columnas
+    se normalizan a minúsculas sin espacios. `archivo` debe admitir seek.
+    """
+    encoding = detectarCodificacion(archivo)
+    muestra = archivo.read(TAMANO_MUESTRA)
+    archivo.seek(0)
+    # La muestra puede cortar un carácter multibyte al final
+    delimitador = detectarDelimitador(muestra.decode(encoding, errors="ignore"))
+
+    texto = io.TextIOWrapper(archivo, encoding=encoding, errors="strict", newline="")
+    reader = csv.reader(texto, delimiter=delimitador)
+    columnas = [c.strip().lower() for c in next(reader, [])]
+
+    def filas() -> Iterator[Dict[str, str]]:
+        for valores in reader:
+            if not any(v.strip() for v in valores):
+                continue
+            yield dict(zip(columnas, valores))
+
+    return columnas, filas(), {"encoding": encoding, "delimitador": delimitador}
@@ -23,11 +23,180 @@ CREATE TABLE IF NOT EXISTS analisis_comentarios (
     departamento VARCHAR(80) DEFAULT '',
     equipo VARCHAR(80) DEFAULT '',
     fecha VARCHAR(20) DEFAULT '',
+    fecha_dia DATE NULL,
 
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
 
-    INDEX idx_departamento (departamento),
     INDEX idx_equipo (equipo),
-    INDEX idx_stress_level (stress_level),
-    INDEX idx_fecha (fecha)
+    INDEX idx_departamento_id_fecha (departamento, id, fecha_dia),
+    INDEX idx_stress_id (stress_level, id),
+    INDEX idx_departamento_equipo_id_fecha (departamento, equipo, id, fecha_dia)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Caché persistente de inferencia (compartida entre workers)
+CREATE TABLE IF NOT EXISTS cache_inferencia (
+    clave CHAR(64) NOT NULL,
+    version_modelos VARCHAR(16) NOT NULL,
+    resultado JSON NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (clave, version_modelos)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Trabajos asíncronos de análisis masivo
+CREATE TABLE IF NOT EXISTS trabajos_analisis (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    estado VARCHAR(16) NOT NULL DEFAULT 'pendiente',
+    clave_lote VARCHAR(128) NULL,
+
+    total INT NOT NULL DEFAULT 0,
+    procesados INT NOT NULL DEFAULT 0,
+    guardados INT NOT NULL DEFAULT 0,
+    errores INT NOT NULL DEFAULT 0,
+    omitidas INT NOT NULL DEFAULT 0,
+    error TEXT,
+
+    heartbeat DATETIME NULL,
+    intentos INT NOT NULL DEFAULT 0,
+
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+
+    INDEX idx_estado (estado),
+    INDEX idx_clave_lote (clave_lote)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS filas_trabajo (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    trabajo_id INT NOT NULL,
+    indice INT NOT NULL,
+    datos JSON NOT NULL,
+    hash_fila CHAR(64) NULL,
+
+    estado VARCHAR(16) NOT NULL DEFAULT 'pendiente',
+    error TEXT,
+    analisis_id INT NULL,
+
+    INDEX idx_trabajo_estado_indice (trabajo_id, estado, indice)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Ingesta idempotente: huellas de filas guardadas y checkpoints por bloque
+CREATE TABLE IF NOT EXISTS filas_lote (
+    clave_lote VARCHAR(128) NOT NULL,
+    hash_fila CHAR(64) NOT NULL,
+    analisis_id INT NOT NULL,
+
+    PRIMARY KEY (clave_lote, hash_fila)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS checkpoints_lote (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    clave_lote VARCHAR(128) NOT NULL,
+    indice_inicio INT NOT NULL,
+    indice_fin INT NOT NULL,
+    guardadas INT NOT NULL DEFAULT 0,
+    omitidas INT NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+    INDEX idx_clave_lote (clave_lote)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Clave de lote reservada por el trabajo que la procesa (uno a la vez)
+CREATE TABLE IF NOT EXISTS reservas_lote (
+    clave_lote VARCHAR(128) NOT NULL PRIMARY KEY,
+    trabajo_id INT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+    INDEX idx_trabajo_id (trabajo_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Categorías por análisis (normalizadas desde analisis_comentarios.categories;
+-- relleno de datos existentes: python -m backend.core.categoriasComentario migrar)
+CREATE TABLE IF NOT EXISTS comentario_categoria (
+    categoria VARCHAR(128) NOT NULL,
+    analisis_id INT NOT NULL,
+
+    PRIMARY KEY (categoria, analisis_id),
+    INDEX idx_comentario_categoria_analisis (analisis_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Agregado diario para los dashboards (se mantiene al guardar análisis;
+-- reconstrucción: python -m backend.core.resumenDiario reconstruir)
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    fecha VARCHAR(20) NOT NULL,
+    departamento VARCHAR(80) NOT NULL,
+    equipo VARCHAR(80) NOT NULL,
+    dimension VARCHAR(16) NOT NULL,
+    valor VARCHAR(128) NOT NULL,
+
+    n INT NOT NULL DEFAULT 0,
+    sent_pos DOUBLE NOT NULL DEFAULT 0,
+    sent_neu DOUBLE NOT NULL DEFAULT 0,
+    sent_neg DOUBLE NOT NULL DEFAULT 0,
+    primer_id INT NULL,
+
+    PRIMARY KEY (fecha, departamento, equipo, dimension, valor),
+    INDEX idx_resumen_dimension (dimension, valor)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Versión de los datos por ámbito ("analisis", "insights"): sube justo después
+-- del commit de cada escritura, en una transacción propia de una sola sentencia
+-- (core/cacheRespuestas.py), e invalida la caché de respuestas
+CREATE TABLE IF NOT EXISTS version_datos (
+    ambito VARCHAR(32) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Patrones de /alertas/patrones/ precalculados (core/planificadorPatrones.py)
+CREATE TABLE IF NOT EXISTS patrones_alerta (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    clave VARCHAR(128) NOT NULL,
+    tipo VARCHAR(32) NOT NULL,
+    severidad VARCHAR(16) NOT NULL,
+    departamento VARCHAR(80) NULL,
+    mensaje TEXT,
+    accion TEXT,
+
+    activo INT NOT NULL DEFAULT 1,
+    detectado_en DATETIME NOT NULL,
+    actualizado_en DATETIME NOT NULL,
+    resuelto_en DATETIME NULL,
+
+    INDEX idx_patron_activo_clave (activo, clave)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS eventos_patron (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    patron_id INT NOT NULL,
+    evento VARCHAR(16) NOT NULL,
+    datos JSON NOT NULL,
+    creado_en DATETIME NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS snapshot_patrones (
+    id INT PRIMARY KEY,
+    version_datos BIGINT NOT NULL DEFAULT 0,
+    respuesta JSON NOT NULL,
+    evaluado_en DATETIME NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Estado del detector EWMA/CUSUM de estrés alto por departamento (equipo = '')
+-- y por equipo (reconstrucción: python -m backend.core.detectorAnomalias reconstruir)
+CREATE TABLE IF NOT EXISTS detector_estres (
+    ambito VARCHAR(16) NOT NULL,
+    departamento VARCHAR(80) NOT NULL,
+    equipo VARCHAR(80) NOT NULL,
+
+    n INT NOT NULL DEFAULT 0,
+    ewma DOUBLE NOT NULL DEFAULT 0,
+    base DOUBLE NOT NULL DEFAULT 0,
+    cusum DOUBLE NOT NULL DEFAULT 0,
+
+    anomala INT NOT NULL DEFAULT 0,
+    anomala_desde DATETIME NULL,
+    actualizado_en DATETIME NULL,
+
+    PRIMARY KEY (ambito, departamento, equipo),
+    INDEX idx_detector_anomala (anomala, cusum)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
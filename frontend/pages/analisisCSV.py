@@ -1,13 +1,38 @@
 import streamlit as st
 import pandas as pd
+import hashlib
 import sys
+import time
 from pathlib import Path
 
 frontend_path = Path(__file__).parent.parent
 if str(frontend_path) not in sys.path:
     sys.path.insert(0, str(frontend_path))
 
-from utils.callBackend import analizarLoteCSV
+from utils.callBackend import analizarArchivoCSV, obtenerEstadoTrabajo, obtenerErroresTrabajo
+
+ESTADOS_FINALES = {"completado", "parcial", "fallido"}
+
+def seguirTrabajo(trabajo_id: int):
+    """Consulta el progreso del trabajo hasta que termina"""
+    barra = st.progress(0.0)
+    detalle = st.empty()
+
+    while True:
+        estado = obtenerEstadoTrabajo(trabajo_id)
+        barra.progress(min(estado.get("progreso", 0) / 100, 1.0))
+
+        eta = estado.get("eta_segundos")
+        detalle.write(
+            f"Trabajo #{trabajo_id} - {estado['estado']}: "
+            f"{estado['procesados']}/{estado['total']} filas, "
+            f"{estado['filas_por_segundo']} filas/s"
+            + (f", ETA {int(eta)} s" if eta is not None else "")
+        )
+
+        if estado["estado"] in ESTADOS_FINALES:
+            return estado
+        time.sleep(2)
 
 def mostrarPaginaCSV():
     st.title("Anilisis Masivo desde CSV")
@@ -19,12 +44,12 @@ def mostrarPaginaCSV():
 
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
+            # Solo la vista previa: el archivo completo lo procesa el backend por bloques
+            df = pd.read_csv(uploaded_file, nrows=10, sep=None, engine="python", encoding_errors="replace")
+            df.columns = [str(c).strip().lower() for c in df.columns]
 
             st.subheader("Vista previa del CSV")
-            st.dataframe(df.head(10), use_container_width=True)
-
-            st.write(f"Total de filas: {len(df)}")
+            st.dataframe(df, use_container_width=True)
 
             columnas_requeridas = ["comentario"]
             columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
@@ -35,14 +60,34 @@ def mostrarPaginaCSV():
 
             if st.button("Procesar CSV completo", use_container_width=True):
                 try:
-                    datos = df.to_dict('records')
+                    contenido = uploaded_file.getvalue()
+                    # Mismo archivo -> misma clave: reenviarlo omite las filas ya guardadas
+                    clave_lote = "csv-" + hashlib.sha256(contenido).hexdigest()
+
+                    with st.spinner("Subiendo archivo..."):
+                        trabajo = analizarArchivoCSV(uploaded_file.name, contenido, clave_lote)
 
-                    with st.spinner(f"Analizando {len(datos)} comentarios..."):
-                        resultado = analizarLoteCSV(datos)
+                    if trabajo.get("en_curso"):
+                        st.info(f"Este archivo ya se está procesando (trabajo #{trabajo['trabajo_id']})")
+                    st.write(f"Total de filas: {trabajo['total']}")
 
-                    st.success(f"Procesamiento completado")
+                    resultado = seguirTrabajo(trabajo["trabajo_id"])
+
+                    if resultado["estado"] == "fallido":
+                        st.error(f"El trabajo falló: {resultado.get('error')}")
+                    elif resultado["estado"] == "parcial":
+                        st.warning(f"Procesamiento completado con bloques fallidos: {resultado.get('error')}")
+                    else:
+                        st.success(f"Procesamiento completado")
                     st.metric("Comentarios procesados", resultado.get("procesados", 0))
                     st.metric("Comentarios guardados", resultado.get("guardados", 0))
+                    if resultado.get("omitidas"):
+                        st.metric("Ya guardados en un envío anterior", resultado["omitidas"])
+
+                    if resultado.get("errores"):
+                        st.warning(f"{resultado['errores']} filas con error")
+                        errores = obtenerErroresTrabajo(trabajo["trabajo_id"])
+                        st.dataframe(pd.DataFrame(errores), use_container_width=True)
 
                     st.info("Los resultados han sido guardados en la base de datos. Consulta el Dashboard para visualizarlos.")
 
@@ -8,12 +8,12 @@ if str(frontend_path) not in sys.path:
     sys.path.insert(0, str(frontend_path))
 
 from utils.callBackend import (
-    obtenerHistoricos, obtenerEstadisticas, obtenerEstadisticasDepartamentos,
-    obtenerTendencias, obtenerTextoComentarios, obtenerDepartamentos
+    obtenerHistoricos, obtenerHistoricosPagina, obtenerEstadisticas, obtenerEstadisticasDepartamentos,
+    obtenerTendencias, obtenerTextoComentarios, obtenerDepartamentos, obtenerCategorias
 )
 from utils.formatHelper import (
     crearGraficoBarras, crearGraficoPie, crearGraficoLinea,
-    mostrarTablaComentarios, crearGraficoMultilinea
+    mostrarTablaComentarios, crearGraficoMultilinea, listaPaginada, botonCargarMas
 )
 from utils.worldCloudUtils import mostrarWordCloud
 
@@ -195,7 +195,7 @@ def mostrarPaginaIndividual():
     st.title("Analisis Individual")
     st.markdown("Explora comentarios individuales con filtros avanzados")
 
-    col_filter1, col_filter2, col_filter3 = st.columns(3)
+    col_filter1, col_filter2, col_filter3, col_filter4 = st.columns(4)
 
     with col_filter1:
         try:
@@ -209,34 +209,53 @@ def mostrarPaginaIndividual():
         stress_seleccionado = st.selectbox("Nivel de Estres", ["Todos", "alto", "medio", "bajo"])
 
     with col_filter3:
-        limite = st.number_input("Limite de resultados", min_value=10, max_value=500, value=50, step=10)
+        try:
+            categorias = obtenerCategorias()
+            categorias.insert(0, "Todas")
+            categoria_seleccionada = st.selectbox("Categoria", categorias)
+        except:
+            categoria_seleccionada = "Todas"
+
+    with col_filter4:
+        limite = st.number_input("Comentarios por pagina", min_value=10, max_value=500, value=50, step=10)
 
     if st.button("Aplicar Filtros"):
-        try:
-            filtros = {}
-            if dept_seleccionado != "Todos":
-                filtros["departamento"] = dept_seleccionado
-            if stress_seleccionado != "Todos":
-                filtros["stress_level"] = stress_seleccionado
-
-            filtros["limit"] = limite
-
-            comentarios = obtenerHistoricos(**filtros)
-
-            if comentarios:
-                st.success(f"Se encontraron {len(comentarios)} comentarios")
-                mostrarTablaComentarios(comentarios, limite=limite)
-
-                with st.expander("Ver detalles completos"):
-                    for c in comentarios[:10]:
-                        st.markdown(f"**ID {c['id']}** - {c['departamento']} - {c['fecha']}")
-                        st.write(f"Comentario: {c['comentario']}")
-                        st.write(f"Estres: {c['stress_level']} | Emocion: {c['emotion_label']}")
-                        st.write(f"Resumen: {c['summary']}")
-                        st.write(f"Sugerencia: {c['suggestion']}")
-                        st.markdown("---")
-            else:
-                st.warning("No se encontraron comentarios con esos filtros")
-
-        except Exception as e:
-            st.error(f"Error aplicando filtros: {str(e)}")
+        filtros = {}
+        if dept_seleccionado != "Todos":
+            filtros["departamento"] = dept_seleccionado
+        if stress_seleccionado != "Todos":
+            filtros["stress_level"] = stress_seleccionado
+        if categoria_seleccionada != "Todas":
+            filtros["categoria"] = categoria_seleccionada
+
+        filtros["limit"] = limite
+
+        st.session_state["filtros_individual"] = filtros
+        st.session_state.pop("historicos_individual", None)
+
+    if "filtros_individual" not in st.session_state:
+        return
+
+    try:
+        filtros = st.session_state["filtros_individual"]
+        cargar = lambda cursor: obtenerHistoricosPagina(cursor=cursor, **filtros)
+        comentarios = listaPaginada("historicos_individual", cargar, filtros)
+
+        if comentarios:
+            st.success(f"Mostrando {len(comentarios)} comentarios")
+            mostrarTablaComentarios(comentarios, limite=len(comentarios))
+            botonCargarMas("historicos_individual", cargar)
+
+            with st.expander("Ver detalles completos"):
+                for c in comentarios[:10]:
+                    st.markdown(f"**ID {c['id']}** - {c['departamento']} - {c['fecha']}")
+                    st.write(f"Comentario: {c['comentario']}")
+                    st.write(f"Estres: {c['stress_level']} | Emocion: {c['emotion_label']}")
+                    st.write(f"Resumen: {c['summary']}")
+                    st.write(f"Sugerencia: {c['suggestion']}")
+                    st.markdown("---")
+        else:
+            st.warning("No se encontraron comentarios con esos filtros")
+
+    except Exception as e:
+        st.error(f"Error aplicando filtros: {str(e)}")
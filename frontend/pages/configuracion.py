@@ -7,10 +7,10 @@ if str(frontend_path) not in sys.path:
     sys.path.insert(0, str(frontend_path))
 
 from utils.callBackend import (
-    obtenerPatrones, obtenerAlertas, obtenerDepartamentos,
+    obtenerPatrones, obtenerAlertasPagina, obtenerDepartamentos,
     obtenerAlertasDepartamento
 )
-from utils.formatHelper import mostrarAlerta, mostrarTablaComentarios
+from utils.formatHelper import mostrarAlerta, mostrarTablaComentarios, listaPaginada, botonCargarMas
 
 def mostrarPaginaAlertas():
     st.title("Sistema de Alertas Automaticas")
@@ -32,6 +32,13 @@ def mostrarPaginaAlertas():
         with col2:
             st.metric("Porcentaje de Estres Alto", f"{stress_pct:.1f}%")
 
+        if patrones.get("evaluado_en"):
+            evaluado = patrones['evaluado_en'][:19].replace('T', ' ')
+            if patrones.get("al_dia", True):
+                st.caption(f"Ultima evaluacion: {evaluado} (UTC)")
+            else:
+                st.caption(f"Ultima evaluacion: {evaluado} (UTC) - hay datos nuevos pendientes de evaluar")
+
         st.markdown("---")
 
         patrones_detectados = patrones.get("patrones_detectados", [])
@@ -48,6 +55,8 @@ def mostrarPaginaAlertas():
                 with st.container():
                     mostrarAlerta(tipo, mensaje, severidad)
                     st.markdown(f"**Accion recomendada:** {accion}")
+                    if patron.get("detectado_en"):
+                        st.caption(f"Activo desde {patron['detectado_en'][:19].replace('T', ' ')} (UTC)")
                     st.markdown("---")
         else:
             st.info("No se detectaron patrones creticos")
@@ -63,15 +72,22 @@ def mostrarPaginaAlertas():
 
     with col_alert1:
         nivel_stress = st.selectbox("Nivel", ["alto", "medio", "bajo"])
-        limite_alertas = st.number_input("Limite", min_value=5, max_value=100, value=20, step=5)
+        limite_alertas = st.number_input("Alertas por pagina", min_value=5, max_value=100, value=20, step=5)
 
     if st.button("Buscar Alertas"):
+        st.session_state["filtros_alertas"] = {"nivel": nivel_stress, "limite": limite_alertas}
+        st.session_state.pop("alertas_nivel", None)
+
+    if "filtros_alertas" in st.session_state:
         try:
-            alertas = obtenerAlertas(nivel=nivel_stress, limite=limite_alertas)
+            filtros = st.session_state["filtros_alertas"]
+            cargar = lambda cursor: obtenerAlertasPagina(cursor=cursor, **filtros)
+            alertas = listaPaginada("alertas_nivel", cargar, filtros)
 
             if alertas:
-                st.success(f"Se encontraron {len(alertas)} comentarios con estres {nivel_stress}")
-                mostrarTablaComentarios(alertas, limite=limite_alertas)
+                st.success(f"Mostrando {len(alertas)} comentarios con estres {filtros['nivel']}")
+                mostrarTablaComentarios(alertas, limite=len(alertas))
+                botonCargarMas("alertas_nivel", cargar)
 
                 with st.expander("Ver detalles completos"):
                     for alerta in alertas[:10]:
@@ -81,7 +97,7 @@ def mostrarPaginaAlertas():
                         st.write(f"Sugerencia: {alerta['suggestion']}")
                         st.markdown("---")
             else:
-                st.warning(f"No hay comentarios con estres {nivel_stress}")
+                st.warning(f"No hay comentarios con estres {filtros['nivel']}")
 
         except Exception as e:
             st.error(f"Error obteniendo alertas: {str(e)}")
@@ -20,6 +20,7 @@ from utils.callBackend import (
     obtenerConversacionAgente,
     listarConversacionesAgente
 )
+from utils.formatHelper import listaPaginada, botonCargarMas
 
 
 def mostrar_dashboard_insights():
@@ -101,21 +102,24 @@ def mostrar_lista_insights():
         )
 
     with col2:
-        limite = st.number_input("Limite", min_value=5, max_value=50, value=10)
+        limite = st.number_input("Insights por pagina", min_value=5, max_value=50, value=10)
 
     params = {"limite": limite}
     if filtro_estado != "Todos":
         params["estado"] = filtro_estado.lower().replace(" ", "_")
 
+    def cargar(cursor):
+        resultado = obtenerInsights(cursor=cursor, **params)
+        return resultado.get("insights", []), resultado.get("next_cursor")
+
     try:
-        resultado = obtenerInsights(**params)
-        insights = resultado.get("insights", [])
+        insights = listaPaginada("lista_insights", cargar, params)
 
         if not insights:
             st.info("No se encontraron insights")
             return
 
-        st.write(f"**{len(insights)} insights encontrados**")
+        st.write(f"**Mostrando {len(insights)} insights**")
 
         # Mostrar insights en formato simple
         for insight in insights:
@@ -175,10 +179,13 @@ def mostrar_lista_insights():
                         try:
                             actualizarInsight(insight["id"], estado=nuevo_estado, revisado_por="RRHH")
                             st.success("Actualizado")
+                            st.session_state.pop("lista_insights", None)
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error: {str(e)}")
 
+        botonCargarMas("lista_insights", cargar)
+
     except Exception as e:
         st.error(f"Error al cargar insights: {str(e)}")
 
@@ -188,17 +195,20 @@ def mostrar_conversaciones_agente():
 
     st.markdown("### Conversaciones del Agente")
 
-    limite = st.number_input("Limite", min_value=5, max_value=50, value=10, key="limite_conv")
+    limite = st.number_input("Conversaciones por pagina", min_value=5, max_value=50, value=10, key="limite_conv")
+
+    def cargar(cursor):
+        resultado = listarConversacionesAgente(limite=limite, cursor=cursor)
+        return resultado.get("conversaciones", []), resultado.get("next_cursor")
 
     try:
-        resultado = listarConversacionesAgente(limite=limite)
-        conversaciones = resultado.get("conversaciones", [])
+        conversaciones = listaPaginada("lista_conversaciones", cargar, {"limite": limite})
 
         if not conversaciones:
             st.info("No se encontraron conversaciones")
             return
 
-        st.write(f"**{len(conversaciones)} conversaciones encontradas**")
+        st.write(f"**Mostrando {len(conversaciones)} conversaciones**")
 
         for conv in conversaciones:
             with st.expander(f"{conv['categoria_principal'] or 'Sin categoria'} - {conv['departamento'] or 'Sin dept'}"):
@@ -207,6 +217,8 @@ def mostrar_conversaciones_agente():
                 st.write(f"**Nivel de riesgo:** {conv['nivel_riesgo_actual']}")
                 st.write(f"**Fecha:** {conv['created_at']}")
 
+        botonCargarMas("lista_conversaciones", cargar)
+
     except Exception as e:
         st.error(f"Error al cargar conversaciones: {str(e)}")
 
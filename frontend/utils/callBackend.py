@@ -1,8 +1,11 @@
 import requests
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 BASE_URL = "http://127.0.0.1:8000"
 
+# Cursor de la página siguiente en los listados paginados
+HEADER_CURSOR = "X-Next-Cursor"
+
 def analizarComentarioIndividual(comentario: str, meta: Optional[Dict] = None) -> Dict[str, Any]:
     url = f"{BASE_URL}/analizar-comentario/"
     payload = {
@@ -14,20 +17,49 @@ def analizarComentarioIndividual(comentario: str, meta: Optional[Dict] = None) -
     return response.json()
 
 def analizarLoteCSV(datos: List[Dict[str, Any]]) -> Dict[str, Any]:
-    url = f"{BASE_URL}/analizar-lote/"
-    payload = {"datos": datos}
-    response = requests.post(url, json=payload, timeout=300)
+    """Encola el lote; devuelve el id del trabajo para consultar su progreso"""
+    url = f"{BASE_URL}/analizar/lote"
+    response = requests.post(url, json=datos, timeout=120)
+    response.raise_for_status()
+    return response.json()
+
+def analizarArchivoCSV(nombre: str, contenido: bytes, clave_lote: Optional[str] = None) -> Dict[str, Any]:
+    """Sube el CSV tal cual; el backend lo lee por bloques y devuelve el id del trabajo"""
+    url = f"{BASE_URL}/analizar/csv"
+    files = {"archivo": (nombre, contenido, "text/csv")}
+    params = {"clave_lote": clave_lote} if clave_lote else {}
+    response = requests.post(url, files=files, params=params, timeout=300)
+    if response.status_code == 409:
+        # El mismo archivo ya se está procesando: se sigue ese trabajo
+        detalle = response.json()["detail"]
+        if detalle.get("trabajo_id") is not None:
+            return {**obtenerEstadoTrabajo(detalle["trabajo_id"]), "en_curso": True}
     response.raise_for_status()
     return response.json()
 
-def obtenerHistoricos(
+def obtenerEstadoTrabajo(trabajo_id: int) -> Dict[str, Any]:
+    url = f"{BASE_URL}/analizar/trabajos/{trabajo_id}"
+    response = requests.get(url, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def obtenerErroresTrabajo(trabajo_id: int, limite: int = 100) -> List[Dict[str, Any]]:
+    url = f"{BASE_URL}/analizar/trabajos/{trabajo_id}/errores"
+    response = requests.get(url, params={"limite": limite}, timeout=10)
+    response.raise_for_status()
+    return response.json().get("errores", [])
+
+def obtenerHistoricosPagina(
     limit: int = 100,
     departamento: Optional[str] = None,
     equipo: Optional[str] = None,
     fecha_inicio: Optional[str] = None,
     fecha_fin: Optional[str] = None,
-    stress_level: Optional[str] = None
-) -> List[Dict[str, Any]]:
+    stress_level: Optional[str] = None,
+    categoria: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Una página de históricos (más recientes primero) y el cursor de la siguiente"""
     url = f"{BASE_URL}/historicos/"
     params = {"limit": limit}
     if departamento:
@@ -40,20 +72,37 @@ def obtenerHistoricos(
         params["fecha_fin"] = fecha_fin
     if stress_level:
         params["stress_level"] = stress_level
+    if categoria:
+        params["categoria"] = categoria
+    if cursor:
+        params["cursor"] = cursor
 
     response = requests.get(url, params=params, timeout=30)
     response.raise_for_status()
-    return response.json()
+    return response.json(), response.headers.get(HEADER_CURSOR)
 
-def obtenerAlertas(nivel: str = "alto", limite: int = 20, departamento: Optional[str] = None) -> List[Dict[str, Any]]:
+def obtenerHistoricos(**filtros) -> List[Dict[str, Any]]:
+    return obtenerHistoricosPagina(**filtros)[0]
+
+def obtenerAlertasPagina(
+    nivel: str = "alto",
+    limite: int = 20,
+    departamento: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     url = f"{BASE_URL}/alertas/"
     params = {"nivel": nivel, "limite": limite}
     if departamento:
         params["departamento"] = departamento
+    if cursor:
+        params["cursor"] = cursor
 
     response = requests.get(url, params=params, timeout=30)
     response.raise_for_status()
-    return response.json()
+    return response.json(), response.headers.get(HEADER_CURSOR)
+
+def obtenerAlertas(nivel: str = "alto", limite: int = 20, departamento: Optional[str] = None) -> List[Dict[str, Any]]:
+    return obtenerAlertasPagina(nivel, limite, departamento)[0]
 
 def obtenerEstadisticas(
     departamento: Optional[str] = None,
@@ -140,6 +189,12 @@ def obtenerEquipos(departamento: Optional[str] = None) -> List[str]:
     response.raise_for_status()
     return response.json().get("equipos", [])
 
+def obtenerCategorias() -> List[str]:
+    url = f"{BASE_URL}/historicos/categorias/"
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    return response.json().get("categorias", [])
+
 def verificarConexion() -> bool:
     try:
         url = f"{BASE_URL}/"
@@ -197,11 +252,14 @@ def obtenerInsights(
     tipo: Optional[str] = None,
     severidad: Optional[str] = None,
     estado: Optional[str] = None,
-    departamento: Optional[str] = None
+    departamento: Optional[str] = None,
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Obtiene insights generados por el agente"""
+    """Obtiene insights generados por el agente (la respuesta trae next_cursor)"""
     url = f"{BASE_URL}/agente/insights/"
     params = {"limite": limite}
+    if cursor:
+        params["cursor"] = cursor
     if tipo:
         params["tipo"] = tipo
     if severidad:
@@ -249,11 +307,14 @@ def listarConversacionesAgente(
     limite: int = 20,
     estado: Optional[str] = None,
     nivel_riesgo: Optional[str] = None,
-    departamento: Optional[str] = None
+    departamento: Optional[str] = None,
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Lista conversaciones del agente"""
+    """Lista conversaciones del agente (la respuesta trae next_cursor)"""
     url = f"{BASE_URL}/agente/conversaciones/"
     params = {"limite": limite}
+    if cursor:
+        params["cursor"] = cursor
     if estado:
         params["estado"] = estado
     if nivel_riesgo:
@@ -1,5 +1,5 @@
 import streamlit as st
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
 def formatearResultadoAnalisis(resultado: Dict[str, Any]) -> None:
     if "resultado" in resultado:
@@ -101,6 +101,38 @@ def mostrarTablaComentarios(comentarios: List[Dict[str, Any]], limite: int = 10)
 
 
 
+def listaPaginada(
+    clave: str,
+    cargar: Callable[[Optional[str]], Tuple[List[Dict[str, Any]], Optional[str]]],
+    filtros: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Lista que se carga por páginas con el cursor del backend. `cargar(cursor)`
+    devuelve (filas, cursor siguiente). Las filas acumuladas viven en
+    session_state[clave] y se reinician cuando cambian los filtros; el
+    botón "Cargar más" pide la página siguiente mientras la haya.
+    """
+    estado = st.session_state.get(clave)
+    if estado is None or estado["filtros"] != filtros:
+        filas, cursor = cargar(None)
+        estado = {"filtros": filtros, "filas": filas, "cursor": cursor}
+        st.session_state[clave] = estado
+    return estado["filas"]
+
+def botonCargarMas(
+    clave: str,
+    cargar: Callable[[Optional[str]], Tuple[List[Dict[str, Any]], Optional[str]]]
+) -> None:
+    estado = st.session_state.get(clave)
+    if not estado or not estado["cursor"]:
+        return
+    if st.button("Cargar más", key=f"{clave}_mas"):
+        filas, cursor = cargar(estado["cursor"])
+        estado["filas"].extend(filas)
+        estado["cursor"] = cursor
+        st.rerun()
+
+
 def crearGraficoBarras(titulo: str, etiquetas: List[str], valores: List[float], color: str = None):
     import plotly.graph_objects as go
 